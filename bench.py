@@ -1,9 +1,55 @@
+"""Benchmarks, run with ``make bench``.
+
+``make bench-baseline`` saves the results of the current build as
+bench-baseline.json, ``make bench-compare`` fails if a benchmark of the
+current build regresses by more than BENCH_THRESHOLD percent against it,
+in time or in peak memory per object (see tools/bench_compare.py).
+"""
+
+import gc
+import hashlib
+import heapq
+import operator
 import os
+import pickle
+import sys
+import threading
+import time
+import tracemalloc
+
 import pytest
 from ksuid import Ksuid as SvixKsuid
 
+import cyksuid
+
+from cyksuid.v2 import (
+    SHARED_SEQUENCE_SIZE,
+    CachedClock,
+    CoarseClock,
+    Ksuid,
+    Ksuid40,
+    Ksuid48,
+    KsuidArray,
+    KsuidSequence,
+    KsuidSet,
+    ManualClock,
+    RealtimeClock,
+    SharedKsuidSequence,
+)
+from cyksuid.v2 import (
+    dumps_many,
+    loads_many,
+    merge_sorted,
+    parse_cache_info,
+    partition_many,
+    set_parse_cache,
+    validate_many,
+)
+from cyksuid.v2 import generate_many as cy_generate_many
+from cyksuid.v2 import is_valid as cy_is_valid
 from cyksuid.v2 import ksuid as cy_ksuid
 from cyksuid.v2 import parse as cy_parse
+from cyksuid.v2 import try_parse as cy_try_parse
 
 TESTS_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "tests")
 
@@ -13,6 +59,11 @@ TESTS_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "tests")
     [
         pytest.param(SvixKsuid, id="svix"),
         pytest.param(cy_ksuid, id="cyksuid"),
+        pytest.param(KsuidSequence(), id="cyksuid-sequence"),
+        pytest.param(
+            SharedKsuidSequence(bytearray(SHARED_SEQUENCE_SIZE)),
+            id="cyksuid-shared-sequence",
+        ),
     ],
 )
 def test_generate(benchmark, gen):
@@ -28,3 +79,430 @@ def test_generate(benchmark, gen):
 )
 def test_parse(benchmark, parse):
     benchmark(parse, "Afwp2wWXH1RpvLDMXQkmZtUlWzr")
+
+
+CLOCKS = [
+    pytest.param(None, id="default"),
+    pytest.param(RealtimeClock(), id="realtime"),
+    pytest.param(CoarseClock(), id="coarse"),
+    pytest.param(CachedClock(), id="cached"),
+    pytest.param(ManualClock(1700000000000), id="manual"),
+]
+
+
+@pytest.mark.parametrize("clock", CLOCKS)
+@pytest.mark.parametrize(
+    "gen",
+    [
+        pytest.param(lambda c: lambda: cy_ksuid(clock=c), id="ksuid"),
+        pytest.param(lambda c: KsuidSequence(Ksuid48, clock=c), id="sequence"),
+        pytest.param(
+            lambda c: lambda: cy_generate_many(BULK_COUNT, clock=c), id="generate_many"
+        ),
+    ],
+)
+def test_clock(benchmark, gen, clock):
+    benchmark(gen(clock))
+
+
+def test_clock_time_func(benchmark):
+    benchmark(cy_ksuid, time_func=time.time)
+
+
+def _parse_or_none(s):
+    try:
+        return cy_parse(s)
+    except (TypeError, ValueError):
+        return None
+
+
+@pytest.mark.parametrize(
+    "s",
+    [
+        pytest.param("Afwp2wWXH1RpvLDMXQkmZtUlWzr", id="valid"),
+        pytest.param("Afwp2wWXH1RpvLDMXQkmZtUlWz!", id="invalid"),
+    ],
+)
+@pytest.mark.parametrize(
+    "op",
+    [
+        pytest.param(_parse_or_none, id="parse-except"),
+        pytest.param(cy_try_parse, id="try_parse"),
+        pytest.param(cy_is_valid, id="is_valid"),
+    ],
+)
+def test_validate(benchmark, op, s):
+    benchmark(op, s)
+
+
+def test_validate_many(benchmark):
+    ids = [str(k) for k in KsuidArray.from_buffer(cy_generate_many(BULK_COUNT))]
+    ids[::10] = ["Afwp2wWXH1RpvLDMXQkmZtUlWz!"] * len(ids[::10])
+    benchmark(validate_many, ids)
+
+
+@pytest.fixture(params=[True, False], ids=["stats-on", "stats-off"])
+def stats_enabled(request):
+    cyksuid.set_stats_enabled(request.param)
+    yield request.param
+    cyksuid.set_stats_enabled(True)
+
+
+@pytest.mark.parametrize(
+    "op",
+    [
+        pytest.param(Ksuid, id="generate"),
+        pytest.param(lambda: cy_parse("Afwp2wWXH1RpvLDMXQkmZtUlWzr"), id="parse"),
+    ],
+)
+def test_stats_overhead(benchmark, stats_enabled, op):
+    benchmark(op)
+
+
+PARSE_CACHE_SIZE = 1024
+
+
+@pytest.fixture
+def parse_cache():
+    set_parse_cache(PARSE_CACHE_SIZE)
+    yield
+    set_parse_cache(0)
+
+
+@pytest.mark.parametrize(
+    "count,cache",
+    [
+        pytest.param(PARSE_CACHE_SIZE, True, id="hit"),
+        pytest.param(PARSE_CACHE_SIZE * 2, True, id="miss"),
+        pytest.param(PARSE_CACHE_SIZE, False, id="bypass"),
+    ],
+)
+def test_parse_cache(benchmark, parse_cache, count, cache):
+    ids = [str(k) for k in KsuidArray.from_buffer(cy_generate_many(count))]
+
+    def parse_all():
+        for s in ids:
+            cy_parse(s, cache=cache)
+
+    parse_all()
+    benchmark(parse_all)
+    benchmark.extra_info["hit_ratio"] = parse_cache_info().hits / max(
+        1, parse_cache_info().hits + parse_cache_info().misses
+    )
+
+
+BULK_COUNT = 10000
+PARALLEL_COUNT = 1000000
+PARTITIONS = 12
+THREADS = sorted({1, 2, 4, 8, os.cpu_count() or 1})
+
+
+@pytest.mark.parametrize(
+    "gen",
+    [
+        pytest.param(lambda n: [cy_ksuid() for _ in range(n)], id="loop"),
+        pytest.param(
+            lambda n: b"".join(cy_ksuid().bytes for _ in range(n)), id="loop-bytes"
+        ),
+        pytest.param(cy_generate_many, id="generate_many"),
+        pytest.param(
+            lambda n: cy_generate_many(n, encoded=True), id="generate_many-encoded"
+        ),
+    ],
+)
+def test_generate_bulk(benchmark, gen):
+    benchmark(gen, BULK_COUNT)
+
+
+@pytest.mark.parametrize(
+    "op",
+    [
+        pytest.param(lambda ids: sorted(list(ids)), id="list-sorted"),
+        pytest.param(lambda ids: KsuidArray(ids).sort(), id="array-sort"),
+        pytest.param(
+            lambda ids: [k.timestamp_millis for k in ids], id="list-timestamps"
+        ),
+        pytest.param(
+            lambda ids: KsuidArray(ids).timestamps_millis(), id="array-timestamps"
+        ),
+        pytest.param(lambda ids: [k.datetime for k in ids], id="list-datetimes"),
+        pytest.param(lambda ids: KsuidArray(ids).datetimes(), id="array-datetimes"),
+    ],
+)
+def test_array_bulk(benchmark, op):
+    ids = KsuidArray.from_buffer(cy_generate_many(BULK_COUNT))
+    benchmark(op, ids)
+
+
+def _blake2b_partition(raw, n_partitions):
+    digest = hashlib.blake2b(raw, digest_size=8).digest()
+    return int.from_bytes(digest, "little") % n_partitions
+
+
+@pytest.mark.parametrize(
+    "op",
+    [
+        pytest.param(lambda k: hash(k.bytes), id="hash-bytes"),
+        pytest.param(
+            lambda k: hashlib.blake2b(k.bytes, digest_size=8).digest(), id="blake2b"
+        ),
+        pytest.param(lambda k: k.hash64(), id="hash64"),
+    ],
+)
+def test_hash(benchmark, op):
+    benchmark(op, Ksuid())
+
+
+@pytest.mark.parametrize(
+    "op",
+    [
+        pytest.param(
+            lambda ids: [_blake2b_partition(k.bytes, PARTITIONS) for k in ids],
+            id="loop-blake2b",
+        ),
+        pytest.param(lambda ids: partition_many(ids, PARTITIONS), id="partition_many"),
+        pytest.param(
+            lambda ids: partition_many(ids, PARTITIONS, split=True),
+            id="partition_many-split",
+        ),
+    ],
+)
+def test_partition(benchmark, op):
+    ids = KsuidArray.from_buffer(cy_generate_many(BULK_COUNT))
+    benchmark(op, ids)
+
+
+@pytest.mark.parametrize("threads", THREADS)
+@pytest.mark.parametrize(
+    "op",
+    [
+        pytest.param(lambda n, t: cy_generate_many(n, threads=t), id="generate_many"),
+        pytest.param(
+            lambda n, t: cy_generate_many(n, encoded=True, threads=t),
+            id="generate_many-encoded",
+        ),
+    ],
+)
+def test_generate_parallel(benchmark, op, threads):
+    benchmark.extra_info["threads"] = threads
+    benchmark(op, PARALLEL_COUNT, threads)
+
+
+SCALING_COUNT = 200000
+
+
+def _run_threads(op, n, threads):
+    per_thread = n // threads
+    workers = [
+        threading.Thread(target=lambda: [op() for _ in range(per_thread)])
+        for _ in range(threads)
+    ]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+
+
+@pytest.mark.parametrize("threads", THREADS)
+@pytest.mark.parametrize(
+    "op",
+    [
+        pytest.param(Ksuid, id="generate"),
+        pytest.param(KsuidSequence(Ksuid48), id="sequence"),
+        pytest.param(lambda: cy_parse("Afwp2wWXH1RpvLDMXQkmZtUlWzr"), id="parse"),
+    ],
+)
+def test_thread_scaling(benchmark, op, threads):
+    # Total work is fixed, throughput grows with threads only without the GIL
+    benchmark.extra_info["threads"] = threads
+    benchmark.extra_info["gil_enabled"] = getattr(
+        sys, "_is_gil_enabled", lambda: True
+    )()
+    benchmark(_run_threads, op, SCALING_COUNT, threads)
+
+
+KSUID_CLASSES = [
+    pytest.param(Ksuid, id="Ksuid"),
+    pytest.param(Ksuid40, id="Ksuid40"),
+    pytest.param(Ksuid48, id="Ksuid48"),
+]
+SORT_COUNT = 100000
+MEMORY_COUNT = 10000
+
+
+@pytest.fixture(params=KSUID_CLASSES)
+def ksuid_cls(request):
+    return request.param
+
+
+@pytest.mark.parametrize(
+    "source",
+    ["random", "timestamp-payload", "raw", "parse-str", "parse-bytes"],
+)
+def test_construct(benchmark, ksuid_cls, source):
+    k = ksuid_cls()
+    if source == "random":
+        benchmark(ksuid_cls)
+    elif source == "timestamp-payload":
+        benchmark(ksuid_cls.from_timestamp_and_payload, k.timestamp, k.payload)
+    elif source == "raw":
+        benchmark(ksuid_cls, k.bytes)
+    elif source == "parse-str":
+        benchmark(cy_parse, str(k), ksuid_cls)
+    else:
+        benchmark(cy_parse, k.encoded, ksuid_cls)
+
+
+@pytest.mark.parametrize(
+    "accessor",
+    [
+        pytest.param(operator.attrgetter(name), id=name)
+        for name in ["bytes", "payload", "timestamp", "datetime", "hex", "encoded"]
+    ]
+    + [pytest.param(str, id="str"), pytest.param(hash, id="hash")],
+)
+def test_accessor(benchmark, ksuid_cls, accessor):
+    benchmark(accessor, ksuid_cls())
+
+
+@pytest.mark.parametrize(
+    "op",
+    [
+        pytest.param(getattr(operator, name), id=name)
+        for name in ["lt", "le", "eq", "ne", "gt", "ge"]
+    ],
+)
+def test_compare(benchmark, ksuid_cls, op):
+    benchmark(op, ksuid_cls(), ksuid_cls())
+
+
+def test_sort(benchmark, ksuid_cls):
+    ids = list(KsuidArray.from_buffer(cy_generate_many(SORT_COUNT), ksuid_cls))
+    benchmark(sorted, ids)
+
+
+@pytest.mark.parametrize("protocol", [2, pickle.HIGHEST_PROTOCOL])
+def test_pickle(benchmark, ksuid_cls, protocol):
+    k = ksuid_cls()
+    benchmark.extra_info["size"] = len(pickle.dumps(k, protocol))
+    benchmark(lambda: pickle.loads(pickle.dumps(k, protocol)))
+
+
+MERGE_INPUTS = 32
+
+
+def _sorted_shards(n):
+    shards = []
+    for _ in range(MERGE_INPUTS):
+        arr = KsuidArray.from_buffer(bytearray(cy_generate_many(n)))
+        arr.sort()
+        shards.append(arr)
+    return shards
+
+
+@pytest.mark.parametrize(
+    "merge",
+    [
+        pytest.param(lambda shards: list(heapq.merge(*shards)), id="heapq"),
+        pytest.param(lambda shards: list(merge_sorted(*shards)), id="cyksuid-objects"),
+    ],
+)
+def test_merge_objects(benchmark, merge):
+    shards = [list(arr) for arr in _sorted_shards(BULK_COUNT // MERGE_INPUTS)]
+    benchmark(merge, shards)
+
+
+def test_merge_buffers(benchmark):
+    shards = _sorted_shards(BULK_COUNT // MERGE_INPUTS)
+    benchmark(lambda: list(merge_sorted(*shards)))
+
+
+def _pickle_oob(arr):
+    buffers = []
+    data = pickle.dumps(arr, 5, buffer_callback=buffers.append)
+    return pickle.loads(data, buffers=buffers)
+
+
+@pytest.mark.parametrize(
+    "roundtrip",
+    [
+        pytest.param(
+            lambda ids: pickle.loads(pickle.dumps(list(ids))), id="pickle-list"
+        ),
+        pytest.param(lambda arr: pickle.loads(pickle.dumps(arr)), id="pickle-array"),
+        pytest.param(_pickle_oob, id="pickle-array-out-of-band"),
+        pytest.param(lambda arr: loads_many(dumps_many(arr)), id="dumps-many"),
+    ],
+)
+def test_pickle_bulk(benchmark, roundtrip):
+    arr = KsuidArray.from_buffer(cy_generate_many(BULK_COUNT))
+    benchmark(roundtrip, arr)
+
+
+def _with_str(k):
+    str(k)
+    return k
+
+
+def _peak_bytes_per_object(factory, n):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        objs = [factory() for _ in range(n)]
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return (peak - sys.getsizeof(objs)) / n
+
+
+@pytest.mark.parametrize(
+    "factory",
+    [
+        pytest.param(lambda cls: cls, id="object"),
+        pytest.param(lambda cls: lambda: _with_str(cls()), id="object-str-cached"),
+        pytest.param(lambda cls: lambda: KsuidArray([cls()], cls), id="array-1"),
+    ],
+)
+def test_memory(benchmark, ksuid_cls, factory):
+    """Peak traced memory per object, stored as extra_info."""
+    make = factory(ksuid_cls)
+    benchmark.extra_info["peak_bytes_per_object"] = _peak_bytes_per_object(
+        make, MEMORY_COUNT
+    )
+    benchmark(make)
+
+
+def test_memory_svix(benchmark):
+    benchmark.extra_info["peak_bytes_per_object"] = _peak_bytes_per_object(
+        SvixKsuid, MEMORY_COUNT
+    )
+    benchmark(SvixKsuid)
+
+
+def _bytes_per_entry(make, arr):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        table = make(arr)
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    if isinstance(table, KsuidSet):
+        # The slots are allocated by C++, outside of tracemalloc
+        size = sys.getsizeof(table)
+    return size / len(table)
+
+
+@pytest.mark.parametrize(
+    "make",
+    [
+        pytest.param(set, id="set"),
+        pytest.param(lambda arr: KsuidSet(iter(arr)), id="KsuidSet-add"),
+        pytest.param(KsuidSet, id="KsuidSet-add_many"),
+    ],
+)
+def test_dedup(benchmark, make):
+    """Build a set of IDs, memory per entry stored as extra_info."""
+    arr = KsuidArray.from_buffer(cy_generate_many(BULK_COUNT))
+    benchmark.extra_info["bytes_per_entry"] = _bytes_per_entry(make, arr)
+    benchmark(make, arr)
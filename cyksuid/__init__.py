@@ -1,3 +1,4 @@
 from cyksuid.__version__ import __version__
+from cyksuid.fast_base62 import set_stats_enabled, stats, stats_reset
 
-__all__ = ["__version__"]
+__all__ = ["__version__", "set_stats_enabled", "stats", "stats_reset"]
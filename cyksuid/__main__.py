@@ -0,0 +1,5 @@
+import sys
+
+from cyksuid.cli import main
+
+sys.exit(main())
@@ -0,0 +1,107 @@
+from libc.stdint cimport *
+from libcpp cimport bool as cpp_bool
+
+from cyksuid._ksuid cimport KsuidMutex
+
+
+cdef extern from "ksuidarray.h" nogil:
+    void ksuid_array_sort(uint8_t* data, size_t n) except +
+    size_t ksuid_array_unique(uint8_t* data, size_t n) except +
+    size_t ksuid_array_search(const uint8_t* data, size_t n, const uint8_t* value,
+                              bint right) except +
+    size_t ksuid_array_argmin(const uint8_t* data, size_t n, bint greatest) except +
+    size_t ksuid_array_find(const uint8_t* data, size_t n, const uint8_t* value) except +
+    void ksuid_array_timestamps_millis(size_t ts_size, const uint8_t* data, size_t n,
+                                       int64_t* out)
+    void ksuid_array_hash64(const uint8_t* data, size_t n, uint64_t seed, uint64_t* out)
+    void ksuid_array_partition(const uint8_t* data, size_t n, uint64_t seed,
+                               int32_t n_partitions, uint32_t* out)
+    void ksuid_array_scatter(const uint8_t* data, size_t n, const uint32_t* partitions,
+                             uint8_t** cursors)
+    void ksuid_array_assign(size_t ts_size, uint8_t* dst, const int64_t* ts,
+                            const uint8_t* payload, size_t n) except +
+
+    cdef cppclass KsuidMergeEntry "KsuidMergeHeap::Entry":
+        const uint8_t* data
+        size_t source
+
+    cdef cppclass KsuidMergeHeap:
+        bint empty()
+        const KsuidMergeEntry& top()
+        void push(const uint8_t* data, size_t source) except +
+        void pop()
+        void replace_top(const uint8_t* data)
+
+    cdef cppclass KsuidArrayMerger:
+        void add(const uint8_t* data, size_t n) except +
+        size_t remaining()
+        size_t next(uint8_t* out, size_t max, bint dedupe)
+
+
+
+cdef extern from "ksuidset.h" nogil:
+    cdef cppclass KsuidTable:
+        KsuidTable()
+        KsuidTable(size_t ts_size, bint with_values)
+        size_t size()
+        size_t slots()
+        size_t memory()
+        bint used(size_t i)
+        const uint8_t* key(size_t i)
+        int64_t value(size_t i)
+        void set_value(size_t i, int64_t value)
+        size_t find(const uint8_t* key)
+        size_t insert(const uint8_t* key, cpp_bool* inserted) except +
+        size_t insert_many(const uint8_t* data, size_t n, uint8_t* bitmap) except +
+        void find_many(const uint8_t* data, size_t n, uint8_t* bitmap)
+        void erase_at(size_t i)
+        size_t evict_before(int64_t millis) except +
+        void clear()
+
+    const size_t KSUID_TABLE_NPOS "KsuidTable::npos"
+
+
+cdef class KsuidArray:
+    """Compact array of KSUIDs stored as contiguous raw bytes."""
+
+    # Contiguous raw KSUIDs, owned or pointing into base_
+    cdef uint8_t* data_
+    cdef Py_ssize_t len_
+    # Allocated number of KSUIDs, 0 for views
+    cdef Py_ssize_t capacity_
+    # Buffer of the viewed object, only valid if viewing_ is set
+    cdef Py_buffer base_
+    cdef bint viewing_
+    cdef bint readonly_
+    # Number of buffers exported from this array
+    cdef Py_ssize_t exports_
+    # Guards the storage on free-threaded builds
+    cdef KsuidMutex mutex_
+    cdef type ksuid_cls_
+    cdef size_t ts_size_
+
+    cdef int _view(self, object buffer) except -1
+    cdef int _reserve(self, Py_ssize_t n) except -1
+    cdef int _append_raw(self, const uint8_t* raw, Py_ssize_t n) except -1
+    cdef Py_ssize_t _pin(self) except -1
+    cdef void _unpin(self) noexcept
+
+
+cdef class _KsuidTable:
+    cdef KsuidTable table_
+    # Guards table_ on free-threaded builds
+    cdef KsuidMutex mutex_
+    cdef type ksuid_cls_
+    cdef size_t ts_size_
+
+    cdef int _init(self, ksuid_cls, bint with_values) except -1
+    cdef KsuidArray _keys(self)
+
+
+cdef class KsuidSet(_KsuidTable):
+    """Set of KSUIDs stored inline in an open addressing hash table."""
+
+
+cdef class KsuidDict(_KsuidTable):
+    """Mapping of KSUIDs to int64 values stored inline in an open addressing
+    hash table."""
@@ -0,0 +1,235 @@
+import array
+from datetime import datetime
+from typing import (
+    Any,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+    overload,
+)
+
+from cyksuid import hints
+from cyksuid._ksuid import Ksuid
+
+_D = TypeVar("_D")
+
+class KsuidArray:
+    """Compact array of KSUIDs stored as contiguous raw bytes.
+
+    Items are turned into KSUID objects of ``ksuid_cls`` only when accessed.
+    Slices with a step of 1 are views sharing memory with the array, an array
+    cannot grow while views of it or exported buffers exist.
+    """
+
+    def __init__(
+        self,
+        iterable: Optional[Iterable[Union[Ksuid, hints.Buffer]]] = None,
+        ksuid_cls: Optional[Type[Ksuid]] = None,
+    ) -> None: ...
+    @classmethod
+    def from_buffer(
+        cls, buffer: hints.Buffer, ksuid_cls: Optional[Type[Ksuid]] = None
+    ) -> "KsuidArray":
+        """View raw KSUIDs in ``buffer`` without copying them."""
+
+    @classmethod
+    def from_encoded(
+        cls,
+        buffer: hints.Buffer,
+        ksuid_cls: Optional[Type[Ksuid]] = None,
+        newline: bool = False,
+    ) -> "KsuidArray":
+        """Decode base62 encoded KSUIDs in bulk."""
+
+    def to_encoded(self, newline: bool = False) -> bytes:
+        """Base62 encode all KSUIDs into one bytes object."""
+
+    def tobytes(self) -> bytes:
+        """Raw bytes of all KSUIDs."""
+
+    @property
+    def ksuid_cls(self) -> Type[Ksuid]:
+        """KSUID class of the items."""
+
+    def append(self, value: Union[Ksuid, hints.Buffer]) -> None:
+        """Append a KSUID, or 20 raw bytes."""
+
+    def extend(self, iterable: Iterable[Union[Ksuid, hints.Buffer]]) -> None:
+        """Append KSUIDs from an iterable or from another KsuidArray."""
+
+    def __len__(self) -> int: ...
+    @overload
+    def __getitem__(self, index: int) -> Ksuid: ...
+    @overload
+    def __getitem__(self, index: slice) -> "KsuidArray": ...
+    def __iter__(self) -> Iterator[Ksuid]: ...
+    def __contains__(self, value: object) -> bool: ...
+    def __buffer__(self, flags: int) -> memoryview: ...
+    def __reduce_ex__(self, protocol: Any) -> Tuple[Any, ...]: ...
+    def timestamps_millis(self) -> "array.array[int]":
+        """Timestamps of all KSUIDs in milliseconds, as ``array.array('q')``."""
+
+    def hash64(self, seed: int = 0) -> "array.array[int]":
+        """Stable 64-bit hashes of all KSUIDs, as ``array.array('Q')``."""
+
+    def datetimes(self) -> List[datetime]:
+        """Timestamps of all KSUIDs as a list of timezone aware datetimes."""
+
+    def sort(self) -> None:
+        """Sort the KSUIDs in place."""
+
+    def unique(self) -> "KsuidArray":
+        """New sorted array of the distinct KSUIDs."""
+
+    def searchsorted(
+        self, value: Union[Ksuid, hints.Buffer], side: str = "left"
+    ) -> int:
+        """Index where ``value`` would be inserted to keep a sorted array sorted."""
+
+    def min(self) -> Ksuid:
+        """Smallest KSUID of the array."""
+
+    def max(self) -> Ksuid:
+        """Greatest KSUID of the array."""
+
+class KsuidSet:
+    """Set of KSUIDs stored inline in an open addressing hash table."""
+
+    def __init__(
+        self,
+        iterable: Optional[
+            Union[KsuidArray, hints.Buffer, Iterable[Union[Ksuid, hints.Buffer]]]
+        ] = None,
+        ksuid_cls: Optional[Type[Ksuid]] = None,
+    ) -> None: ...
+    @property
+    def ksuid_cls(self) -> Type[Ksuid]:
+        """KSUID class of the items."""
+
+    def __len__(self) -> int: ...
+    def __contains__(self, value: object) -> bool: ...
+    def __iter__(self) -> Iterator[Ksuid]: ...
+    def __reduce__(self) -> Tuple[Any, ...]: ...
+    def add(self, value: Union[Ksuid, hints.Buffer]) -> None:
+        """Add a KSUID, or 20 raw bytes."""
+
+    def discard(self, value: Union[Ksuid, hints.Buffer]) -> None:
+        """Remove a KSUID, or 20 raw bytes, if present."""
+
+    def add_many(self, buffer: Union[KsuidArray, hints.Buffer]) -> bytes:
+        """Add contiguous raw KSUIDs, return a bitmap of the ones not in the set before."""
+
+    def contains_many(self, buffer: Union[KsuidArray, hints.Buffer]) -> bytes:
+        """Test contiguous raw KSUIDs for membership, return a bitmap."""
+
+    def to_array(self) -> KsuidArray:
+        """KSUIDs of the set as a new KsuidArray, in no particular order."""
+
+    def expire(self, window_millis: int, now_millis: Optional[int] = None) -> int:
+        """Remove the KSUIDs older than ``window_millis`` and return how many."""
+
+    def clear(self) -> None:
+        """Remove all KSUIDs and release the memory of the table."""
+
+class KsuidDict:
+    """Mapping of KSUIDs to int64 values stored inline in an open addressing
+    hash table."""
+
+    def __init__(
+        self,
+        items: Optional[
+            Union[Mapping[Any, int], Iterable[Tuple[Union[Ksuid, hints.Buffer], int]]]
+        ] = None,
+        ksuid_cls: Optional[Type[Ksuid]] = None,
+    ) -> None: ...
+    @property
+    def ksuid_cls(self) -> Type[Ksuid]:
+        """KSUID class of the keys."""
+
+    def __len__(self) -> int: ...
+    def __contains__(self, key: object) -> bool: ...
+    def __iter__(self) -> Iterator[Ksuid]: ...
+    def __reduce__(self) -> Tuple[Any, ...]: ...
+    def __getitem__(self, key: Union[Ksuid, hints.Buffer]) -> int: ...
+    def __setitem__(self, key: Union[Ksuid, hints.Buffer], value: int) -> None: ...
+    def __delitem__(self, key: Union[Ksuid, hints.Buffer]) -> None: ...
+    @overload
+    def get(self, key: Union[Ksuid, hints.Buffer]) -> Optional[int]: ...
+    @overload
+    def get(self, key: Union[Ksuid, hints.Buffer], default: _D) -> Union[int, _D]: ...
+    def keys(self) -> KsuidArray:
+        """Keys as a new KsuidArray, in no particular order."""
+
+    def values(self) -> "array.array[int]":
+        """Values as ``array.array('q')``, in the order of :meth:`keys`."""
+
+    def items(self) -> List[Tuple[Ksuid, int]]:
+        """List of ``(key, value)`` pairs, in no particular order."""
+
+    def expire(self, window_millis: int, now_millis: Optional[int] = None) -> int:
+        """Remove the keys older than ``window_millis`` and return how many."""
+
+    def clear(self) -> None:
+        """Remove all keys and release the memory of the table."""
+
+MERGE_BATCH_SIZE: int
+
+_T = TypeVar("_T", Ksuid, bytes)
+
+@overload
+def merge_sorted(  # type: ignore[overload-overlap]
+    *iterables: Union[KsuidArray, hints.Buffer],
+    dedupe: bool = False,
+    ksuid_cls: Optional[Type[Ksuid]] = None,
+    batch_size: int = ...,
+) -> Iterator[KsuidArray]: ...
+@overload
+def merge_sorted(
+    *iterables: Iterable[_T],
+    dedupe: bool = False,
+    ksuid_cls: Optional[Type[Ksuid]] = None,
+    batch_size: int = ...,
+) -> Iterator[_T]: ...
+def dumps_many(
+    ids: Union[KsuidArray, Iterable[Union[Ksuid, hints.Buffer]]],
+    ksuid_cls: Optional[Type[Ksuid]] = None,
+) -> bytes:
+    """Serialize KSUIDs into one bytes object: a 16 bytes header followed by
+    the contiguous raw bytes of the IDs."""
+
+def loads_many(
+    data: hints.Buffer, ksuid_cls: Optional[Type[Ksuid]] = None
+) -> KsuidArray:
+    """Deserialize KSUIDs written by :func:`dumps_many` into a KsuidArray
+    viewing ``data`` without copying it."""
+
+def partition_many(
+    buffer: Union[KsuidArray, hints.Buffer],
+    n_partitions: int,
+    seed: int = 0,
+    split: bool = False,
+    threads: Optional[int] = None,
+) -> Union["array.array[int]", List[bytes]]:
+    """Assign raw KSUIDs to partitions by jump consistent hash of :meth:`Ksuid.hash64`.
+
+    :return: partition of every KSUID as ``array.array('I')``, or if ``split``
+        is true the raw KSUIDs of each partition.
+    """
+
+def _timestamps_millis_into(
+    src: hints.Buffer,
+    out: hints.WritableBuffer,
+    ksuid_cls: Optional[Type[Ksuid]] = None,
+) -> None: ...
+def _assign_into(
+    out: hints.WritableBuffer,
+    timestamps: hints.Buffer,
+    payloads: hints.Buffer,
+    ksuid_cls: Optional[Type[Ksuid]] = None,
+) -> None: ...
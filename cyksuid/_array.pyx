@@ -0,0 +1,1123 @@
+cimport cython
+from cpython cimport array
+from cpython.buffer cimport (PyBUF_SIMPLE, PyBUF_WRITABLE, PyBuffer_FillInfo,
+                             PyBuffer_Release, PyObject_GetBuffer)
+from cpython.buffer cimport PyObject_CheckBuffer
+from cpython.bytes cimport (PyBytes_AS_STRING, PyBytes_CheckExact,
+                            PyBytes_FromStringAndSize, PyBytes_GET_SIZE)
+from cpython.mem cimport PyMem_Free, PyMem_Malloc, PyMem_Realloc
+from cython.parallel cimport prange
+from libc.string cimport memcmp, memcpy, memset
+
+import array
+from datetime import timezone
+from pickle import PickleBuffer
+
+from cyksuid._ksuid cimport (_datetime_from_millis, _KsuidMixin, _new_from_raw,
+                             _timestamp_size, ksuid_compare, ksuid_mutex_lock,
+                             ksuid_mutex_unlock, ksuid_now_millis,
+                             ksuid_timestamp_millis)
+from cyksuid.fast_base62 cimport (BASE62_BYTE_LENGTH, _b62decode_records,
+                                  _encoded_records, _resolve_threads)
+
+from cyksuid._ksuid import Ksuid, Ksuid40, Ksuid48
+from cyksuid.fast_base62 import encode_many
+
+cdef array.array _int64_template = array.array('q')
+cdef array.array _uint64_template = array.array('Q')
+cdef array.array _uint32_template = array.array('I')
+# Exported as buffer of empty arrays without storage
+cdef uint8_t _empty_buf[1]
+
+# Header of dumps_many(): magic, format version, timestamp size, padding
+# and the little endian uint64 count of KSUIDs
+cdef bytes _MAGIC = b"KSUID"
+cdef enum:
+    _FORMAT_VERSION = 1
+    _HEADER_SIZE = 16
+
+cdef dict _ksuid_cls_by_ts_size = {4: Ksuid, 5: Ksuid40, 6: Ksuid48}
+
+
+cdef int _get_ksuid_buffer(object value, Py_buffer* view) except -1:
+    PyObject_GetBuffer(value, view, PyBUF_SIMPLE)
+    if view.len != BASE62_BYTE_LENGTH:
+        PyBuffer_Release(view)
+        raise ValueError("Expect a KSUID or %d raw bytes" % BASE62_BYTE_LENGTH)
+    return 0
+
+
+# Py_buffer.obj must stay alive until __dealloc__ releases the view
+@cython.no_gc_clear
+cdef class KsuidArray:
+    """Compact array of KSUIDs stored as contiguous raw bytes.
+
+    Items are turned into KSUID objects of ``ksuid_cls`` only when accessed.
+    Slices with a step of 1 are views sharing memory with the array, an array
+    cannot grow while views of it or exported buffers exist. Bulk methods such as
+    :meth:`sort` or :meth:`timestamps_millis` run without the GIL and likewise
+    keep the array from growing in other threads until they return.
+
+    :param iterable: KSUIDs to fill the array with.
+    :param callable ksuid_cls: KSUID class of the items, defaults to Ksuid.
+    """
+
+    def __init__(self, iterable=None, ksuid_cls=None):
+        if not ksuid_cls:
+            ksuid_cls = Ksuid
+        self.ts_size_ = _timestamp_size(ksuid_cls)
+        self.ksuid_cls_ = ksuid_cls
+        if iterable is not None:
+            self.extend(iterable)
+
+    def __dealloc__(self):
+        if self.viewing_:
+            PyBuffer_Release(&self.base_)
+        else:
+            PyMem_Free(self.data_)
+
+    @classmethod
+    def from_buffer(cls, buffer, ksuid_cls=None):
+        """View raw KSUIDs in ``buffer`` without copying them.
+
+        :param buffer: contiguous buffer of ``20 * n`` raw bytes.
+        :param callable ksuid_cls: KSUID class of the items, defaults to Ksuid.
+        """
+        cdef KsuidArray arr = cls(ksuid_cls=ksuid_cls)
+        arr._view(buffer)
+        if arr.base_.len % BASE62_BYTE_LENGTH:
+            raise ValueError("Buffer size must be a multiple of %d" % BASE62_BYTE_LENGTH)
+        arr.len_ = arr.base_.len // BASE62_BYTE_LENGTH
+        return arr
+
+    cdef int _view(self, object buffer) except -1:
+        # Writable if the exporter allows it; the view is released on dealloc
+        try:
+            PyObject_GetBuffer(buffer, &self.base_, PyBUF_WRITABLE)
+        except BufferError:
+            PyObject_GetBuffer(buffer, &self.base_, PyBUF_SIMPLE)
+            self.readonly_ = True
+        self.viewing_ = True
+        self.data_ = <uint8_t*>self.base_.buf
+        return 0
+
+    @classmethod
+    def from_encoded(cls, buffer, ksuid_cls=None, bint newline=False):
+        """Decode base62 encoded KSUIDs in bulk.
+
+        :param buffer: ``27 * n`` encoded bytes, or ``n`` records separated by
+            ``\\n`` if ``newline`` is true.
+        :param callable ksuid_cls: KSUID class of the items, defaults to Ksuid.
+        :raises DecodeError: if a record is invalid.
+        """
+        cdef KsuidArray arr = cls(ksuid_cls=ksuid_cls)
+        cdef Py_buffer view
+        cdef Py_ssize_t n
+
+        PyObject_GetBuffer(buffer, &view, PyBUF_SIMPLE)
+        try:
+            n = _encoded_records(view.len, newline)
+            arr._reserve(n)
+            _b62decode_records(arr.data_, <const char*>view.buf, view.len, newline, 1)
+            arr.len_ = n
+        finally:
+            PyBuffer_Release(&view)
+        return arr
+
+    def to_encoded(self, bint newline=False):
+        """Base62 encode all KSUIDs into one bytes object.
+
+        :param bool newline: terminate every encoded record with ``\\n``.
+        """
+        return encode_many(self, newline=newline)
+
+    def tobytes(self):
+        """Raw bytes of all KSUIDs."""
+        ksuid_mutex_lock(&self.mutex_)
+        try:
+            return PyBytes_FromStringAndSize(<char*>self.data_, self.len_ * BASE62_BYTE_LENGTH)
+        finally:
+            ksuid_mutex_unlock(&self.mutex_)
+
+    @property
+    def ksuid_cls(self):
+        """KSUID class of the items."""
+        return self.ksuid_cls_
+
+    cdef int _reserve(self, Py_ssize_t n) except -1:
+        cdef Py_ssize_t capacity
+        cdef uint8_t* data
+
+        if self.exports_:
+            raise BufferError("Cannot resize a KsuidArray with exported buffers or views")
+        if not self.viewing_ and n <= self.capacity_:
+            return 0
+
+        capacity = max(n, self.capacity_ + (self.capacity_ >> 1) + 8)
+        if self.viewing_:
+            # Copy viewed items into owned storage
+            data = <uint8_t*>PyMem_Realloc(NULL, capacity * BASE62_BYTE_LENGTH)
+            if data == NULL:
+                raise MemoryError()
+            memcpy(data, self.data_, self.len_ * BASE62_BYTE_LENGTH)
+            PyBuffer_Release(&self.base_)
+            self.viewing_ = False
+            self.readonly_ = False
+        else:
+            data = <uint8_t*>PyMem_Realloc(self.data_, capacity * BASE62_BYTE_LENGTH)
+            if data == NULL:
+                raise MemoryError()
+
+        self.data_ = data
+        self.capacity_ = capacity
+        return 0
+
+    cdef int _append_raw(self, const uint8_t* raw, Py_ssize_t n) except -1:
+        ksuid_mutex_lock(&self.mutex_)
+        try:
+            self._reserve(self.len_ + n)
+            memcpy(self.data_ + self.len_ * BASE62_BYTE_LENGTH, raw, n * BASE62_BYTE_LENGTH)
+            self.len_ += n
+        finally:
+            ksuid_mutex_unlock(&self.mutex_)
+        return 0
+
+    cdef Py_ssize_t _pin(self) except -1:
+        """Keep the storage from being reallocated, as an exported buffer does,
+        to read it without the GIL. Return the number of KSUIDs."""
+        cdef Py_ssize_t n
+        ksuid_mutex_lock(&self.mutex_)
+        self.exports_ += 1
+        n = self.len_
+        ksuid_mutex_unlock(&self.mutex_)
+        return n
+
+    cdef void _unpin(self) noexcept:
+        ksuid_mutex_lock(&self.mutex_)
+        self.exports_ -= 1
+        ksuid_mutex_unlock(&self.mutex_)
+
+    def append(self, value):
+        """Append a KSUID, or 20 raw bytes."""
+        cdef Py_buffer view
+        if isinstance(value, _KsuidMixin):
+            self._append_raw((<_KsuidMixin>value).data_, 1)
+            return
+
+        _get_ksuid_buffer(value, &view)
+        try:
+            self._append_raw(<const uint8_t*>view.buf, 1)
+        finally:
+            PyBuffer_Release(&view)
+
+    def extend(self, iterable):
+        """Append KSUIDs from an iterable or from another KsuidArray."""
+        cdef KsuidArray other
+        cdef bytes raw
+        if isinstance(iterable, KsuidArray):
+            other = <KsuidArray>iterable
+            # Copy first, extending an array with itself reallocates the source
+            raw = other.tobytes()
+            self._append_raw(raw, other.len_)
+            return
+
+        for value in iterable:
+            self.append(value)
+
+    def __len__(self):
+        return self.len_
+
+    def __getitem__(self, index):
+        cdef Py_ssize_t i, start, stop, step, n
+        cdef KsuidArray arr
+
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.len_)
+            n = len(range(start, stop, step))
+            if step == 1:
+                arr = KsuidArray.from_buffer(self, self.ksuid_cls_)
+                arr.data_ += start * BASE62_BYTE_LENGTH
+                arr.len_ = n
+                return arr
+
+            arr = KsuidArray(ksuid_cls=self.ksuid_cls_)
+            arr._reserve(n)
+            ksuid_mutex_lock(&self.mutex_)
+            for i in range(n):
+                memcpy(arr.data_ + i * BASE62_BYTE_LENGTH,
+                       self.data_ + (start + i * step) * BASE62_BYTE_LENGTH,
+                       BASE62_BYTE_LENGTH)
+            ksuid_mutex_unlock(&self.mutex_)
+            arr.len_ = n
+            return arr
+
+        i = index
+        ksuid_mutex_lock(&self.mutex_)
+        try:
+            if i < 0:
+                i += self.len_
+            if i < 0 or i >= self.len_:
+                raise IndexError("KsuidArray index out of range")
+            return _new_from_raw(self.ksuid_cls_, self.data_ + i * BASE62_BYTE_LENGTH)
+        finally:
+            ksuid_mutex_unlock(&self.mutex_)
+
+    def __iter__(self):
+        cdef Py_ssize_t i = 0
+        while True:
+            ksuid_mutex_lock(&self.mutex_)
+            try:
+                if i >= self.len_:
+                    return
+                k = _new_from_raw(self.ksuid_cls_, self.data_ + i * BASE62_BYTE_LENGTH)
+            finally:
+                ksuid_mutex_unlock(&self.mutex_)
+            yield k
+            i += 1
+
+    def __contains__(self, value):
+        cdef Py_buffer view
+        cdef size_t index
+        cdef Py_ssize_t n
+        if not PyObject_CheckBuffer(value):
+            return False
+        PyObject_GetBuffer(value, &view, PyBUF_SIMPLE)
+        if view.len != BASE62_BYTE_LENGTH:
+            PyBuffer_Release(&view)
+            return False
+
+        n = self._pin()
+        try:
+            with nogil:
+                index = ksuid_array_find(self.data_, n, <const uint8_t*>view.buf)
+        finally:
+            self._unpin()
+            PyBuffer_Release(&view)
+        return index < <size_t>n
+
+    def __getbuffer__(self, Py_buffer* buffer, int flags):
+        cdef uint8_t* data
+        ksuid_mutex_lock(&self.mutex_)
+        data = self.data_ if self.data_ != NULL else _empty_buf
+        PyBuffer_FillInfo(buffer, self, data, self.len_ * BASE62_BYTE_LENGTH,
+                          self.readonly_, flags)
+        self.exports_ += 1
+        ksuid_mutex_unlock(&self.mutex_)
+
+    def __releasebuffer__(self, Py_buffer* buffer):
+        ksuid_mutex_lock(&self.mutex_)
+        self.exports_ -= 1
+        ksuid_mutex_unlock(&self.mutex_)
+
+    def __reduce_ex__(self, protocol):
+        # Protocol 5 pickles the raw bytes as one buffer, out-of-band when the
+        # pickler has a buffer_callback
+        if protocol >= 5:
+            return _array_from_pickle, (self.ksuid_cls_, PickleBuffer(self))
+        return _array_from_pickle, (self.ksuid_cls_, self.tobytes())
+
+    def __reduce__(self):
+        return self.__reduce_ex__(0)
+
+    def __repr__(self):
+        return "KsuidArray(len=%d, ksuid_cls=%s)" % (self.len_, self.ksuid_cls_.__name__)
+
+    def timestamps_millis(self):
+        """Timestamps of all KSUIDs in milliseconds, as ``array.array('q')``."""
+        cdef array.array out
+        cdef Py_ssize_t n = self._pin()
+        try:
+            out = array.clone(_int64_template, n, False)
+            with nogil:
+                ksuid_array_timestamps_millis(self.ts_size_, self.data_, n,
+                                              <int64_t*>out.data.as_longlongs)
+        finally:
+            self._unpin()
+        return out
+
+    def hash64(self, uint64_t seed=0):
+        """Stable 64-bit hashes of all KSUIDs, as ``array.array('Q')``.
+
+        See :meth:`Ksuid.hash64`.
+        """
+        cdef array.array out
+        cdef Py_ssize_t n = self._pin()
+        try:
+            out = array.clone(_uint64_template, n, False)
+            with nogil:
+                ksuid_array_hash64(self.data_, n, seed, <uint64_t*>out.data.as_ulonglongs)
+        finally:
+            self._unpin()
+        return out
+
+    def datetimes(self):
+        """Timestamps of all KSUIDs as a list of timezone aware datetimes."""
+        cdef array.array millis = self.timestamps_millis()
+        cdef const int64_t* ts = <const int64_t*>millis.data.as_longlongs
+        cdef Py_ssize_t n = len(millis)
+        cdef list out = [None] * n
+        cdef Py_ssize_t i
+        utc = timezone.utc
+        for i in range(n):
+            out[i] = _datetime_from_millis(ts[i], utc)
+        return out
+
+    def sort(self):
+        """Sort the KSUIDs in place."""
+        cdef uint8_t* sorted_data
+        cdef Py_ssize_t n
+        if self.readonly_:
+            raise TypeError("Cannot sort a read-only KsuidArray")
+        # Sorted out of place without the GIL, so concurrent sorts cannot
+        # corrupt each other, then copied back
+        n = self._pin()
+        try:
+            sorted_data = <uint8_t*>PyMem_Malloc(n * BASE62_BYTE_LENGTH + 1)
+            if sorted_data == NULL:
+                raise MemoryError()
+            try:
+                memcpy(sorted_data, self.data_, n * BASE62_BYTE_LENGTH)
+                with nogil:
+                    ksuid_array_sort(sorted_data, n)
+                ksuid_mutex_lock(&self.mutex_)
+                memcpy(self.data_, sorted_data, n * BASE62_BYTE_LENGTH)
+                ksuid_mutex_unlock(&self.mutex_)
+            finally:
+                PyMem_Free(sorted_data)
+        finally:
+            self._unpin()
+
+    def unique(self):
+        """New sorted array of the distinct KSUIDs."""
+        cdef KsuidArray arr = KsuidArray(self, self.ksuid_cls_)
+        with nogil:
+            ksuid_array_sort(arr.data_, arr.len_)
+            arr.len_ = ksuid_array_unique(arr.data_, arr.len_)
+        return arr
+
+    def searchsorted(self, value, side="left"):
+        """Index where ``value`` would be inserted to keep a sorted array sorted.
+
+        :param value: a KSUID or 20 raw bytes.
+        :param str side: ``"left"`` to insert before equal items, ``"right"`` to
+            insert after them.
+        """
+        cdef Py_buffer view
+        cdef size_t index
+        cdef bint right
+        cdef Py_ssize_t n
+
+        if side == "left":
+            right = False
+        elif side == "right":
+            right = True
+        else:
+            raise ValueError("side must be 'left' or 'right', got %r" % (side,))
+
+        _get_ksuid_buffer(value, &view)
+        n = self._pin()
+        try:
+            with nogil:
+                index = ksuid_array_search(self.data_, n, <const uint8_t*>view.buf, right)
+        finally:
+            self._unpin()
+            PyBuffer_Release(&view)
+        return index
+
+    def min(self):
+        """Smallest KSUID of the array."""
+        return self._extreme(False)
+
+    def max(self):
+        """Greatest KSUID of the array."""
+        return self._extreme(True)
+
+    def _extreme(self, bint greatest):
+        cdef size_t index
+        cdef Py_ssize_t n = self._pin()
+        try:
+            if n == 0:
+                raise ValueError("Empty KsuidArray has no %s" % ("max" if greatest else "min"))
+            with nogil:
+                index = ksuid_array_argmin(self.data_, n, greatest)
+            return _new_from_raw(self.ksuid_cls_, self.data_ + index * BASE62_BYTE_LENGTH)
+        finally:
+            self._unpin()
+
+
+def _array_from_pickle(ksuid_cls, buffer):
+    """Rebuild a pickled KsuidArray, viewing ``buffer`` without copying it
+    if it is writable, so the array stays mutable."""
+    cdef KsuidArray arr = KsuidArray.from_buffer(buffer, ksuid_cls)
+    if arr.readonly_:
+        return KsuidArray(arr, ksuid_cls)
+    return arr
+
+
+def dumps_many(ids, ksuid_cls=None):
+    """Serialize KSUIDs into one bytes object: a 16 bytes header followed by
+    the contiguous raw bytes of the IDs.
+
+    :param ids: a KsuidArray, or an iterable of KSUIDs or 20 raw bytes.
+    :param callable ksuid_cls: KSUID class recorded in the header, defaults to
+        the class of the array or of the first KSUID.
+    """
+    cdef KsuidArray arr
+    cdef bytes out
+    cdef uint8_t* p
+    cdef uint64_t n
+    cdef int i
+
+    if isinstance(ids, KsuidArray) and (ksuid_cls is None or ksuid_cls is ids.ksuid_cls):
+        arr = <KsuidArray>ids
+    else:
+        ids = iter(ids)
+        first = next(ids, None)
+        if ksuid_cls is None and isinstance(first, _KsuidMixin):
+            ksuid_cls = type(first)
+        arr = KsuidArray(ksuid_cls=ksuid_cls)
+        if first is not None:
+            arr.append(first)
+            arr.extend(ids)
+
+    ksuid_mutex_lock(&arr.mutex_)
+    try:
+        n = arr.len_
+        out = PyBytes_FromStringAndSize(NULL, _HEADER_SIZE + arr.len_ * BASE62_BYTE_LENGTH)
+        p = <uint8_t*>PyBytes_AS_STRING(out)
+        memcpy(p, <const char*>_MAGIC, len(_MAGIC))
+        p[5] = _FORMAT_VERSION
+        p[6] = arr.ts_size_
+        p[7] = 0
+        for i in range(8):
+            p[8 + i] = (n >> (8 * i)) & 0xff
+        memcpy(p + _HEADER_SIZE, arr.data_, arr.len_ * BASE62_BYTE_LENGTH)
+    finally:
+        ksuid_mutex_unlock(&arr.mutex_)
+    return out
+
+
+def loads_many(data, ksuid_cls=None):
+    """Deserialize KSUIDs written by :func:`dumps_many` into a KsuidArray
+    viewing ``data`` without copying it.
+
+    :param data: buffer starting with a serialized header.
+    :param callable ksuid_cls: KSUID class of the items, defaults to the class
+        recorded in the header.
+    :raises ValueError: if the header is invalid or does not match ``ksuid_cls``.
+    """
+    cdef KsuidArray arr = KsuidArray()
+    cdef const uint8_t* p
+    cdef Py_ssize_t size
+    cdef uint64_t n = 0
+    cdef size_t ts_size
+    cdef int i
+
+    arr._view(data)
+    p = arr.data_
+    size = arr.base_.len
+    if size < _HEADER_SIZE or memcmp(p, <const char*>_MAGIC, len(_MAGIC)) != 0:
+        raise ValueError("Not serialized KSUIDs")
+    if p[5] != _FORMAT_VERSION:
+        raise ValueError("Unsupported serialization format version %d" % p[5])
+    for i in range(8):
+        n |= (<uint64_t>p[8 + i]) << (8 * i)
+    if n != <uint64_t>(size - _HEADER_SIZE) // BASE62_BYTE_LENGTH or \
+            (size - _HEADER_SIZE) % BASE62_BYTE_LENGTH:
+        raise ValueError("Expect %d serialized KSUIDs, got %d bytes" % (n, size))
+
+    ts_size = p[6]
+    if ksuid_cls is None:
+        ksuid_cls = _ksuid_cls_by_ts_size.get(ts_size)
+        if ksuid_cls is None:
+            raise ValueError("Invalid timestamp size %d" % ts_size)
+    elif _timestamp_size(ksuid_cls) != ts_size:
+        raise ValueError("Serialized KSUIDs have a timestamp of %d bytes, %s expects %d"
+                         % (ts_size, ksuid_cls.__name__, _timestamp_size(ksuid_cls)))
+
+    arr.ksuid_cls_ = ksuid_cls
+    arr.ts_size_ = ts_size
+    arr.data_ += _HEADER_SIZE
+    arr.len_ = n
+    return arr
+
+
+cdef int _get_key(object value, uint8_t* key) except -1:
+    cdef Py_buffer view
+    if isinstance(value, _KsuidMixin):
+        memcpy(key, (<_KsuidMixin>value).data_, BASE62_BYTE_LENGTH)
+        return 0
+
+    _get_ksuid_buffer(value, &view)
+    memcpy(key, view.buf, BASE62_BYTE_LENGTH)
+    PyBuffer_Release(&view)
+    return 0
+
+
+cdef bytes _new_bitmap(Py_ssize_t n):
+    cdef bytes bitmap = PyBytes_FromStringAndSize(NULL, (n + 7) // 8)
+    memset(PyBytes_AS_STRING(bitmap), 0, (n + 7) // 8)
+    return bitmap
+
+
+cdef class _KsuidTable:
+    """Base of KsuidSet and KsuidDict: raw KSUIDs stored inline in an open
+    addressing hash table, probed from their random payload bits.
+
+    Items are turned into KSUID objects of ``ksuid_cls`` only when accessed.
+    """
+
+    cdef int _init(self, ksuid_cls, bint with_values) except -1:
+        if not ksuid_cls:
+            ksuid_cls = Ksuid
+        self.ts_size_ = _timestamp_size(ksuid_cls)
+        self.ksuid_cls_ = ksuid_cls
+        self.table_ = KsuidTable(self.ts_size_, with_values)
+        return 0
+
+    @property
+    def ksuid_cls(self):
+        """KSUID class of the items."""
+        return self.ksuid_cls_
+
+    def __len__(self):
+        return self.table_.size()
+
+    def __contains__(self, value):
+        cdef uint8_t key[BASE62_BYTE_LENGTH]
+        cdef Py_buffer view
+        cdef size_t slot
+        if isinstance(value, _KsuidMixin):
+            memcpy(key, (<_KsuidMixin>value).data_, BASE62_BYTE_LENGTH)
+        elif PyObject_CheckBuffer(value):
+            PyObject_GetBuffer(value, &view, PyBUF_SIMPLE)
+            if view.len != BASE62_BYTE_LENGTH:
+                PyBuffer_Release(&view)
+                return False
+            memcpy(key, view.buf, BASE62_BYTE_LENGTH)
+            PyBuffer_Release(&view)
+        else:
+            return False
+
+        ksuid_mutex_lock(&self.mutex_)
+        slot = self.table_.find(key)
+        ksuid_mutex_unlock(&self.mutex_)
+        return slot != KSUID_TABLE_NPOS
+
+    def __iter__(self):
+        # Iterate over a snapshot, so the table may change meanwhile
+        return iter(self._keys())
+
+    def __sizeof__(self):
+        return type(self).__basicsize__ + self.table_.memory()
+
+    def __repr__(self):
+        return "%s(len=%d, ksuid_cls=%s)" % (type(self).__name__, self.table_.size(),
+                                             self.ksuid_cls_.__name__)
+
+    cdef KsuidArray _keys(self):
+        cdef KsuidArray arr = KsuidArray(ksuid_cls=self.ksuid_cls_)
+        cdef size_t i
+        ksuid_mutex_lock(&self.mutex_)
+        try:
+            arr._reserve(self.table_.size())
+            for i in range(self.table_.slots()):
+                if self.table_.used(i):
+                    memcpy(arr.data_ + arr.len_ * BASE62_BYTE_LENGTH, self.table_.key(i),
+                           BASE62_BYTE_LENGTH)
+                    arr.len_ += 1
+        finally:
+            ksuid_mutex_unlock(&self.mutex_)
+        return arr
+
+    def expire(self, int64_t window_millis, now_millis=None):
+        """Remove the KSUIDs with a timestamp more than ``window_millis`` before
+        ``now_millis``.
+
+        The first call indexes the KSUIDs by time, in buckets of about a second.
+        Later calls only visit the oldest buckets, so the cost is proportional to
+        the number of KSUIDs removed rather than to the size of the table. The
+        index takes about 20 more bytes per KSUID.
+
+        :param int now_millis: Unix time in milliseconds, defaults to now.
+        :return: number of KSUIDs removed.
+        """
+        cdef int64_t now = ksuid_now_millis() if now_millis is None else now_millis
+        cdef size_t n
+        ksuid_mutex_lock(&self.mutex_)
+        try:
+            n = self.table_.evict_before(now - window_millis)
+        finally:
+            ksuid_mutex_unlock(&self.mutex_)
+        return n
+
+    def clear(self):
+        """Remove all KSUIDs and release the memory of the table."""
+        ksuid_mutex_lock(&self.mutex_)
+        self.table_.clear()
+        ksuid_mutex_unlock(&self.mutex_)
+
+
+cdef class KsuidSet(_KsuidTable):
+    """Set of KSUIDs stored inline in an open addressing hash table.
+
+    An entry takes about 40 bytes, against well over 100 bytes for a KSUID
+    object in a ``set``.
+
+    :param iterable: KSUIDs or 20 raw bytes, or a buffer of contiguous raw
+        KSUIDs such as a KsuidArray.
+    :param callable ksuid_cls: KSUID class of the items, defaults to Ksuid.
+    """
+
+    def __init__(self, iterable=None, ksuid_cls=None):
+        self._init(ksuid_cls, False)
+        if iterable is None:
+            return
+        if PyObject_CheckBuffer(iterable):
+            self.add_many(iterable)
+            return
+        for value in iterable:
+            self.add(value)
+
+    def __reduce__(self):
+        return type(self), (self._keys(), self.ksuid_cls_)
+
+    def add(self, value):
+        """Add a KSUID, or 20 raw bytes."""
+        cdef uint8_t key[BASE62_BYTE_LENGTH]
+        cdef cpp_bool inserted
+        _get_key(value, key)
+        ksuid_mutex_lock(&self.mutex_)
+        try:
+            self.table_.insert(key, &inserted)
+        finally:
+            ksuid_mutex_unlock(&self.mutex_)
+
+    def discard(self, value):
+        """Remove a KSUID, or 20 raw bytes, if present."""
+        cdef uint8_t key[BASE62_BYTE_LENGTH]
+        cdef size_t slot
+        _get_key(value, key)
+        ksuid_mutex_lock(&self.mutex_)
+        slot = self.table_.find(key)
+        if slot != KSUID_TABLE_NPOS:
+            self.table_.erase_at(slot)
+        ksuid_mutex_unlock(&self.mutex_)
+
+    def add_many(self, buffer):
+        """Add contiguous raw KSUIDs.
+
+        :param buffer: buffer of ``20 * n`` raw bytes, e.g. a KsuidArray.
+        :return: a bitmap as bytes, bit ``i % 8`` of byte ``i // 8`` is set if
+            KSUID ``i`` was not in the set before, i.e. is not a duplicate.
+        """
+        cdef Py_buffer view
+        cdef Py_ssize_t n = _get_records(buffer, &view, PyBUF_SIMPLE, BASE62_BYTE_LENGTH)
+        cdef bytes bitmap
+        try:
+            bitmap = _new_bitmap(n)
+            ksuid_mutex_lock(&self.mutex_)
+            try:
+                self.table_.insert_many(<const uint8_t*>view.buf, n,
+                                        <uint8_t*>PyBytes_AS_STRING(bitmap))
+            finally:
+                ksuid_mutex_unlock(&self.mutex_)
+        finally:
+            PyBuffer_Release(&view)
+        return bitmap
+
+    def contains_many(self, buffer):
+        """Test contiguous raw KSUIDs for membership.
+
+        :param buffer: buffer of ``20 * n`` raw bytes, e.g. a KsuidArray.
+        :return: a bitmap as bytes, bit ``i % 8`` of byte ``i // 8`` is set if
+            KSUID ``i`` is in the set.
+        """
+        cdef Py_buffer view
+        cdef Py_ssize_t n = _get_records(buffer, &view, PyBUF_SIMPLE, BASE62_BYTE_LENGTH)
+        cdef bytes bitmap
+        try:
+            bitmap = _new_bitmap(n)
+            ksuid_mutex_lock(&self.mutex_)
+            self.table_.find_many(<const uint8_t*>view.buf, n,
+                                  <uint8_t*>PyBytes_AS_STRING(bitmap))
+            ksuid_mutex_unlock(&self.mutex_)
+        finally:
+            PyBuffer_Release(&view)
+        return bitmap
+
+    def to_array(self):
+        """KSUIDs of the set as a new KsuidArray, in no particular order."""
+        return self._keys()
+
+
+def _dict_from_pickle(ksuid_cls, keys, values):
+    return KsuidDict(zip(KsuidArray.from_buffer(keys, ksuid_cls), values), ksuid_cls)
+
+
+cdef class KsuidDict(_KsuidTable):
+    """Mapping of KSUIDs to int64 values stored inline in an open addressing
+    hash table.
+
+    :param items: mapping or iterable of ``(key, value)`` pairs, keys are
+        KSUIDs or 20 raw bytes.
+    :param callable ksuid_cls: KSUID class of the keys, defaults to Ksuid.
+    """
+
+    def __init__(self, items=None, ksuid_cls=None):
+        self._init(ksuid_cls, True)
+        if items is None:
+            return
+        if hasattr(items, "items"):
+            items = items.items()
+        for key, value in items:
+            self[key] = value
+
+    def __reduce__(self):
+        return _dict_from_pickle, (self.ksuid_cls_, self._keys(), self.values())
+
+    def __getitem__(self, key):
+        cdef uint8_t raw[BASE62_BYTE_LENGTH]
+        cdef size_t slot
+        cdef int64_t value
+        _get_key(key, raw)
+        ksuid_mutex_lock(&self.mutex_)
+        slot = self.table_.find(raw)
+        if slot != KSUID_TABLE_NPOS:
+            value = self.table_.value(slot)
+        ksuid_mutex_unlock(&self.mutex_)
+        if slot == KSUID_TABLE_NPOS:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, int64_t value):
+        cdef uint8_t raw[BASE62_BYTE_LENGTH]
+        cdef cpp_bool inserted
+        _get_key(key, raw)
+        ksuid_mutex_lock(&self.mutex_)
+        try:
+            self.table_.set_value(self.table_.insert(raw, &inserted), value)
+        finally:
+            ksuid_mutex_unlock(&self.mutex_)
+
+    def __delitem__(self, key):
+        cdef uint8_t raw[BASE62_BYTE_LENGTH]
+        cdef size_t slot
+        _get_key(key, raw)
+        ksuid_mutex_lock(&self.mutex_)
+        slot = self.table_.find(raw)
+        if slot != KSUID_TABLE_NPOS:
+            self.table_.erase_at(slot)
+        ksuid_mutex_unlock(&self.mutex_)
+        if slot == KSUID_TABLE_NPOS:
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+        """Value of ``key``, or ``default`` if absent."""
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        """Keys as a new KsuidArray, in no particular order."""
+        return self._keys()
+
+    def values(self):
+        """Values as ``array.array('q')``, in the order of :meth:`keys`."""
+        cdef array.array out = array.clone(_int64_template, 0, False)
+        cdef Py_ssize_t n = 0
+        cdef size_t i
+        ksuid_mutex_lock(&self.mutex_)
+        try:
+            array.resize(out, self.table_.size())
+            for i in range(self.table_.slots()):
+                if self.table_.used(i):
+                    out.data.as_longlongs[n] = self.table_.value(i)
+                    n += 1
+        finally:
+            ksuid_mutex_unlock(&self.mutex_)
+        return out
+
+    def items(self):
+        """List of ``(key, value)`` pairs, in no particular order."""
+        cdef list out = []
+        cdef size_t i
+        ksuid_mutex_lock(&self.mutex_)
+        try:
+            for i in range(self.table_.slots()):
+                if self.table_.used(i):
+                    out.append((_new_from_raw(self.ksuid_cls_, self.table_.key(i)),
+                                self.table_.value(i)))
+        finally:
+            ksuid_mutex_unlock(&self.mutex_)
+        return out
+
+
+cdef void _partition_parallel(const uint8_t* data, size_t n, uint64_t seed,
+                              int32_t n_partitions, uint32_t* out, int threads) noexcept nogil:
+    cdef Py_ssize_t chunk = (n + threads - 1) // threads
+    cdef Py_ssize_t t
+    cdef Py_ssize_t start
+
+    if threads <= 1:
+        ksuid_array_partition(data, n, seed, n_partitions, out)
+        return
+
+    for t in prange(threads, num_threads=threads, schedule="static"):
+        start = t * chunk
+        if start < <Py_ssize_t>n:
+            ksuid_array_partition(data + start * BASE62_BYTE_LENGTH,
+                                  min(chunk, <Py_ssize_t>n - start), seed, n_partitions,
+                                  out + start)
+
+
+def partition_many(buffer, Py_ssize_t n_partitions, uint64_t seed=0, bint split=False,
+                   threads=None):
+    """Assign raw KSUIDs to ``n_partitions`` partitions, e.g. Kafka partitions
+    or database shards.
+
+    The partition is the jump consistent hash of :meth:`Ksuid.hash64` with
+    ``seed``, so it is the same in every process. Growing from ``n`` to
+    ``n + 1`` partitions only moves the IDs that land in the new partition.
+
+    :param buffer: contiguous buffer of ``20 * n`` raw bytes, e.g. a KsuidArray.
+    :param int n_partitions: number of partitions, at least 1.
+    :param int seed: seed of the hash.
+    :param bool split: return the raw KSUIDs of each partition instead of
+        partition indices.
+    :param int threads: split the work across this many threads, 0 for one
+        per CPU. Serial if the extension was built without OpenMP.
+    :return: partition of every KSUID as ``array.array('I')``, or if ``split``
+        is true a list of ``n_partitions`` bytes objects holding the raw
+        KSUIDs of each partition in input order.
+    """
+    cdef Py_buffer view
+    cdef Py_ssize_t n
+    cdef Py_ssize_t i
+    cdef int n_threads
+    cdef array.array partitions
+    cdef const uint32_t* indices
+    cdef Py_ssize_t* counts = NULL
+    cdef uint8_t** cursors = NULL
+    cdef list out
+
+    if not 0 < n_partitions <= INT32_MAX:
+        raise ValueError("n_partitions must be between 1 and %d, got %d"
+                         % (INT32_MAX, n_partitions))
+
+    n = _get_records(buffer, &view, PyBUF_SIMPLE, BASE62_BYTE_LENGTH)
+    try:
+        n_threads = _resolve_threads(threads, n)
+        partitions = array.clone(_uint32_template, n, False)
+        indices = <const uint32_t*>partitions.data.as_uints
+        with nogil:
+            _partition_parallel(<const uint8_t*>view.buf, n, seed, <int32_t>n_partitions,
+                                <uint32_t*>indices, n_threads)
+        if not split:
+            return partitions
+
+        counts = <Py_ssize_t*>PyMem_Malloc(n_partitions * sizeof(Py_ssize_t))
+        cursors = <uint8_t**>PyMem_Malloc(n_partitions * sizeof(uint8_t*))
+        if counts == NULL or cursors == NULL:
+            raise MemoryError()
+        with nogil:
+            memset(counts, 0, n_partitions * sizeof(Py_ssize_t))
+            for i in range(n):
+                counts[indices[i]] += 1
+
+        out = [None] * n_partitions
+        for i in range(n_partitions):
+            part = PyBytes_FromStringAndSize(NULL, counts[i] * BASE62_BYTE_LENGTH)
+            out[i] = part
+            cursors[i] = <uint8_t*>PyBytes_AS_STRING(part)
+        with nogil:
+            ksuid_array_scatter(<const uint8_t*>view.buf, n, indices, cursors)
+        return out
+    finally:
+        PyMem_Free(counts)
+        PyMem_Free(cursors)
+        PyBuffer_Release(&view)
+
+
+# Cap of KSUIDs per KsuidArray yielded by merge_sorted()
+MERGE_BATCH_SIZE = 1 << 16
+
+
+def merge_sorted(*iterables, bint dedupe=False, ksuid_cls=None,
+                 Py_ssize_t batch_size=MERGE_BATCH_SIZE):
+    """Merge sorted inputs of KSUIDs into one sorted iterator.
+
+    If every input is a buffer of raw KSUIDs (a KsuidArray, bytes, ...), the
+    merge runs without creating objects and yields KsuidArray batches of at
+    most ``batch_size`` KSUIDs. Otherwise inputs are iterables of KSUID objects
+    or 20 raw bytes, which are yielded as they are. Equal KSUIDs are yielded in
+    the order of their inputs.
+
+    :param bool dedupe: drop KSUIDs equal to the previously yielded one.
+    :param callable ksuid_cls: KSUID class of the batches, defaults to the
+        class of the first KsuidArray input or Ksuid.
+    :param int batch_size: maximum number of KSUIDs per batch.
+    """
+    if batch_size <= 0:
+        raise ValueError("batch_size must be positive, got %d" % batch_size)
+    if iterables and all(PyObject_CheckBuffer(it) for it in iterables):
+        return _KsuidArrayMergeIterator(iterables, dedupe, ksuid_cls, batch_size)
+    return _KsuidMergeIterator(iterables, dedupe)
+
+
+cdef class _KsuidArrayMergeIterator:
+    cdef list arrays_
+    cdef KsuidArrayMerger merger_
+    cdef bint dedupe_
+    cdef type ksuid_cls_
+    cdef Py_ssize_t batch_size_
+
+    def __init__(self, tuple buffers, bint dedupe, ksuid_cls, Py_ssize_t batch_size):
+        cdef KsuidArray arr
+        if ksuid_cls is None:
+            ksuid_cls = next((b.ksuid_cls for b in buffers if isinstance(b, KsuidArray)), Ksuid)
+        # Views keep the buffers alive and locked while merging
+        self.arrays_ = [KsuidArray.from_buffer(b, ksuid_cls) for b in buffers]
+        for arr in self.arrays_:
+            self.merger_.add(arr.data_, arr.len_)
+        self.dedupe_ = dedupe
+        self.ksuid_cls_ = ksuid_cls
+        self.batch_size_ = batch_size
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        cdef Py_ssize_t n = min(<Py_ssize_t>self.merger_.remaining(), self.batch_size_)
+        cdef KsuidArray out
+        if n == 0:
+            self.arrays_ = []
+            raise StopIteration
+
+        out = KsuidArray(ksuid_cls=self.ksuid_cls_)
+        out._reserve(n)
+        with nogil:
+            out.len_ = self.merger_.next(out.data_, n, self.dedupe_)
+        if out.len_ == 0:
+            self.arrays_ = []
+            raise StopIteration
+        return out
+
+
+cdef class _KsuidMergeIterator:
+    cdef list iterators_
+    # Current item of every input, keeps the KSUID in the heap alive
+    cdef list current_
+    cdef KsuidMergeHeap heap_
+    cdef bint dedupe_
+    cdef bint started_
+    cdef uint8_t last_[BASE62_BYTE_LENGTH]
+
+    def __init__(self, tuple iterables, bint dedupe):
+        cdef size_t source
+        self.iterators_ = [iter(it) for it in iterables]
+        self.current_ = [None] * len(iterables)
+        self.dedupe_ = dedupe
+        for source in range(len(iterables)):
+            self._advance(source, False)
+
+    cdef int _advance(self, size_t source, bint replace) except -1:
+        cdef const uint8_t* data
+        try:
+            item = next(self.iterators_[source])
+        except StopIteration:
+            self.current_[source] = None
+            if replace:
+                self.heap_.pop()
+            return 0
+
+        if isinstance(item, _KsuidMixin):
+            data = (<_KsuidMixin>item).data_
+        elif PyBytes_CheckExact(item) and PyBytes_GET_SIZE(item) == BASE62_BYTE_LENGTH:
+            data = <const uint8_t*>PyBytes_AS_STRING(item)
+        else:
+            raise TypeError("Expect a KSUID or %d raw bytes, got %r"
+                            % (BASE62_BYTE_LENGTH, item))
+        self.current_[source] = item
+        if replace:
+            self.heap_.replace_top(data)
+        else:
+            self.heap_.push(data, source)
+        return 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        cdef size_t source
+        cdef const uint8_t* data
+        cdef bint emit
+        while not self.heap_.empty():
+            source = self.heap_.top().source
+            data = self.heap_.top().data
+            item = self.current_[source]
+            emit = not self.dedupe_ or not self.started_ or \
+                memcmp(self.last_, data, BASE62_BYTE_LENGTH) != 0
+            if emit:
+                memcpy(self.last_, data, BASE62_BYTE_LENGTH)
+                self.started_ = True
+            self._advance(source, True)
+            if emit:
+                return item
+        raise StopIteration
+
+
+cdef Py_ssize_t _get_records(object src, Py_buffer* view, int flags,
+                             Py_ssize_t itemsize, Py_ssize_t n=-1) except -1:
+    PyObject_GetBuffer(src, view, flags)
+    if view.len % itemsize or (n >= 0 and view.len != n * itemsize):
+        PyBuffer_Release(view)
+        if n >= 0:
+            raise ValueError("Expect a buffer of %d bytes" % (n * itemsize))
+        raise ValueError("Buffer size must be a multiple of %d" % itemsize)
+    return view.len // itemsize
+
+
+def _timestamps_millis_into(src, out, ksuid_cls=None):
+    """Write timestamps of raw KSUIDs in ``src`` into the int64 buffer ``out``."""
+    cdef size_t ts_size = _timestamp_size(ksuid_cls or Ksuid)
+    cdef Py_buffer src_view
+    cdef Py_buffer out_view
+    cdef Py_ssize_t n = _get_records(src, &src_view, PyBUF_SIMPLE, BASE62_BYTE_LENGTH)
+    try:
+        _get_records(out, &out_view, PyBUF_WRITABLE, sizeof(int64_t), n)
+        try:
+            with nogil:
+                ksuid_array_timestamps_millis(ts_size, <const uint8_t*>src_view.buf, n,
+                                              <int64_t*>out_view.buf)
+        finally:
+            PyBuffer_Release(&out_view)
+    finally:
+        PyBuffer_Release(&src_view)
+
+
+def _assign_into(out, timestamps, payloads, ksuid_cls=None):
+    """Build raw KSUIDs into ``out`` from int64 millisecond ``timestamps`` and
+    contiguous ``payloads``."""
+    cdef size_t ts_size = _timestamp_size(ksuid_cls or Ksuid)
+    cdef Py_buffer out_view
+    cdef Py_buffer ts_view
+    cdef Py_buffer payload_view
+    cdef Py_ssize_t n = _get_records(timestamps, &ts_view, PyBUF_SIMPLE, sizeof(int64_t))
+    try:
+        _get_records(payloads, &payload_view, PyBUF_SIMPLE,
+                     BASE62_BYTE_LENGTH - ts_size, n)
+        try:
+            _get_records(out, &out_view, PyBUF_WRITABLE, BASE62_BYTE_LENGTH, n)
+            try:
+                with nogil:
+                    ksuid_array_assign(ts_size, <uint8_t*>out_view.buf,
+                                       <const int64_t*>ts_view.buf,
+                                       <const uint8_t*>payload_view.buf, n)
+            finally:
+                PyBuffer_Release(&out_view)
+        finally:
+            PyBuffer_Release(&payload_view)
+    finally:
+        PyBuffer_Release(&ts_view)
@@ -1,38 +1,103 @@
+from cpython.object cimport PyObject
 from libc.stdint cimport *
 
+from cyksuid.fast_base62 cimport BASE62_BYTE_LENGTH
+
 
 cdef extern from "ksuidlite.h" nogil:
-    cdef cppclass MemoryView:
-        const uint8_t* data
-        const size_t size
-
-    cdef cppclass KsuidLite:
-        void assign(const uint8_t*, size_t) except +
-        void assign(int64_t, const uint8_t*, size_t) except +
-        void assign_from_payload(const uint8_t*, size_t) except +
-
-        int64_t timestamp_millis()
-        MemoryView payload()
-        MemoryView raw()
-
-        bint empty()
-        bint operator<(KsuidLite)
-        bint operator<=(KsuidLite)
-        bint operator==(KsuidLite)
-        bint operator!=(KsuidLite)
-
-    cdef cppclass _Ksuid "Ksuid"(KsuidLite):
+    void ksuid_assign_raw(uint8_t* dst, const uint8_t* data, size_t data_size) except +
+    void ksuid_assign(size_t ts_size, uint8_t* dst, int64_t ts,
+                      const uint8_t* payload, size_t payload_size) except +
+    void ksuid_assign_from_payload(size_t ts_size, uint8_t* dst,
+                                   const uint8_t* payload, size_t payload_size) except +
+
+    int64_t ksuid_timestamp_millis(size_t ts_size, const uint8_t* data)
+    bint ksuid_empty(const uint8_t* data)
+    int ksuid_compare(const uint8_t* a, const uint8_t* b)
+    uint64_t ksuid_hash64(const uint8_t* data, uint64_t seed)
+    int32_t ksuid_jump_bucket(uint64_t key, int32_t buckets)
+    int64_t ksuid_now_millis()
+
+    enum KsuidClockKind:
+        KSUID_CLOCK_REALTIME
+        KSUID_CLOCK_COARSE
+        KSUID_CLOCK_CACHED
+        KSUID_CLOCK_MANUAL
+
+    ctypedef struct KsuidClock:
+        int kind
+        int64_t millis
+        int64_t step
+        int64_t max_uses
+        int64_t uses_left
+
+    int64_t ksuid_clock_millis(KsuidClock* clock)
+
+    ctypedef struct KsuidCivilTime:
+        int64_t year
+        int month
+        int day
+        int hour
+        int minute
+        int second
+        int microsecond
+
+    void ksuid_civil_from_millis(int64_t ms, KsuidCivilTime* out)
+    void ksuid_assign_many(size_t ts_size, uint8_t* dst, int64_t ts,
+                           const uint8_t* payload, size_t n)
+
+    const bint KSUID_HAS_OS_RANDOM
+    bint ksuid_os_random(uint8_t* dst, size_t n)
+    bint ksuid_thread_random(uint8_t* dst, size_t n)
+    void ksuid_entropy_after_fork()
+
+    ctypedef struct KsuidSequenceState:
+        uint8_t last[BASE62_BYTE_LENGTH]
+        uint8_t started
+
+    bint ksuid_sequence_advance(const KsuidSequenceState* state, size_t ts_size,
+                                int64_t ts, uint8_t* dst) except +
+    void ksuid_sequence_commit(KsuidSequenceState* state, uint8_t* dst) except +
+
+    ctypedef struct KsuidSharedSequence:
         pass
 
-    cdef cppclass _Ksuid40 "Ksuid40"(KsuidLite):
-        pass
+    void ksuid_shared_sequence_next(KsuidSharedSequence* shared, size_t ts_size, int64_t ts,
+                                    const uint8_t* payload, uint8_t* dst) except +
+
+
+cdef extern from "ksuidlock.h":
+    const bint KSUID_FREE_THREADED
 
-    cdef cppclass _Ksuid48 "Ksuid48"(KsuidLite):
+    ctypedef struct KsuidMutex:
         pass
 
+    void ksuid_mutex_lock(KsuidMutex* m) nogil
+    void ksuid_mutex_unlock(KsuidMutex* m) nogil
+    PyObject* ksuid_publish_once(PyObject** slot, PyObject* empty, PyObject* value)
+    PyObject* ksuid_load_once(PyObject** slot)
+
+
+cdef class EntropyPool:
+    """Buffered source of OS randomness."""
+
+    cdef bytes buf_
+    cdef Py_ssize_t size_
+    cdef Py_ssize_t pos_
+    cdef KsuidMutex mutex_
+    cdef object __weakref__
+
+    cdef int fill(self, uint8_t* dst, Py_ssize_t n) except -1
+
 
 cdef class _KsuidMixin(object):
-    cdef KsuidLite* uid_
+    cdef uint8_t data_[BASE62_BYTE_LENGTH]
+    # Timestamp size of the class layout, set by each concrete class
+    cdef uint8_t ts_size_
+    # Cached hash, 0 if not computed yet
+    cdef Py_hash_t hash_
+    # Cached base62 str, an owned reference set once, NULL if not computed yet
+    cdef PyObject* str_
 
 
 cdef class Ksuid(_KsuidMixin):
@@ -47,4 +112,63 @@ cdef class Ksuid48(_KsuidMixin):
     """KSUID with 48 bit timestamp."""
 
 
+cdef class Clock:
+    """Native time source for KSUID generation."""
+
+    cdef KsuidClock clock_
+    # Cached and manual clocks update clock_ on every reading
+    cdef KsuidMutex mutex_
+
+    cdef int64_t read(self) noexcept
+
+
+cdef class RealtimeClock(Clock):
+    """Precise wall clock."""
+
+
+cdef class CoarseClock(Clock):
+    """Wall clock at the resolution of the scheduler tick."""
+
+
+cdef class CachedClock(Clock):
+    """Wall clock read once for a number of IDs."""
+
+
+cdef class ManualClock(Clock):
+    """Clock set and advanced by hand."""
+
+
+cdef class KsuidSequence:
+    """Generator of strictly increasing KSUIDs."""
+
+    cdef KsuidSequenceState state_
+    cdef type ksuid_cls_
+    cdef size_t ts_size_
+    cdef object time_func_
+    cdef object rand_func_
+    cdef Clock clock_
+    cdef KsuidMutex mutex_
+
+    cdef int64_t _now_millis(self) except? -1
+    cdef int _fill_payload(self, uint8_t* dst, size_t n) except -1
+    cdef _KsuidMixin next_ksuid(self)
+
+
+cdef class SharedKsuidSequence(KsuidSequence):
+    """Generator of strictly increasing KSUIDs shared between processes."""
+
+    cdef Py_buffer view_
+    cdef KsuidSharedSequence* shared_
+    # File mapping owned by the sequence, if created by open()
+    cdef object mmap_
+
+
+# Construct a KSUID of the given class from 20 raw bytes
+cdef _KsuidMixin _new_from_raw(type ksuid_cls, const uint8_t* raw)
+# Timestamp size of a KSUID class, raises TypeError for other objects
+cdef size_t _timestamp_size(object ksuid_cls) except 0
+# datetime of Unix time in milliseconds, naive if tz is None
+cdef object _datetime_from_millis(int64_t ms, object tz)
+
+
 # cpdef Ksuid parse(s, object ksuid_cls=*)
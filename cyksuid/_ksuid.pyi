@@ -1,6 +1,21 @@
 import functools
+import os
 from datetime import datetime
-from typing import Any, Callable, Optional, Type, TypeVar, overload
+from typing import (
+    Any,
+    Callable,
+    Generic,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+    overload,
+)
 
 from cyksuid import hints
 
@@ -8,8 +23,55 @@ BYTE_LENGTH: int
 STRING_ENCODED_LENGTH: int
 EMPTY_BYTES: hints.Bytes
 MAX_ENCODED: hints.Bytes
+SHARED_SEQUENCE_SIZE: int
 
 SelfT = TypeVar("SelfT", bound="Ksuid")
+T = TypeVar("T")
+
+class EntropyPool:
+    """Buffered source of OS randomness.
+
+    Reads ``size`` bytes from ``os.urandom`` at once and hands them out in
+    slices. Buffered bytes are dropped in the child process after ``fork()``.
+    Instances can be passed as ``rand_func``.
+    """
+
+    def __init__(self, size: int = 4096) -> None: ...
+    def __call__(self, n: int) -> bytes:
+        """Return ``n`` random bytes."""
+    def reset(self) -> None:
+        """Drop buffered bytes, the next request reads from the OS again."""
+
+class Clock:
+    """Native time source for KSUID generation.
+
+    Clocks are passed as ``clock`` to :func:`ksuid`, :func:`generate_many` and
+    the sequence classes, and are read without calling back into Python.
+    """
+
+    def now_millis(self) -> int:
+        """Read the clock, in milliseconds since the Unix epoch."""
+
+class RealtimeClock(Clock):
+    """Precise wall clock, as used when no clock is given."""
+
+class CoarseClock(Clock):
+    """Wall clock at the resolution of the scheduler tick, cheaper to read."""
+
+class CachedClock(Clock):
+    """Wall clock read once and reused for ``max_uses`` readings."""
+
+    def __init__(self, max_uses: int = 256) -> None: ...
+    def refresh(self) -> None:
+        """Read the wall clock again on the next reading."""
+
+class ManualClock(Clock):
+    """Clock set and advanced by hand, for tests and load generation."""
+
+    millis: int
+    def __init__(self, millis: int = 0, step: int = 0) -> None: ...
+    def advance(self, millis: int) -> None:
+        """Move the clock forward by ``millis``."""
 
 @functools.total_ordering
 class Ksuid:
@@ -23,10 +85,10 @@ class Ksuid:
     def __init__(self) -> None:
         """Create a new KSUID with current timestamp and generated random payload."""
     @overload
-    def __init__(self, raw: hints.Bytes) -> None:
+    def __init__(self, raw: hints.Buffer) -> None:
         """Create a new KSUID from raw bytes."""
     @overload
-    def __init__(self, timestamp: hints.IntOrFloat, payload: hints.Bytes) -> None:
+    def __init__(self, timestamp: hints.IntOrFloat, payload: hints.Buffer) -> None:
         """Create a new KSUID from specified timestamp in milliseconds and payload."""
     @overload
     def __init__(self, **kwargs: Any) -> None: ...
@@ -34,20 +96,28 @@ class Ksuid:
     def from_timestamp(cls: Type[SelfT], timestamp: hints.IntOrFloat) -> SelfT:
         """Create a new KSUID with specified timestamp and generated random payload."""
     @classmethod
-    def from_payload(cls: Type[SelfT], payload: hints.Bytes) -> SelfT:
+    def from_payload(cls: Type[SelfT], payload: hints.Buffer) -> SelfT:
         """Create a new KSUID with current timestamp and specified payload."""
     @classmethod
     def from_timestamp_and_payload(
-        cls: Type[SelfT], timestamp: hints.IntOrFloat, payload: hints.Bytes
+        cls: Type[SelfT], timestamp: hints.IntOrFloat, payload: hints.Buffer
     ) -> SelfT:
         """Create a new KSUID from specified timestamp in milliseconds and payload."""
     @classmethod
-    def from_bytes(cls: Type[SelfT], raw: hints.Bytes) -> SelfT:
+    def from_bytes(cls: Type[SelfT], raw: hints.Buffer) -> SelfT:
         """Create a new KSUID from raw bytes."""
     def __bool__(self) -> bool: ...
     def __lt__(self, other: object) -> bool: ...
     def __eq__(self, other: object) -> bool: ...
     def __bytes__(self) -> hints.Bytes: ...
+    def __hash__(self) -> int: ...
+    def hash64(self, seed: int = 0) -> int:
+        """Stable 64-bit hash of the raw bytes (XXH64), independent of ``PYTHONHASHSEED``."""
+    def __reduce__(self) -> Tuple[Any, ...]: ...
+    def __copy__(self: SelfT) -> SelfT: ...
+    def __deepcopy__(self: SelfT, memo: Any) -> SelfT: ...
+    def __buffer__(self, flags: int) -> memoryview:
+        """Read-only view of the raw bytes."""
     @property
     def datetime(self) -> datetime:
         """Datetime for timestamp (timezone aware)."""
@@ -73,20 +143,158 @@ class Ksuid40(Ksuid):
 class Ksuid48(Ksuid):
     """KSUID with 48 bit timestamp."""
 
+class KsuidSequence(Generic[SelfT]):
+    """Generator of strictly increasing KSUIDs.
+
+    The first KSUID of a timestamp tick gets a random payload, later KSUIDs of
+    the same tick increment the payload of the previous one as a big-endian
+    counter.
+    """
+
+    @overload
+    def __init__(
+        self: "KsuidSequence[Ksuid]",
+        ksuid_cls: None = None,
+        time_func: Optional[hints.TimeFunc] = None,
+        rand_func: Optional[hints.RandFunc] = None,
+        clock: Optional["Clock"] = None,
+    ) -> None: ...
+    @overload
+    def __init__(
+        self,
+        ksuid_cls: Type[SelfT],
+        time_func: Optional[hints.TimeFunc] = None,
+        rand_func: Optional[hints.RandFunc] = None,
+        clock: Optional["Clock"] = None,
+    ) -> None: ...
+    def __call__(self) -> SelfT:
+        """Return the next KSUID of the sequence."""
+    def __iter__(self) -> Iterator[SelfT]: ...
+    def __next__(self) -> SelfT: ...
+
+class SharedKsuidSequence(KsuidSequence[SelfT]):
+    """Generator of strictly increasing KSUIDs shared between processes.
+
+    The sequence state lives in ``buffer``, a writable buffer of at least
+    ``SHARED_SEQUENCE_SIZE`` bytes mapped in every process: the ``buf`` of a
+    ``multiprocessing.shared_memory.SharedMemory`` or an mmap of a file.
+    Zero-filled memory is a new sequence. All processes must use the same
+    ``ksuid_cls``.
+    """
+
+    @overload
+    def __init__(
+        self: "SharedKsuidSequence[Ksuid]",
+        buffer: hints.WritableBuffer,
+        ksuid_cls: None = None,
+        time_func: Optional[hints.TimeFunc] = None,
+        rand_func: Optional[hints.RandFunc] = None,
+        clock: Optional["Clock"] = None,
+    ) -> None: ...
+    @overload
+    def __init__(
+        self,
+        buffer: hints.WritableBuffer,
+        ksuid_cls: Type[SelfT],
+        time_func: Optional[hints.TimeFunc] = None,
+        rand_func: Optional[hints.RandFunc] = None,
+        clock: Optional["Clock"] = None,
+    ) -> None: ...
+    @classmethod
+    def open(
+        cls,
+        path: Union[str, "os.PathLike[str]"],
+        ksuid_cls: Optional[Type[SelfT]] = None,
+        time_func: Optional[hints.TimeFunc] = None,
+        rand_func: Optional[hints.RandFunc] = None,
+        clock: Optional["Clock"] = None,
+    ) -> "SharedKsuidSequence[SelfT]":
+        """Attach to a sequence stored in the file at ``path``, created if missing."""
+    def close(self) -> None:
+        """Detach from the shared memory."""
+    def __enter__(self) -> "SharedKsuidSequence[SelfT]": ...
+    def __exit__(self, *args: Any) -> None: ...
+
 def ksuid(
     time_func: Optional[hints.TimeFunc] = None,
     rand_func: Optional[hints.RandFunc] = None,
     ksuid_cls: Optional[Type[SelfT]] = None,
+    clock: Optional["Clock"] = None,
 ) -> SelfT:
     """Factory to construct KSUID objects.
 
     :param time_func: function for generating time, defaults to time.time.
-    :param rand_func: function for generating random bytes, defaults to os.urandom.
+    :param rand_func: function for generating random bytes, defaults to a shared
+        EntropyPool.
     :param ksuid_cls: class to use for KSUID, defaults to Ksuid
+    :param clock: native time source, exclusive with ``time_func``.
+    """
+
+def set_encoded_cache(enabled: bool) -> None:
+    """Enable or disable caching of the base62 string form on KSUID instances."""
+
+def generate_many(
+    n: int,
+    ksuid_cls: Optional[Type[Ksuid]] = None,
+    encoded: bool = False,
+    threads: Optional[int] = None,
+    clock: Optional["Clock"] = None,
+) -> hints.Bytes:
+    """Generate KSUIDs in bulk into one contiguous buffer.
+
+    :param n: number of KSUIDs to generate.
+    :param ksuid_cls: class to use for KSUID, defaults to Ksuid
+    :param encoded: return base62 encoded IDs instead of raw bytes.
+    :param threads: split the work across this many threads, 0 for one per CPU.
+    :param clock: native time source, cached and manual clocks are read once per call.
+    """
+
+def _naive_datetime(ms: int) -> datetime: ...
+class ParseCacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    capacity: int
+
+def set_parse_cache(capacity: int, ksuid_cls: Optional[Type[Ksuid]] = None) -> None:
+    """Cache up to ``capacity`` KSUIDs parsed from str or bytes by ``parse()``.
+
+    Hits return the same immutable instance. Entries are evicted with the CLOCK
+    algorithm. Setting the capacity again clears the cache and its counters,
+    a capacity of 0 disables it.
     """
 
-def parse(s: hints.StrOrBytes, ksuid_cls: Optional[Type[SelfT]] = None) -> SelfT:
-    """Parse KSUID from base62 encoded form."""
+def parse_cache_info(ksuid_cls: Optional[Type[Ksuid]] = None) -> ParseCacheInfo:
+    """Counters of the ``parse()`` cache of ``ksuid_cls``, defaults to Ksuid."""
+
+def parse(s: hints.StrOrBuffer, ksuid_cls: Optional[Type[SelfT]] = None, cache: bool = True) -> SelfT:
+    """Parse KSUID from base62 encoded form.
+
+    :param cache: use the cache enabled by ``set_parse_cache()``, if any.
+    """
+
+@overload
+def try_parse(s: object, default: None = None, ksuid_cls: None = None, cache: bool = True) -> Optional[Ksuid]:
+    """Like :func:`parse`, but return ``default`` instead of raising if ``s`` is
+    not a valid encoded KSUID.
+    """
+@overload
+def try_parse(s: object, default: None = None, *, ksuid_cls: Type[SelfT], cache: bool = True) -> Optional[SelfT]: ...
+@overload
+def try_parse(s: object, default: T, ksuid_cls: None = None, cache: bool = True) -> Union[Ksuid, T]: ...
+@overload
+def try_parse(s: object, default: T, ksuid_cls: Type[SelfT], cache: bool = True) -> Union[SelfT, T]: ...
+def is_valid(s: object) -> bool:
+    """Whether ``s`` is a base62 encoded KSUID, as a str or bytes-like object."""
+
+def validate_many(ids: Iterable[object], indices: bool = False) -> Union[bytes, List[int]]:
+    """Validate a batch of base62 encoded KSUIDs, as for :func:`is_valid`.
+
+    :param indices: return the indices of invalid items instead of a bitmap.
+    :return: a bitmap, bit ``i % 8`` of byte ``i // 8`` is set if item ``i``
+        is valid, or a list of the indices of invalid items.
+    """
 
 # Represents a completely empty (invalid) KSUID
 Empty: Ksuid
@@ -1,11 +1,30 @@
+import mmap
 import os
-from datetime import datetime, timezone
+import weakref
+from collections import namedtuple
+from datetime import timezone
 
-from cython.operator cimport dereference
+cimport cython
+from cpython.buffer cimport (PyBUF_SIMPLE, PyBUF_WRITABLE, PyBuffer_FillInfo,
+                             PyBuffer_Release, PyObject_CheckBuffer,
+                             PyObject_GetBuffer)
+from cpython.bytes cimport PyBytes_AS_STRING, PyBytes_FromStringAndSize
+from cpython.datetime cimport datetime_new, import_datetime
+from cpython.dict cimport PyDict_GetItemWithError
+from cpython.long cimport PyLong_AsSsize_t
+from cpython.mem cimport PyMem_Calloc, PyMem_Free
+from cpython.object cimport PyObject
+from cpython.ref cimport Py_XDECREF
+from cpython.unicode cimport PyUnicode_DATA
+from cython.parallel cimport prange
 from libc.string cimport memcpy
 
 from cyksuid.fast_base62 cimport (BASE62_BYTE_LENGTH, BASE62_ENCODED_LENGTH,
-                                  _fast_b62decode, _fast_b62encode)
+                                  CYKSUID_STATS, ERR_B62_INVALID_INPUT,
+                                  _b62encode_many, _raise_b62_error, _resolve_threads, _stats,
+                                  _stats_add, _stats_decode_error,
+                                  ksuid_b62_decode, ksuid_b62_encode,
+                                  ksuid_stats_add)
 
 BYTE_LENGTH = BASE62_BYTE_LENGTH
 STRING_ENCODED_LENGTH = BASE62_ENCODED_LENGTH
@@ -14,44 +33,364 @@ EMPTY_BYTES = b'\x00' * BASE62_BYTE_LENGTH
 # A bytes-encoded maximum value for a KSUID
 MAX_ENCODED = b"aWgEPTl1tmebfsQzFP4bxwgy80V"
 
+cdef extern from *:
+    """
+    static Py_hash_t __pyx_ksuid_hash_bytes(const uint8_t* data, Py_ssize_t size) {
+    #if defined(PYPY_VERSION)
+        PyObject* b = PyBytes_FromStringAndSize((const char*)data, size);
+        if (b == NULL) {
+            return -1;
+        }
+        Py_hash_t h = PyObject_Hash(b);
+        Py_DECREF(b);
+        return h;
+    #else
+        return _Py_HashBytes(data, size);
+    #endif
+    }
+    """
+    # Same value as hash() of the equivalent bytes object
+    Py_hash_t _hash_bytes "__pyx_ksuid_hash_bytes"(const uint8_t* data, Py_ssize_t size) except? -1
+
+    object PyUnicode_New(Py_ssize_t size, Py_UCS4 maxchar)
+    bint PyUnicode_IS_ASCII(object s)
+    Py_ssize_t PyUnicode_GET_LENGTH(object s)
+
+    ctypedef struct PyTypeObject:
+        void* tp_init
+
+import_datetime()
+
 cdef _urandom = os.urandom
+cdef object _utc = timezone.utc
+# Keep the base62 string form on instances once computed
+cdef bint _cache_encoded = True
+# All live entropy pools, emptied in the child after fork()
+cdef object _pools = weakref.WeakSet()
+
+
+cdef class EntropyPool:
+    """Buffered source of OS randomness.
+
+    Reads ``size`` bytes from ``os.urandom`` at once and hands them out in
+    slices, every byte is handed out once. Buffered bytes are dropped in the
+    child process after ``fork()``, so forked workers never reuse entropy of
+    their parent. Instances can be passed as ``rand_func``.
+    """
+
+    def __cinit__(self, Py_ssize_t size=4096):
+        if size <= 0:
+            raise ValueError("size must be positive")
+        self.size_ = size
+        self.buf_ = None
+        self.pos_ = size
+        _pools.add(self)
+
+    cdef int fill(self, uint8_t* dst, Py_ssize_t n) except -1:
+        cdef bytes buf
+        _stats_add(&_stats.entropy_bytes, n)
+        if n > self.size_:
+            buf = _urandom(n)
+            memcpy(dst, PyBytes_AS_STRING(buf), n)
+            return 0
+
+        ksuid_mutex_lock(&self.mutex_)
+        try:
+            if self.pos_ + n > self.size_:
+                # os.urandom() may release the GIL, but nothing below does, so
+                # the slice is handed out to exactly one caller. Without the
+                # GIL, the mutex serializes callers.
+                buf = _urandom(self.size_)
+                self.buf_ = buf
+                self.pos_ = 0
+
+            memcpy(dst, PyBytes_AS_STRING(self.buf_) + self.pos_, n)
+            self.pos_ += n
+        finally:
+            ksuid_mutex_unlock(&self.mutex_)
+        return 0
+
+    def __call__(self, Py_ssize_t n):
+        """Return ``n`` random bytes."""
+        if n < 0:
+            raise ValueError("negative argument not allowed")
+        cdef bytes out = PyBytes_FromStringAndSize(NULL, n)
+        self.fill(<uint8_t*>PyBytes_AS_STRING(out), n)
+        return out
+
+    def reset(self):
+        """Drop buffered bytes, the next request reads from the OS again."""
+        ksuid_mutex_lock(&self.mutex_)
+        self.pos_ = self.size_
+        ksuid_mutex_unlock(&self.mutex_)
+        self.buf_ = None
+
+
+def _reset_pools():
+    ksuid_entropy_after_fork()
+    for pool in list(_pools):
+        pool.reset()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_pools)
+
+# Entropy for payloads when no rand_func is given, on platforms without a
+# per-thread cache
+cdef EntropyPool _default_pool = EntropyPool()
+
+
+cdef int _default_entropy(uint8_t* dst, Py_ssize_t n) except -1:
+    """Fill ``dst`` with payload entropy from the calling thread's cache of OS
+    randomness, or from the shared default pool where there is none.
+
+    Threads draw from their own cache without locking.
+    """
+    if not KSUID_HAS_OS_RANDOM:
+        return _default_pool.fill(dst, n)
+    if not ksuid_thread_random(dst, n):
+        raise OSError("Failed to read random bytes from the OS")
+    _stats_add(&_stats.entropy_bytes, n)
+    return 0
+
+
+cdef class Clock:
+    """Native time source for KSUID generation.
+
+    Clocks are passed as ``clock`` to :func:`ksuid`, :func:`generate_many` and
+    the sequence classes, and are read without calling back into Python.
+    """
+
+    cdef int64_t read(self) noexcept:
+        cdef int64_t ms
+        if self.clock_.kind != KSUID_CLOCK_CACHED and self.clock_.kind != KSUID_CLOCK_MANUAL:
+            return ksuid_clock_millis(&self.clock_)
+        ksuid_mutex_lock(&self.mutex_)
+        ms = ksuid_clock_millis(&self.clock_)
+        ksuid_mutex_unlock(&self.mutex_)
+        return ms
+
+    def now_millis(self):
+        """Read the clock, in milliseconds since the Unix epoch."""
+        return self.read()
+
+
+cdef class RealtimeClock(Clock):
+    """Precise wall clock, as used when no clock is given."""
+
+    def __cinit__(self):
+        self.clock_.kind = KSUID_CLOCK_REALTIME
+
+
+cdef class CoarseClock(Clock):
+    """Wall clock at the resolution of the scheduler tick (a few milliseconds),
+    cheaper to read than the precise clock. Same as RealtimeClock on platforms
+    without ``CLOCK_REALTIME_COARSE``.
+    """
+
+    def __cinit__(self):
+        self.clock_.kind = KSUID_CLOCK_COARSE
+
+
+cdef class CachedClock(Clock):
+    """Wall clock read once and reused for ``max_uses`` readings.
+
+    :param int max_uses: readings served per read of the wall clock.
+    """
+
+    def __cinit__(self, Py_ssize_t max_uses=256):
+        if max_uses <= 0:
+            raise ValueError("max_uses must be positive")
+        self.clock_.kind = KSUID_CLOCK_CACHED
+        self.clock_.max_uses = max_uses
+
+    def refresh(self):
+        """Read the wall clock again on the next reading."""
+        self.clock_.uses_left = 0
+
+
+cdef class ManualClock(Clock):
+    """Clock set and advanced by hand, for tests and load generation.
+
+    :param int millis: first reading, in milliseconds since the Unix epoch.
+    :param int step: milliseconds added after every reading.
+    """
+
+    def __cinit__(self, int64_t millis=0, int64_t step=0):
+        self.clock_.kind = KSUID_CLOCK_MANUAL
+        self.clock_.millis = millis
+        self.clock_.step = step
+
+    @property
+    def millis(self):
+        """Next reading, in milliseconds."""
+        return self.clock_.millis
+
+    @millis.setter
+    def millis(self, int64_t value):
+        self.clock_.millis = value
+
+    def advance(self, int64_t millis):
+        """Move the clock forward by ``millis``."""
+        self.clock_.millis += millis
 
+
+cdef int _fill_payload_from(object rand_func, uint8_t* dst, size_t n) except -1:
+    """Fill ``dst`` with ``n`` bytes of ``rand_func``, or of the default pool if None."""
+    cdef Py_buffer view
+
+    if rand_func is None:
+        return _default_entropy(dst, n)
+
+    PyObject_GetBuffer(rand_func(n), &view, PyBUF_SIMPLE)
+    try:
+        if <size_t>view.len != n:
+            raise ValueError("rand_func returned %d bytes, expected %d" % (view.len, n))
+        memcpy(dst, view.buf, n)
+    finally:
+        PyBuffer_Release(&view)
+    return 0
+
+
+cdef inline void _stats_generated(size_t ts_size, int64_t ts_ms, uint64_t n) noexcept:
+    """Count ``n`` KSUIDs generated at clock reading ``ts_ms``."""
+    cdef size_t i = ts_size - 4
+    if CYKSUID_STATS and _stats.enabled:
+        ksuid_stats_add(&_stats.generated[i], n)
+        # Racy across threads in free-threaded builds, readings of concurrent
+        # threads may be counted as regressions
+        if ts_ms < _stats.last_millis[i]:
+            ksuid_stats_add(&_stats.timestamp_regressions, 1)
+        _stats.last_millis[i] = ts_ms
+
+
+cdef _KsuidMixin _new_from_raw(type ksuid_cls, const uint8_t* raw):
+    cdef _KsuidMixin k
+    if (<PyTypeObject*>ksuid_cls).tp_init != (<PyTypeObject*>_KsuidMixin).tp_init:
+        # Subclasses overriding __init__ must see the regular constructor
+        return ksuid_cls(PyBytes_FromStringAndSize(<const char*>raw, BASE62_BYTE_LENGTH))
+
+    k = ksuid_cls.__new__(ksuid_cls)
+    memcpy(k.data_, raw, BASE62_BYTE_LENGTH)
+    return k
+
+
+def _from_raw(type ksuid_cls, bytes raw not None):
+    """Rebuild a pickled KSUID of ``ksuid_cls`` from its raw bytes."""
+    if not issubclass(ksuid_cls, _KsuidMixin):
+        raise TypeError("Expect a KSUID class, got %r" % ksuid_cls)
+    if len(raw) != BASE62_BYTE_LENGTH:
+        raise ValueError("Expect %d raw bytes, got %d" % (BASE62_BYTE_LENGTH, len(raw)))
+    return _new_from_raw(ksuid_cls, raw)
+
+
+cdef object _datetime_from_millis(int64_t ms, object tz):
+    cdef KsuidCivilTime t
+    ksuid_civil_from_millis(ms, &t)
+    if t.year < 1 or t.year > 9999:
+        raise ValueError("year %d is out of range" % t.year)
+    return datetime_new(t.year, t.month, t.day, t.hour, t.minute, t.second,
+                        t.microsecond, tz)
+
+
+def _naive_datetime(int64_t ms):
+    """Naive UTC datetime of Unix time in milliseconds."""
+    return _datetime_from_millis(ms, None)
+
+
+cdef size_t _timestamp_size(object ksuid_cls) except 0:
+    if ksuid_cls is Ksuid:
+        return 4
+    if ksuid_cls is Ksuid40:
+        return 5
+    if ksuid_cls is Ksuid48:
+        return 6
+    if not isinstance(ksuid_cls, type) or not issubclass(ksuid_cls, _KsuidMixin):
+        raise TypeError("Expect a KSUID class, got %r" % ksuid_cls)
+    return (<_KsuidMixin>ksuid_cls.__new__(ksuid_cls)).ts_size_
+
+
+def set_encoded_cache(bint enabled):
+    """Enable or disable caching of the base62 string form on KSUID instances.
+
+    Caching is enabled by default and costs one str object per instance once
+    it has been encoded.
+    """
+    global _cache_encoded
+    _cache_encoded = enabled
+
+
+cdef str _encode_str(const uint8_t* data):
+    cdef str s = PyUnicode_New(BASE62_ENCODED_LENGTH, 127)
+    ksuid_b62_encode(<char*>PyUnicode_DATA(s), BASE62_ENCODED_LENGTH, data, BASE62_BYTE_LENGTH)
+    return s
+
+
+# Ksuid, Ksuid40 and Ksuid48 share the object layout, released objects of
+# any of them are kept for reuse by all of them.
+@cython.freelist(128)
+# The only object field is a cached str, which cannot create cycles.
+@cython.no_gc
 cdef class _KsuidMixin(object):
     BASE62_LENGTH = BASE62_ENCODED_LENGTH
 
     def __init__(self, *args, **kwargs):
-        cdef bytes data
+        cdef uint8_t payload[BASE62_BYTE_LENGTH]
+        cdef Py_ssize_t payload_size
+        cdef Py_buffer view
         cdef double ts
         cdef int64_t ts_ms
 
+        self.hash_ = 0
+        Py_XDECREF(self.str_)
+        self.str_ = NULL
         if len(args) == 0:
+            ts_ms = ksuid_now_millis()
             if len(kwargs) == 0:
                 # No param given, generate a random payload
-                data = _urandom(self.PAYLOAD_LENGTH_IN_BYTES)
-            else:
-                data = kwargs["payload"]
+                payload_size = BASE62_BYTE_LENGTH - self.ts_size_
+                _default_entropy(payload, payload_size)
+                ksuid_assign(self.ts_size_, self.data_, ts_ms, payload, payload_size)
+                _stats_generated(self.ts_size_, ts_ms, 1)
+                return
 
-            self.uid_.assign_from_payload(data, len(data))
+            PyObject_GetBuffer(kwargs["payload"], &view, PyBUF_SIMPLE)
+            try:
+                ksuid_assign(self.ts_size_, self.data_, ts_ms,
+                             <const uint8_t*>view.buf, view.len)
+            finally:
+                PyBuffer_Release(&view)
+            _stats_generated(self.ts_size_, ts_ms, 1)
             return
         elif len(args) == 1:
             # only 1 param, assign it from raw
-            data = args[0]
-            self.uid_.assign(data, len(data))
+            PyObject_GetBuffer(args[0], &view, PyBUF_SIMPLE)
+            try:
+                ksuid_assign_raw(self.data_, <const uint8_t*>view.buf, view.len)
+            finally:
+                PyBuffer_Release(&view)
             return
         elif len(args) == 2:
             # 2 params, assign it from timestamp and payload
             ts = args[0]
             ts_ms = <int64_t>(ts * 1000)
-            data = args[1]
-            self.uid_.assign(ts_ms, data, len(data))
+            PyObject_GetBuffer(args[1], &view, PyBUF_SIMPLE)
+            try:
+                ksuid_assign(self.ts_size_, self.data_, ts_ms,
+                             <const uint8_t*>view.buf, view.len)
+            finally:
+                PyBuffer_Release(&view)
             return
 
         raise ValueError("invalid number of arguments")  # pragma: no cover
 
+    def __getbuffer__(self, Py_buffer* buffer, int flags):
+        # Read-only view of the raw bytes, fails for writable requests
+        PyBuffer_FillInfo(buffer, self, self.data_, BASE62_BYTE_LENGTH, 1, flags)
+
     @classmethod
     def from_timestamp(cls, timestamp):
-        cdef bytes payload = _urandom(cls.PAYLOAD_LENGTH_IN_BYTES)
-        return cls(timestamp, payload)
+        return cls(timestamp, _default_pool(cls.PAYLOAD_LENGTH_IN_BYTES))
 
     @classmethod
     def from_payload(cls, payload):
@@ -68,29 +407,28 @@ cdef class _KsuidMixin(object):
     @property
     def datetime(self):
         """Timestamp portion of the ID as a datetime.datetime object."""
-        return datetime.fromtimestamp(self.timestamp, tz=timezone.utc)
+        return _datetime_from_millis(ksuid_timestamp_millis(self.ts_size_, self.data_), _utc)
 
     @property
     def timestamp_millis(self):
         """Timestamp portion of the ID in milliseconds."""
-        return self.uid_.timestamp_millis()
+        return ksuid_timestamp_millis(self.ts_size_, self.data_)
 
     @property
     def timestamp(self):
         """Timestamp portion of the ID in seconds."""
-        return self.uid_.timestamp_millis() / 1000.0
+        return ksuid_timestamp_millis(self.ts_size_, self.data_) / 1000.0
 
     @property
     def payload(self):
         """Payload portion of the ID."""
-        cdef MemoryView pv = self.uid_.payload()
-        return pv.data[:pv.size]
+        return PyBytes_FromStringAndSize(<char*>self.data_ + self.ts_size_,
+                                         BASE62_BYTE_LENGTH - self.ts_size_)
 
     @property
     def bytes(self):
         """Raw bytes representation of the ID."""
-        cdef MemoryView pv = self.uid_.raw()
-        return pv.data[:pv.size]
+        return PyBytes_FromStringAndSize(<char*>self.data_, BASE62_BYTE_LENGTH)
 
     @property
     def hex(self):
@@ -100,11 +438,20 @@ cdef class _KsuidMixin(object):
     @property
     def encoded(self):
         """Base62 encoded representation of the ID."""
-        cdef bytes b = self.bytes
-        return _fast_b62encode(b, len(b))
+        return PyBytes_FromStringAndSize(<char*>PyUnicode_DATA(str(self)), BASE62_ENCODED_LENGTH)
 
     def __hash__(self):
-        return hash(self.bytes)
+        if self.hash_ == 0:
+            self.hash_ = _hash_bytes(self.data_, BASE62_BYTE_LENGTH)
+        return self.hash_
+
+    def hash64(self, uint64_t seed=0):
+        """Stable 64-bit hash of the raw bytes, for routing IDs to shards.
+
+        XXH64 of the 20 raw bytes with ``seed``: unlike ``hash()`` it does not
+        depend on ``PYTHONHASHSEED`` and matches any other XXH64 implementation.
+        """
+        return ksuid_hash64(self.data_, seed)
 
     def __bytes__(self):
         return self.bytes
@@ -112,29 +459,53 @@ cdef class _KsuidMixin(object):
     def __repr__(self):
         return 'KSUID(%r)' % str(self)
 
+    def __dealloc__(self):
+        Py_XDECREF(self.str_)
+
     def __str__(self):
-        return self.encoded.decode('ascii')
+        cdef PyObject* cached = ksuid_load_once(&self.str_)
+        if cached != NULL:
+            return <str>cached
+
+        cdef str s = _encode_str(self.data_)
+        if _cache_encoded:
+            # Concurrent callers agree on one cached object
+            return <str>ksuid_publish_once(&self.str_, NULL, <PyObject*>s)
+        return s
 
     def __bool__(self):
-        return not self.uid_.empty()
+        return not ksuid_empty(self.data_)
 
     def __richcmp__(self, object other, int op):
         if not isinstance(other, _KsuidMixin):
             return NotImplemented
 
-        cdef _KsuidMixin that = <_KsuidMixin>other
+        cdef int cmp = ksuid_compare(self.data_, (<_KsuidMixin>other).data_)
         if op == 0:  # <
-            return dereference(self.uid_) < dereference(that.uid_)
+            return cmp < 0
         elif op == 2:  # ==
-            return dereference(self.uid_) == dereference(that.uid_)
+            return cmp == 0
         elif op == 4:  # >
-            return dereference(that.uid_) < dereference(self.uid_)
+            return cmp > 0
         elif op == 1:  # <=
-            return dereference(self.uid_) <= dereference(that.uid_)
+            return cmp <= 0
         elif op == 3:  # !=
-            return dereference(self.uid_) != dereference(that.uid_)
+            return cmp != 0
         elif op == 5:  # >=
-            return dereference(that.uid_) <= dereference(self.uid_)
+            return cmp >= 0
+
+    def __reduce__(self):
+        return _from_raw, (type(self), self.bytes)
+
+    def __reduce_ex__(self, protocol):
+        # Skip the copyreg lookups of object.__reduce_ex__
+        return _from_raw, (type(self), self.bytes)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
     def __setattr__(self, name, value):
         raise TypeError('Ksuid objects are immutable')
@@ -148,10 +519,7 @@ cdef class Ksuid(_KsuidMixin):
     TIMESTAMP_LENGTH_IN_BYTES = 4
 
     def __cinit__(self):
-        self.uid_ = new _Ksuid()
-
-    def __dealloc__(self):
-        del self.uid_
+        self.ts_size_ = 4
 
 
 cdef class Ksuid40(_KsuidMixin):
@@ -159,10 +527,7 @@ cdef class Ksuid40(_KsuidMixin):
     TIMESTAMP_LENGTH_IN_BYTES = 5
 
     def __cinit__(self):
-        self.uid_ = new _Ksuid40()
-
-    def __dealloc__(self):
-        del self.uid_
+        self.ts_size_ = 5
 
 
 cdef class Ksuid48(_KsuidMixin):
@@ -170,52 +535,614 @@ cdef class Ksuid48(_KsuidMixin):
     TIMESTAMP_LENGTH_IN_BYTES = 6
 
     def __cinit__(self):
-        self.uid_ = new _Ksuid48()
-
-    def __dealloc__(self):
-        del self.uid_
+        self.ts_size_ = 6
 
 
-def ksuid(time_func=None, rand_func=None, ksuid_cls=Ksuid):
+def ksuid(time_func=None, rand_func=None, ksuid_cls=Ksuid, Clock clock=None):
     """Factory to construct KSUID objects.
 
     :param callable time_func: function for generating time, defaults to time.time.
-    :param callable rand_func: function for generating random bytes, defaults to os.urandom.
+    :param callable rand_func: function for generating random bytes, defaults to a
+        shared EntropyPool.
     :param callable ksuid_cls: KSUID class, defaults to Ksuid.
+    :param Clock clock: native time source, exclusive with ``time_func``.
     """
 
+    cdef uint8_t raw[BASE62_BYTE_LENGTH]
+    cdef uint8_t entropy[BASE62_BYTE_LENGTH]
+    cdef size_t ts_size
+    cdef int64_t ts_ms
+
+    if clock is not None:
+        if time_func is not None:
+            raise ValueError("time_func and clock are mutually exclusive")
+        ts_size = _timestamp_size(ksuid_cls)
+        _fill_payload_from(rand_func, entropy, BASE62_BYTE_LENGTH - ts_size)
+        ts_ms = clock.read()
+        ksuid_assign(ts_size, raw, ts_ms, entropy, BASE62_BYTE_LENGTH - ts_size)
+        _stats_generated(ts_size, ts_ms, 1)
+        return _new_from_raw(ksuid_cls, raw)
+
     if time_func is None and rand_func is None:
         return ksuid_cls()
 
     if rand_func is None:
-        rand_func = _urandom
+        rand_func = _default_pool
 
-    cdef bytes payload = rand_func(ksuid_cls.PAYLOAD_LENGTH_IN_BYTES)
+    payload = rand_func(ksuid_cls.PAYLOAD_LENGTH_IN_BYTES)
     if time_func is None:
         return ksuid_cls(payload=payload)
 
     cdef double ts = time_func()
-    return ksuid_cls(ts, payload)
+    cdef _KsuidMixin k = ksuid_cls(ts, payload)
+    _stats_generated(k.ts_size_, <int64_t>(ts * 1000), 1)
+    return k
+
+
+cdef class KsuidSequence:
+    """Generator of strictly increasing KSUIDs.
+
+    The first KSUID of a timestamp tick (a second for Ksuid, 4ms for Ksuid40
+    and a millisecond for Ksuid48) gets a random payload, later KSUIDs of the
+    same tick increment the payload of the previous one as a big-endian
+    counter. If the clock goes backwards, the sequence stays on its last tick,
+    and a payload overflow carries into the timestamp.
+
+    :param callable ksuid_cls: KSUID class, defaults to Ksuid.
+    :param callable time_func: function for generating time, defaults to time.time.
+    :param callable rand_func: function for generating random bytes, defaults to a
+        shared EntropyPool.
+    :param Clock clock: native time source, exclusive with ``time_func``.
+    """
+
+    def __init__(self, ksuid_cls=None, time_func=None, rand_func=None, Clock clock=None):
+        if not ksuid_cls:
+            ksuid_cls = Ksuid
+        if time_func is not None and clock is not None:
+            raise ValueError("time_func and clock are mutually exclusive")
+        self.ts_size_ = _timestamp_size(ksuid_cls)
+        self.ksuid_cls_ = ksuid_cls
+        self.time_func_ = time_func
+        self.rand_func_ = rand_func
+        self.clock_ = clock
+        self.state_.started = 0
+
+    cdef int64_t _now_millis(self) except? -1:
+        if self.clock_ is not None:
+            return self.clock_.read()
+        if self.time_func_ is None:
+            return ksuid_now_millis()
+        return <int64_t>(<double>self.time_func_() * 1000)
 
+    cdef int _fill_payload(self, uint8_t* dst, size_t n) except -1:
+        return _fill_payload_from(self.rand_func_, dst, n)
 
-def parse(object s, object ksuid_cls=None):
-    """Parse KSUID from a base62 encoded string."""
+    cdef _KsuidMixin next_ksuid(self):
+        cdef uint8_t raw[BASE62_BYTE_LENGTH]
+        cdef int64_t ts_ms
+
+        # Calls to time_func and rand_func are serialized too, they must not
+        # draw from the same sequence
+        ksuid_mutex_lock(&self.mutex_)
+        try:
+            ts_ms = self._now_millis()
+            if ksuid_sequence_advance(&self.state_, self.ts_size_, ts_ms, raw):
+                self._fill_payload(raw + self.ts_size_, BASE62_BYTE_LENGTH - self.ts_size_)
+            ksuid_sequence_commit(&self.state_, raw)
+        finally:
+            ksuid_mutex_unlock(&self.mutex_)
+        _stats_generated(self.ts_size_, ts_ms, 1)
+        return _new_from_raw(self.ksuid_cls_, raw)
+
+    def __call__(self):
+        """Return the next KSUID of the sequence."""
+        return self.next_ksuid()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.next_ksuid()
+
+
+#: Bytes of shared memory needed by a SharedKsuidSequence.
+SHARED_SEQUENCE_SIZE = sizeof(KsuidSharedSequence)
+
+
+# Py_buffer.obj must stay alive until __dealloc__ releases the view
+@cython.no_gc_clear
+cdef class SharedKsuidSequence(KsuidSequence):
+    """Generator of strictly increasing KSUIDs shared between processes.
+
+    The sequence state lives in ``buffer``, a writable buffer of at least
+    ``SHARED_SEQUENCE_SIZE`` bytes mapped in every process: the ``buf`` of a
+    ``multiprocessing.shared_memory.SharedMemory`` or an mmap of a file.
+    Zero-filled memory is a new sequence. KSUIDs drawn by any attached process
+    are strictly increasing in the order they are drawn, as for KsuidSequence.
+    All processes must use the same ``ksuid_cls``.
+
+    The state is guarded by a spinlock recording the process ID of its holder: if
+    a process dies while holding it, the next process to draw takes it over once
+    the dead process has been reaped. Processes must therefore share a PID
+    namespace; across containers, a killed holder blocks the other processes.
+
+    Call :meth:`close` (or use the sequence as a context manager) before
+    releasing the shared memory.
+
+    :param buffer: writable shared buffer holding the sequence state.
+    :param callable ksuid_cls: KSUID class, defaults to Ksuid.
+    :param callable time_func: function for generating time, defaults to time.time.
+    :param callable rand_func: function for generating random bytes, defaults to a
+        shared EntropyPool.
+    :param Clock clock: native time source, exclusive with ``time_func``.
+    """
+
+    def __init__(self, buffer, ksuid_cls=None, time_func=None, rand_func=None,
+                 Clock clock=None):
+        super().__init__(ksuid_cls, time_func, rand_func, clock)
+        self.close()
+        PyObject_GetBuffer(buffer, &self.view_, PyBUF_WRITABLE)
+        if <size_t>self.view_.len < sizeof(KsuidSharedSequence):
+            PyBuffer_Release(&self.view_)
+            raise ValueError("buffer must be at least %d bytes" % SHARED_SEQUENCE_SIZE)
+        if <uintptr_t>self.view_.buf % sizeof(uint64_t):
+            PyBuffer_Release(&self.view_)
+            raise ValueError("buffer must be 8 bytes aligned")
+        self.shared_ = <KsuidSharedSequence*>self.view_.buf
+
+    @classmethod
+    def open(cls, path, ksuid_cls=None, time_func=None, rand_func=None, clock=None):
+        """Attach to a sequence stored in the file at ``path``, created if missing."""
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < SHARED_SEQUENCE_SIZE:
+                # Extending with zeros is safe if another process attached already
+                os.ftruncate(fd, SHARED_SEQUENCE_SIZE)
+            mm = mmap.mmap(fd, SHARED_SEQUENCE_SIZE)
+        finally:
+            os.close(fd)
+
+        cdef SharedKsuidSequence seq
+        try:
+            seq = cls(mm, ksuid_cls, time_func, rand_func, clock)
+        except BaseException:
+            mm.close()
+            raise
+        seq.mmap_ = mm
+        return seq
+
+    def close(self):
+        """Detach from the shared memory."""
+        ksuid_mutex_lock(&self.mutex_)
+        if self.shared_ != NULL:
+            self.shared_ = NULL
+            PyBuffer_Release(&self.view_)
+        ksuid_mutex_unlock(&self.mutex_)
+        if self.mmap_ is not None:
+            self.mmap_.close()
+            self.mmap_ = None
+
+    def __dealloc__(self):
+        if self.shared_ != NULL:
+            PyBuffer_Release(&self.view_)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    cdef _KsuidMixin next_ksuid(self):
+        cdef uint8_t raw[BASE62_BYTE_LENGTH]
+        cdef uint8_t payload[BASE62_BYTE_LENGTH]
+        cdef int64_t ts_ms = self._now_millis()
+        cdef bint closed = True
+
+        if self.shared_ == NULL:
+            raise ValueError("SharedKsuidSequence is closed")
+        # Drawn up front, only the lock holder should wait on the lock
+        self._fill_payload(payload, BASE62_BYTE_LENGTH - self.ts_size_)
+        with nogil:
+            # Threads of this process queue on the mutex rather than spin on
+            # the shared lock, and close() waits for them
+            ksuid_mutex_lock(&self.mutex_)
+            try:
+                if self.shared_ != NULL:
+                    ksuid_shared_sequence_next(self.shared_, self.ts_size_, ts_ms,
+                                               payload, raw)
+                    closed = False
+            finally:
+                ksuid_mutex_unlock(&self.mutex_)
+        if closed:
+            raise ValueError("SharedKsuidSequence is closed")
+        _stats_generated(self.ts_size_, ts_ms, 1)
+        return _new_from_raw(self.ksuid_cls_, raw)
+
+
+ParseCacheInfo = namedtuple("ParseCacheInfo", ["hits", "misses", "evictions", "size", "capacity"])
+
+
+cdef class _ParseCache:
+    """Bounded map of encoded strings to parsed KSUIDs with CLOCK eviction.
+
+    Lookups and updates never call back into Python code, so they are atomic
+    under the GIL, and hold a mutex in free-threaded builds.
+    """
+
+    # Encoded string -> slot
+    cdef dict index_
+    cdef list keys_
+    cdef list values_
+    # Referenced since the clock hand last passed, per slot
+    cdef uint8_t* referenced_
+    cdef Py_ssize_t capacity_
+    cdef Py_ssize_t size_
+    cdef Py_ssize_t hand_
+    cdef public unsigned long long hits
+    cdef public unsigned long long misses
+    cdef public unsigned long long evictions
+    cdef KsuidMutex mutex_
+
+    def __init__(self, Py_ssize_t capacity):
+        self.index_ = {}
+        self.keys_ = [None] * capacity
+        self.values_ = [None] * capacity
+        self.referenced_ = <uint8_t*>PyMem_Calloc(capacity, 1)
+        if self.referenced_ == NULL:
+            raise MemoryError()
+        self.capacity_ = capacity
+
+    def __dealloc__(self):
+        PyMem_Free(self.referenced_)
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    cdef object get(self, object key):
+        cdef PyObject* slot
+        cdef Py_ssize_t i
+        ksuid_mutex_lock(&self.mutex_)
+        try:
+            slot = PyDict_GetItemWithError(self.index_, key)
+            if slot == NULL:
+                self.misses += 1
+                return None
+            self.hits += 1
+            i = PyLong_AsSsize_t(<object>slot)
+            self.referenced_[i] = 1
+            return self.values_[i]
+        finally:
+            ksuid_mutex_unlock(&self.mutex_)
+
+    cdef put(self, object key, object value):
+        cdef Py_ssize_t slot
+        ksuid_mutex_lock(&self.mutex_)
+        try:
+            if key in self.index_:
+                # Parsed concurrently by another thread
+                return
+
+            if self.size_ < self.capacity_:
+                slot = self.size_
+                self.size_ += 1
+            else:
+                # Give referenced entries a second chance
+                while self.referenced_[self.hand_]:
+                    self.referenced_[self.hand_] = 0
+                    self.hand_ = (self.hand_ + 1) % self.capacity_
+                slot = self.hand_
+                self.hand_ = (self.hand_ + 1) % self.capacity_
+                del self.index_[self.keys_[slot]]
+                self.evictions += 1
+
+            # Released on return after the mutex, a subclass __del__ must see
+            # a consistent cache
+            evicted = self.values_[slot]
+            self.keys_[slot] = key
+            self.values_[slot] = value
+            self.index_[key] = slot
+        finally:
+            ksuid_mutex_unlock(&self.mutex_)
+
+    def info(self):
+        return ParseCacheInfo(self.hits, self.misses, self.evictions, self.size_, self.capacity_)
+
+
+# KSUID class -> _ParseCache, only classes with a cache enabled
+cdef dict _parse_caches = {}
+
+
+def set_parse_cache(Py_ssize_t capacity, object ksuid_cls=None):
+    """Cache up to ``capacity`` KSUIDs parsed from str or bytes by ``parse()``.
+
+    Hits return the same immutable instance. Entries are evicted with the CLOCK
+    algorithm. Setting the capacity again clears the cache and its counters,
+    a capacity of 0 disables it.
+
+    :param int capacity: maximum number of cached KSUIDs.
+    :param callable ksuid_cls: KSUID class to cache, defaults to Ksuid.
+    """
+    if capacity < 0:
+        raise ValueError("capacity must not be negative, got %d" % capacity)
+    if not ksuid_cls:
+        ksuid_cls = Ksuid
+    _timestamp_size(ksuid_cls)
+    if capacity == 0:
+        _parse_caches.pop(ksuid_cls, None)
+    else:
+        _parse_caches[ksuid_cls] = _ParseCache(capacity)
+
+
+def parse_cache_info(object ksuid_cls=None):
+    """Counters of the ``parse()`` cache of ``ksuid_cls``, defaults to Ksuid.
+
+    :return: a ``ParseCacheInfo(hits, misses, evictions, size, capacity)``.
+    """
+    cdef _ParseCache pc = _parse_caches.get(ksuid_cls or Ksuid)
+    if pc is None:
+        return ParseCacheInfo(0, 0, 0, 0, 0)
+    return pc.info()
+
+
+cdef enum:
+    # _decode() error for objects that are neither str nor bytes-like, the
+    # others are 0 for a wrong length and the decoder's ERROR_CODE values
+    _ERR_INVALID_TYPE = 1
+
+
+cdef int _decode(object s, uint8_t* raw, int* err_code) except -1:
+    """Decode a base62 str or bytes-like object into ``raw`` without raising
+    for invalid input.
+
+    ASCII str objects are decoded from their own buffer, without a copy.
+
+    :return: 1 if ``s`` is valid, else 0 and ``err_code`` is set to 0 for a
+        wrong length, _ERR_INVALID_TYPE or a negative ERROR_CODE.
+    """
+    cdef Py_buffer view
 
-    cdef bytes buf
     if isinstance(s, str):
-        buf = (<str>s).encode('utf-8')
-    elif isinstance(s, bytes):
-        buf = <bytes>s
+        if PyUnicode_GET_LENGTH(s) != BASE62_ENCODED_LENGTH:
+            err_code[0] = 0
+        elif not PyUnicode_IS_ASCII(s):
+            err_code[0] = ERR_B62_INVALID_INPUT
+        else:
+            err_code[0] = ksuid_b62_decode(raw, BASE62_BYTE_LENGTH,
+                                           <const char*>PyUnicode_DATA(s),
+                                           BASE62_ENCODED_LENGTH)
+            return err_code[0] == 0
+        return 0
+
+    if not PyObject_CheckBuffer(s):
+        err_code[0] = _ERR_INVALID_TYPE
+        return 0
+
+    PyObject_GetBuffer(s, &view, PyBUF_SIMPLE)
+    try:
+        if view.len != BASE62_ENCODED_LENGTH:
+            err_code[0] = 0
+            return 0
+        err_code[0] = ksuid_b62_decode(raw, BASE62_BYTE_LENGTH, <const char*>view.buf,
+                                       BASE62_ENCODED_LENGTH)
+    finally:
+        PyBuffer_Release(&view)
+    return err_code[0] == 0
+
+
+cdef object _parse(object s, object ksuid_cls, bint cache, bint strict, object default):
+    """parse() if ``strict``, else try_parse() returning ``default``."""
+    cdef uint8_t raw[BASE62_BYTE_LENGTH]
+    cdef _ParseCache pc = None
+    cdef int err_code
+
+    if not ksuid_cls:
+        ksuid_cls = Ksuid
+    if isinstance(s, str):
+        _stats_add(&_stats.parsed_str, 1)
     else:
-        raise TypeError("Expect str or bytes, got %r" % type(s))
+        _stats_add(&_stats.parsed_bytes, 1)
+    if cache and _parse_caches and (type(s) is str or type(s) is bytes):
+        pc = _parse_caches.get(ksuid_cls)
+        if pc is not None:
+            k = pc.get(s)
+            if k is not None:
+                return k
+
+    if not _decode(s, raw, &err_code):
+        if err_code != _ERR_INVALID_TYPE:
+            _stats_decode_error(err_code)
+        if not strict:
+            return default
+        if err_code == _ERR_INVALID_TYPE:
+            raise TypeError("Expect str or bytes-like object, got %r" % type(s))
+        if err_code == 0:
+            raise TypeError("invalid encoded KSUID string")
+        _raise_b62_error(err_code)
+
+    k = _new_from_raw(ksuid_cls, raw)
+    if pc is not None:
+        pc.put(s, k)
+    return k
+
+
+def parse(object s, object ksuid_cls=None, bint cache=True):
+    """Parse KSUID from a base62 encoded string or bytes-like object.
+
+    :param bool cache: use the cache enabled by ``set_parse_cache()``, if any.
+    """
+    return _parse(s, ksuid_cls, cache, True, None)
+
+
+def try_parse(object s, object default=None, object ksuid_cls=None, bint cache=True):
+    """Like :func:`parse`, but return ``default`` instead of raising if ``s`` is
+    not a valid encoded KSUID, including objects of other types.
+    """
+    return _parse(s, ksuid_cls, cache, False, default)
+
 
-    buf_size = len(buf)
-    if buf_size != BASE62_ENCODED_LENGTH:
-        raise TypeError("invalid encoded KSUID string")
+def is_valid(object s):
+    """Whether ``s`` is a base62 encoded KSUID, as a str or bytes-like object."""
+    cdef uint8_t raw[BASE62_BYTE_LENGTH]
+    cdef int err_code
+    return _decode(s, raw, &err_code) == 1
 
+
+def validate_many(object ids, bint indices=False):
+    """Validate a batch of base62 encoded KSUIDs, as for :func:`is_valid`.
+
+    :param ids: iterable of str or bytes-like objects.
+    :param bool indices: return the indices of invalid items instead of a bitmap.
+    :return: a bitmap as bytes, bit ``i % 8`` of byte ``i // 8`` is set if
+        item ``i`` is valid, or a list of the indices of invalid items.
+    """
+    cdef uint8_t raw[BASE62_BYTE_LENGTH]
+    cdef int err_code
+    cdef bytearray bitmap = bytearray()
+    cdef list invalid = []
+    cdef Py_ssize_t i = 0
+    cdef uint8_t bits = 0
+
+    for s in ids:
+        if _decode(s, raw, &err_code):
+            bits |= 1 << (i & 7)
+        elif indices:
+            invalid.append(i)
+        i += 1
+        if not indices and i & 7 == 0:
+            bitmap.append(bits)
+            bits = 0
+
+    if indices:
+        return invalid
+    if i & 7:
+        bitmap.append(bits)
+    return bytes(bitmap)
+
+
+cdef enum:
+    # KSUIDs generated per timestamp and entropy read in generate_many()
+    _GENERATE_BLOCK = 256
+
+
+cdef int _generate_block(size_t ts_size, char* dst, bint encoded,
+                         const uint8_t* payloads, Py_ssize_t n,
+                         KsuidClock clock, int64_t* last_millis) noexcept nogil:
+    """Generate n KSUIDs into dst, from payloads or, if NULL, fresh OS entropy.
+
+    ``clock`` is a private copy, read once per block, the last reading is
+    stored in ``last_millis``.
+
+    :return: -1 if reading entropy failed.
+    """
+    cdef Py_ssize_t payload_size = BASE62_BYTE_LENGTH - ts_size
+    cdef Py_ssize_t item_size = BASE62_ENCODED_LENGTH if encoded else BASE62_BYTE_LENGTH
+    cdef uint8_t raw[_GENERATE_BLOCK * BASE62_BYTE_LENGTH]
+    cdef uint8_t entropy[_GENERATE_BLOCK * BASE62_BYTE_LENGTH]
+    cdef const uint8_t* src
+    cdef Py_ssize_t start = 0
+    cdef Py_ssize_t count
+
+    while start < n:
+        count = min(<Py_ssize_t>_GENERATE_BLOCK, n - start)
+        if payloads == NULL:
+            if not ksuid_os_random(entropy, count * payload_size):
+                return -1
+            src = entropy
+        else:
+            src = payloads + start * payload_size
+
+        last_millis[0] = ksuid_clock_millis(&clock)
+        ksuid_assign_many(ts_size, raw, last_millis[0], src, count)
+        if encoded:
+            _b62encode_many(dst + start * item_size, item_size, raw, count)
+        else:
+            memcpy(dst + start * item_size, raw, count * BASE62_BYTE_LENGTH)
+        start += count
+    return 0
+
+
+def generate_many(Py_ssize_t n, object ksuid_cls=Ksuid, bint encoded=False, threads=None,
+                  Clock clock=None):
+    """Generate KSUIDs in bulk into one contiguous buffer.
+
+    Payload entropy for all IDs is read at once, timestamps are assigned with
+    the GIL released. With several threads, each thread reads its own entropy
+    from the OS.
+
+    :param int n: number of KSUIDs to generate.
+    :param callable ksuid_cls: KSUID class, defaults to Ksuid.
+    :param bool encoded: return base62 encoded IDs instead of raw bytes.
+    :param int threads: split the work across this many threads, 0 for one
+        per CPU. Serial if the extension was built without OpenMP.
+    :param Clock clock: native time source, defaults to the realtime clock.
+        Cached and manual clocks are read once per call.
+    :return: ``n * BYTE_LENGTH`` raw bytes, or ``n * STRING_ENCODED_LENGTH``
+        bytes if ``encoded`` is true.
+    """
+
+    if n < 0:
+        raise ValueError("n must be non-negative")
     if not ksuid_cls:
         ksuid_cls = Ksuid
-    return ksuid_cls(_fast_b62decode(buf, buf_size))
+
+    cdef size_t ts_size = _timestamp_size(ksuid_cls)
+    cdef Py_ssize_t payload_size = BASE62_BYTE_LENGTH - ts_size
+    cdef Py_ssize_t item_size = BASE62_ENCODED_LENGTH if encoded else BASE62_BYTE_LENGTH
+    cdef int n_threads = _resolve_threads(threads, n)
+    cdef bytes payloads = None
+    cdef bytes result = PyBytes_FromStringAndSize(NULL, n * item_size)
+    cdef const uint8_t* src = NULL
+    cdef char* dst = PyBytes_AS_STRING(result)
+    cdef Py_ssize_t chunk = (n + n_threads - 1) // n_threads
+    cdef Py_ssize_t t
+    cdef Py_ssize_t start
+    cdef int failed = 0
+    cdef KsuidClock block_clock
+    cdef int64_t last_millis = 0
+    cdef int64_t* thread_millis = NULL
+
+    block_clock.kind = KSUID_CLOCK_REALTIME
+    if clock is not None:
+        block_clock = clock.clock_
+        if block_clock.kind == KSUID_CLOCK_CACHED or block_clock.kind == KSUID_CLOCK_MANUAL:
+            # Stateful clocks are snapshotted so every thread sees one reading
+            block_clock.kind = KSUID_CLOCK_MANUAL
+            block_clock.millis = clock.read()
+            block_clock.step = 0
+
+    if n_threads == 1 or not KSUID_HAS_OS_RANDOM:
+        payloads = _urandom(n * payload_size)
+        src = <const uint8_t*>PyBytes_AS_STRING(payloads)
+
+    if n_threads == 1:
+        with nogil:
+            _generate_block(ts_size, dst, encoded, src, n, block_clock, &last_millis)
+    else:
+        # Latest clock reading of each thread, the batch records the greatest
+        thread_millis = <int64_t*>PyMem_Calloc(n_threads, sizeof(int64_t))
+        if thread_millis == NULL:
+            raise MemoryError()
+        try:
+            with nogil:
+                for t in prange(n_threads, num_threads=n_threads, schedule="static"):
+                    start = t * chunk
+                    if start < n:
+                        failed += _generate_block(
+                            ts_size, dst + start * item_size, encoded,
+                            (src + start * payload_size) if src != NULL else NULL,
+                            min(chunk, n - start), block_clock, &thread_millis[t]) < 0
+            last_millis = thread_millis[0]
+            for t in range(1, n_threads):
+                if t * chunk < n:
+                    last_millis = max(last_millis, thread_millis[t])
+        finally:
+            PyMem_Free(thread_millis)
+
+    if failed:
+        raise OSError("Failed to read random bytes from the OS")
+    _stats_add(&_stats.entropy_bytes, n * payload_size)
+    if n > 0:
+        _stats_generated(ts_size, last_millis, n)
+    return result
 
 
 # Represents a completely empty (invalid) KSUID
@@ -0,0 +1,47 @@
+import os
+from typing import IO, Any, Iterable, Iterator, List, Optional, Type, Union
+
+from cyksuid import hints
+from cyksuid._array import KsuidArray
+from cyksuid._ksuid import Ksuid
+
+DEFAULT_CHUNK_SIZE: int
+
+Source = Union[str, bytes, "os.PathLike[str]", "os.PathLike[bytes]", IO[Any]]
+
+class KsuidReader:
+    """Iterator over batches of KSUIDs decoded from a newline separated stream.
+
+    Created by :func:`iter_parse`. Every batch is a :class:`KsuidArray`.
+    """
+
+    invalid_offsets: List[int]
+    """Byte offsets of malformed lines, filled if ``errors="collect"``."""
+
+    def __init__(
+        self,
+        source: Source,
+        chunk_size: int = ...,
+        ksuid_cls: Optional[Type[Ksuid]] = None,
+        errors: str = "raise",
+    ) -> None: ...
+    def close(self) -> None:
+        """Close the file if it was opened from a path."""
+
+    def __enter__(self) -> "KsuidReader": ...
+    def __exit__(self, *args: Any) -> None: ...
+    def __iter__(self) -> Iterator[KsuidArray]: ...
+    def __next__(self) -> KsuidArray: ...
+
+def iter_parse(
+    source: Source,
+    chunk_size: int = ...,
+    ksuid_cls: Optional[Type[Ksuid]] = None,
+    errors: str = "raise",
+) -> KsuidReader:
+    """Parse newline separated base62 encoded KSUIDs in batches."""
+
+def write_encoded(
+    fileobj: IO[Any], ids: Union[hints.Buffer, Iterable[Ksuid]], chunk_size: int = ...
+) -> int:
+    """Write KSUIDs base62 encoded, one per line."""
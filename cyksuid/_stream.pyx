@@ -0,0 +1,318 @@
+import io
+import mmap
+import os
+
+from cpython.buffer cimport PyBUF_SIMPLE, PyBuffer_Release, PyObject_GetBuffer
+from libc.stdint cimport uint8_t
+from libc.string cimport memchr
+
+from cyksuid._array cimport KsuidArray
+from cyksuid.fast_base62 cimport (BASE62_BYTE_LENGTH, BASE62_ENCODED_LENGTH,
+                                  _b62decode_error, _stats_decode_error,
+                                  ksuid_b62_decode)
+
+from cyksuid.fast_base62 import DecodeError, encode_many
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+cdef enum:
+    # Shortest line holding a KSUID
+    _MIN_LINE_LENGTH = BASE62_ENCODED_LENGTH + 1
+    # Longest incomplete line kept between chunks, longer ones are malformed
+    _MAX_PENDING_LENGTH = 64
+
+cdef enum ErrorMode:
+    ERRORS_RAISE
+    ERRORS_SKIP
+    ERRORS_COLLECT
+
+
+cdef Py_ssize_t _decode_lines(const char* src, Py_ssize_t size, bint final,
+                              uint8_t* dst, Py_ssize_t* count, Py_ssize_t* lines,
+                              Py_ssize_t* bad_end, int* err_code) noexcept nogil:
+    """Decode newline separated KSUIDs into dst.
+
+    Stops before an incomplete last line unless final is set, or at the start of
+    the first malformed line, whose end is then stored in bad_end and its decode
+    error in err_code (0 for a wrong length).
+
+    :return: position where decoding stopped.
+    """
+    cdef Py_ssize_t pos = 0
+    cdef Py_ssize_t end
+    cdef Py_ssize_t next_pos
+    cdef const char* nl
+
+    bad_end[0] = -1
+    while pos < size:
+        nl = <const char*>memchr(src + pos, b'\n', size - pos)
+        if nl == NULL:
+            if not final:
+                break
+            end = next_pos = size
+        else:
+            end = nl - src
+            next_pos = end + 1
+
+        if end > pos and src[end - 1] == b'\r':
+            end -= 1
+        # Blank lines are ignored
+        if end > pos:
+            err_code[0] = 0
+            if (end - pos != BASE62_ENCODED_LENGTH or
+                    ksuid_b62_decode(dst + count[0] * BASE62_BYTE_LENGTH, BASE62_BYTE_LENGTH,
+                                     src + pos, BASE62_ENCODED_LENGTH) != 0):
+                if end - pos == BASE62_ENCODED_LENGTH:
+                    err_code[0] = _b62decode_error(src + pos, BASE62_ENCODED_LENGTH)
+                bad_end[0] = next_pos
+                return pos
+            count[0] += 1
+
+        lines[0] += 1
+        pos = next_pos
+    return pos
+
+
+cdef class KsuidReader:
+    """Iterator over batches of KSUIDs decoded from a newline separated stream.
+
+    Created by :func:`iter_parse`. Every batch is a :class:`KsuidArray`.
+    """
+
+    cdef object fileobj_
+    cdef object mmap_
+    cdef bint close_
+    cdef Py_ssize_t chunk_size_
+    cdef type ksuid_cls_
+    cdef ErrorMode errors_
+    cdef bytes pending_
+    # Whether the rest of an overlong line is being dropped
+    cdef bint skip_line_
+    # Stream offset of pending_, or of the next mmap window
+    cdef Py_ssize_t offset_
+    cdef Py_ssize_t lines_
+    cdef bint eof_
+
+    #: Byte offsets of malformed lines, filled if ``errors="collect"``.
+    cdef readonly list invalid_offsets
+
+    def __init__(self, source, Py_ssize_t chunk_size=DEFAULT_CHUNK_SIZE,
+                 ksuid_cls=None, errors="raise"):
+        if chunk_size < _MIN_LINE_LENGTH:
+            raise ValueError("chunk_size must be at least %d" % _MIN_LINE_LENGTH)
+        if errors == "raise":
+            self.errors_ = ERRORS_RAISE
+        elif errors == "skip":
+            self.errors_ = ERRORS_SKIP
+        elif errors == "collect":
+            self.errors_ = ERRORS_COLLECT
+        else:
+            raise ValueError("errors must be 'raise', 'skip' or 'collect', got %r" % (errors,))
+
+        # Validate ksuid_cls before opening anything
+        KsuidArray(ksuid_cls=ksuid_cls)
+        self.ksuid_cls_ = ksuid_cls
+        self.chunk_size_ = chunk_size
+        self.pending_ = b""
+        self.invalid_offsets = []
+
+        if isinstance(source, (str, bytes, os.PathLike)):
+            self.fileobj_ = open(source, "rb")
+            self.close_ = True
+            try:
+                if os.fstat(self.fileobj_.fileno()).st_size > 0:
+                    self.mmap_ = mmap.mmap(self.fileobj_.fileno(), 0, access=mmap.ACCESS_READ)
+            except BaseException:
+                self.close()
+                raise
+        else:
+            self.fileobj_ = source
+
+    def close(self):
+        """Close the file if it was opened from a path."""
+        if self.mmap_ is not None:
+            self.mmap_.close()
+            self.mmap_ = None
+        if self.close_:
+            self.fileobj_.close()
+        self.eof_ = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        cdef KsuidArray batch
+        while not self.eof_:
+            if self.mmap_ is not None:
+                batch = self._next_window()
+            else:
+                batch = self._next_chunk()
+            if len(batch):
+                return batch
+        raise StopIteration
+
+    cdef KsuidArray _next_window(self):
+        cdef Py_buffer view
+        cdef Py_ssize_t size
+        cdef const char* src
+        cdef const char* nl
+        cdef KsuidArray batch
+
+        PyObject_GetBuffer(self.mmap_, &view, PyBUF_SIMPLE)
+        try:
+            src = <const char*>view.buf + self.offset_
+            size = min(self.chunk_size_, view.len - self.offset_)
+            # Extend the window to the end of its last line
+            if self.offset_ + size < view.len and src[size - 1] != b'\n':
+                nl = <const char*>memchr(src + size, b'\n', view.len - self.offset_ - size)
+                size = (nl - src + 1) if nl != NULL else view.len - self.offset_
+            batch = self._decode(src, size, True)
+        finally:
+            PyBuffer_Release(&view)
+        # The map can only be closed once its buffer is released
+        if self.offset_ == view.len:
+            self.close()
+        return batch
+
+    cdef KsuidArray _next_chunk(self):
+        data = self.fileobj_.read(self.chunk_size_)
+        cdef bint final = not data
+        cdef Py_ssize_t start
+
+        if isinstance(data, str):
+            data = data.encode("ascii", "surrogateescape")
+        if self.skip_line_:
+            start = data.find(b"\n") + 1
+            self.skip_line_ = start == 0 and not final
+            if start == 0:
+                start = len(data)
+            self.offset_ += start
+            data = data[start:]
+        if self.pending_:
+            data = self.pending_ + data
+
+        start = self.offset_
+        batch = self._decode(data, len(data), final)
+        self.pending_ = data[self.offset_ - start:]
+        if len(self.pending_) > _MAX_PENDING_LENGTH:
+            self._drop_pending_line()
+        if final:
+            self.close()
+        return batch
+
+    cdef _drop_pending_line(self):
+        """Handle the incomplete line in pending_, too long to be valid, as
+        malformed and drop it up to its newline."""
+        _stats_decode_error(0)
+        if self.errors_ == ERRORS_RAISE:
+            raise DecodeError("Invalid KSUID on line %d at offset %d"
+                              % (self.lines_ + 1, self.offset_), self.lines_)
+        elif self.errors_ == ERRORS_COLLECT:
+            self.invalid_offsets.append(self.offset_)
+        self.lines_ += 1
+        self.offset_ += len(self.pending_)
+        self.pending_ = b""
+        self.skip_line_ = True
+
+    cdef KsuidArray _decode(self, const char* src, Py_ssize_t size, bint final):
+        """Decode complete lines of src, advancing offset_ past them."""
+        cdef KsuidArray batch = KsuidArray(ksuid_cls=self.ksuid_cls_)
+        cdef Py_ssize_t pos = 0
+        cdef Py_ssize_t stop
+        cdef Py_ssize_t count = 0
+        cdef Py_ssize_t bad_end
+        cdef int err_code
+
+        batch._reserve(size // _MIN_LINE_LENGTH + 1)
+        while True:
+            with nogil:
+                stop = _decode_lines(src + pos, size - pos, final,
+                                     batch.data_, &count, &self.lines_, &bad_end,
+                                     &err_code)
+            if bad_end < 0:
+                pos += stop
+                break
+
+            _stats_decode_error(err_code)
+            if self.errors_ == ERRORS_RAISE:
+                raise DecodeError("Invalid KSUID on line %d at offset %d"
+                                  % (self.lines_ + 1, self.offset_ + pos + stop),
+                                  self.lines_)
+            elif self.errors_ == ERRORS_COLLECT:
+                self.invalid_offsets.append(self.offset_ + pos + stop)
+            self.lines_ += 1
+            pos += bad_end
+
+        batch.len_ = count
+        self.offset_ += pos
+        return batch
+
+
+def iter_parse(source, Py_ssize_t chunk_size=DEFAULT_CHUNK_SIZE, ksuid_cls=None,
+               errors="raise"):
+    """Parse newline separated base62 encoded KSUIDs in batches.
+
+    Files given by path are memory-mapped, file objects are read in chunks.
+    Blank lines and ``\\r\\n`` line endings are accepted.
+
+    :param source: path or binary file object.
+    :param int chunk_size: bytes to decode per batch.
+    :param callable ksuid_cls: class to use for KSUID, defaults to Ksuid.
+    :param str errors: what to do with malformed lines: ``"raise"`` a
+        DecodeError, ``"skip"`` them, or ``"collect"`` their byte offsets into
+        ``invalid_offsets`` of the returned reader.
+    :return: a :class:`KsuidReader` yielding :class:`KsuidArray` batches.
+    """
+    return KsuidReader(source, chunk_size, ksuid_cls, errors)
+
+
+def write_encoded(fileobj, ids, Py_ssize_t chunk_size=DEFAULT_CHUNK_SIZE):
+    """Write KSUIDs base62 encoded, one per line.
+
+    :param fileobj: binary or text file object.
+    :param ids: buffer of contiguous raw KSUIDs (such as a KsuidArray), or an
+        iterable of KSUIDs.
+    :param int chunk_size: maximum bytes per write.
+    :return: number of KSUIDs written.
+    """
+    cdef Py_ssize_t per_chunk = max(chunk_size // _MIN_LINE_LENGTH, 1)
+    cdef Py_ssize_t total = 0
+    cdef KsuidArray batch
+    cdef bint text = isinstance(fileobj, io.TextIOBase)
+
+    try:
+        view = memoryview(ids).cast("B")
+    except TypeError:
+        view = None
+
+    if view is not None:
+        if len(view) % BASE62_BYTE_LENGTH:
+            raise ValueError("Input size must be a multiple of %d" % BASE62_BYTE_LENGTH)
+        step = per_chunk * BASE62_BYTE_LENGTH
+        for start in range(0, len(view), step):
+            _write_chunk(fileobj, view[start:start + step], text)
+        return len(view) // BASE62_BYTE_LENGTH
+
+    batch = KsuidArray()
+    for k in ids:
+        batch.append(k)
+        if len(batch) == per_chunk:
+            _write_chunk(fileobj, batch, text)
+            total += len(batch)
+            batch = KsuidArray()
+    _write_chunk(fileobj, batch, text)
+    return total + len(batch)
+
+
+cdef _write_chunk(fileobj, raw, bint text):
+    data = encode_many(raw, newline=True)
+    if text:
+        data = data.decode("ascii")
+    if data:
+        fileobj.write(data)
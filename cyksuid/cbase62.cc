@@ -1,5 +1,4 @@
 #include <stdint.h>
-#include <string.h>
 
 #include "cbase62.h"
 
@@ -7,6 +6,7 @@
 #define ERR_B62_INSUFFICIENT_OUTPUT_BUFFER -1
 #define ERR_B62_INSUFFICIENT_INPUT_BUFFER -2
 #define ERR_B62_INVALID_INPUT -3
+#define ERR_B62_OUT_OF_RANGE -4
 
 #define _BASE62_BYTE_SIZE 20
 #define _BASE62_ENCODED_SIZE 27
@@ -26,10 +26,37 @@ static constexpr unsigned char table_a2b_base62[] = {
     /* clang-format on */
 };
 
-int ksuid_b62_encode(char* dst, size_t dst_size, const unsigned char* src, size_t src_size) {
-  const uint64_t SRC_BASE = 4294967296UL;
-  const uint64_t DST_BASE = 62UL;
+#if defined(__SIZEOF_INT128__) && !defined(KSUID_B62_NO_INT128)
+#define KSUID_B62_HAVE_INT128 1
+#endif
+
+// Emit `count` base62 digits of `value` backwards, ending right before `dst`.
+static inline void emit_digits(char* dst, uint64_t value, int count) {
+  for (int i = 0; i < count; i++) {
+    *--dst = table_b2a_base62[value % 62];
+    value /= 62;
+  }
+}
 
+#ifdef KSUID_B62_HAVE_INT128
+
+// 62^10, the largest power of 62 below 2^60
+static constexpr uint64_t B62_CHUNK = 839299365868340224ULL;
+static constexpr int B62_CHUNK_DIGITS = 10;
+
+static inline uint64_t load_be64(const unsigned char* p) {
+  return (uint64_t)p[0] << 56 | (uint64_t)p[1] << 48 | (uint64_t)p[2] << 40 | (uint64_t)p[3] << 32 |
+         (uint64_t)p[4] << 24 | (uint64_t)p[5] << 16 | (uint64_t)p[6] << 8 | (uint64_t)p[7];
+}
+
+static inline void store_be64(unsigned char* p, uint64_t v) {
+  for (int i = 7; i >= 0; i--) {
+    p[i] = (unsigned char)v;
+    v >>= 8;
+  }
+}
+
+int ksuid_b62_encode(char* dst, size_t dst_size, const unsigned char* src, size_t src_size) {
   if (src_size != _BASE62_BYTE_SIZE) {
     return ERR_B62_INSUFFICIENT_INPUT_BUFFER;
   }
@@ -38,105 +65,164 @@ int ksuid_b62_encode(char* dst, size_t dst_size, const unsigned char* src, size_
     return ERR_B62_INSUFFICIENT_OUTPUT_BUFFER;
   }
 
-  uint32_t parts[5] = {
-      // Bootstrap
-      /* clang-format off */
-      (uint32_t)(src[0]) << 24 | (uint32_t)(src[1]) << 16 | (uint32_t)(src[2]) << 8 | (uint32_t)(src[3]),
-      (uint32_t)(src[4]) << 24 | (uint32_t)(src[5]) << 16 | (uint32_t)(src[6]) << 8 | (uint32_t)(src[7]),
-      (uint32_t)(src[8]) << 24 | (uint32_t)(src[9]) << 16 | (uint32_t)(src[10]) << 8 | (uint32_t)(src[11]),
-      (uint32_t)(src[12]) << 24 | (uint32_t)(src[13]) << 16 | (uint32_t)(src[14]) << 8 | (uint32_t)(src[15]),
-      (uint32_t)(src[16]) << 24 | (uint32_t)(src[17]) << 16 | (uint32_t)(src[18]) << 8 | (uint32_t)(src[19]),
-      /* clang-format on */
-  };
-
-  uint32_t* bp = parts;
-  uint32_t bq[5];
-  size_t bp_len = 5;
-  while (bp_len) {
-    uint64_t rem = 0;
-    size_t bq_len = 0;
+  // 160-bit value as 32 + 64 + 64 bit limbs
+  uint64_t hi = (uint64_t)src[0] << 24 | (uint64_t)src[1] << 16 | (uint64_t)src[2] << 8 | src[3];
+  uint64_t mid = load_be64(src + 4);
+  uint64_t lo = load_be64(src + 12);
+
+  // Each pass divides by 62^10 and emits ten digits from the remainder
+  char* p = dst + _BASE62_ENCODED_SIZE;
+  for (int pass = 0; pass < 2; pass++) {
+    unsigned __int128 t = (unsigned __int128)hi << 64 | mid;
+    hi = 0;
+    mid = (uint64_t)(t / B62_CHUNK);
+    t = (unsigned __int128)(t % B62_CHUNK) << 64 | lo;
+    lo = (uint64_t)(t / B62_CHUNK);
+    emit_digits(p, (uint64_t)(t % B62_CHUNK), B62_CHUNK_DIGITS);
+    p -= B62_CHUNK_DIGITS;
+  }
+
+  // 2^160 < 62^27, so the seven leading digits fit into the low limb
+  emit_digits(p, lo, _BASE62_ENCODED_SIZE - 2 * B62_CHUNK_DIGITS);
+  return 0;
+}
+
+int ksuid_b62_decode(unsigned char* dst, size_t dst_size, const char* src, size_t src_size) {
+  if (src_size != _BASE62_ENCODED_SIZE) {
+    return ERR_B62_INSUFFICIENT_INPUT_BUFFER;
+  }
 
-    for (size_t i = 0; i < bp_len; i++) {
-      uint64_t value = (uint64_t)bp[i] + rem * SRC_BASE;
-      uint64_t digit = value / DST_BASE;
-      rem = value % DST_BASE;
+  if (dst_size != _BASE62_BYTE_SIZE) {
+    return ERR_B62_INSUFFICIENT_OUTPUT_BUFFER;
+  }
 
-      if (bq_len != 0 || digit != 0) {
-        bq[bq_len++] = (uint32_t)digit;
+  // Accumulate 7 + 10 + 10 digits, multiplying the 192-bit value by 62^10
+  // between chunks
+  uint64_t hi = 0, mid = 0, lo = 0;
+  size_t i = 0;
+  for (size_t chunk_end = _BASE62_ENCODED_SIZE - 2 * B62_CHUNK_DIGITS;
+       chunk_end <= _BASE62_ENCODED_SIZE; chunk_end += B62_CHUNK_DIGITS) {
+    uint64_t chunk = 0;
+    for (; i < chunk_end; i++) {
+      uint8_t c = src[i];
+      uint8_t v = table_a2b_base62[c & 0x7f];
+      if (c >= 0x80 || v == 0xff) {
+        return ERR_B62_INVALID_INPUT;
       }
+      chunk = chunk * 62 + v;
     }
 
-    dst[--dst_size] = table_b2a_base62[rem];
-    bp = bq;
-    bp_len = bq_len;
+    unsigned __int128 t = (unsigned __int128)lo * B62_CHUNK + chunk;
+    lo = (uint64_t)t;
+    t = (unsigned __int128)mid * B62_CHUNK + (uint64_t)(t >> 64);
+    mid = (uint64_t)t;
+    hi = hi * B62_CHUNK + (uint64_t)(t >> 64);
   }
 
-  // Add padding at the head of the destination buffer for all bytes that were not set
-  if (dst_size) {
-    memset(dst, '0', dst_size);
+  // The value does not fit into 160 bits, it is above MAX_ENCODED
+  if (hi >> 32) {
+    return ERR_B62_OUT_OF_RANGE;
   }
 
+  dst[0] = (uint8_t)(hi >> 24);
+  dst[1] = (uint8_t)(hi >> 16);
+  dst[2] = (uint8_t)(hi >> 8);
+  dst[3] = (uint8_t)(hi);
+  store_be64(dst + 4, mid);
+  store_be64(dst + 12, lo);
   return 0;
 }
 
-int ksuid_b62_decode(unsigned char* dst, size_t dst_size, const char* src, size_t src_size) {
-  const uint64_t SRC_BASE = 62UL;
-  const uint64_t DST_BASE = 4294967296UL;
+#else // Portable fallback using 32-bit limbs and 64-bit intermediates
 
-  if (src_size != _BASE62_ENCODED_SIZE) {
+// 62^5, the largest power of 62 below 2^30
+static constexpr uint64_t B62_CHUNK = 916132832ULL;
+static constexpr int B62_CHUNK_DIGITS = 5;
+static constexpr int B62_LIMBS = 5;
+
+int ksuid_b62_encode(char* dst, size_t dst_size, const unsigned char* src, size_t src_size) {
+  if (src_size != _BASE62_BYTE_SIZE) {
     return ERR_B62_INSUFFICIENT_INPUT_BUFFER;
   }
 
-  if (dst_size != _BASE62_BYTE_SIZE) {
+  if (dst_size != _BASE62_ENCODED_SIZE) {
     return ERR_B62_INSUFFICIENT_OUTPUT_BUFFER;
   }
 
-  // Bootstrap
-  uint8_t parts[_BASE62_ENCODED_SIZE];
-  for (size_t i = 0; i < _BASE62_ENCODED_SIZE; i++) {
-    uint8_t c = src[i];
-    uint8_t v = table_a2b_base62[c & 0x7f];
-    if (c >= 0x80) {
-      return ERR_B62_INVALID_INPUT;
+  uint32_t parts[B62_LIMBS];
+  for (int i = 0; i < B62_LIMBS; i++) {
+    const unsigned char* q = src + 4 * i;
+    parts[i] = (uint32_t)q[0] << 24 | (uint32_t)q[1] << 16 | (uint32_t)q[2] << 8 | (uint32_t)q[3];
+  }
+
+  // Each pass divides by 62^5 and emits five digits from the remainder
+  char* p = dst + _BASE62_ENCODED_SIZE;
+  int remaining = _BASE62_ENCODED_SIZE;
+  while (remaining > 0) {
+    uint64_t rem = 0;
+    for (int i = 0; i < B62_LIMBS; i++) {
+      uint64_t value = rem << 32 | parts[i];
+      parts[i] = (uint32_t)(value / B62_CHUNK);
+      rem = value % B62_CHUNK;
     }
 
-    parts[i] = v;
-  };
+    int count = remaining < B62_CHUNK_DIGITS ? remaining : B62_CHUNK_DIGITS;
+    emit_digits(p, rem, count);
+    p -= count;
+    remaining -= count;
+  }
 
-  uint8_t bq[_BASE62_ENCODED_SIZE];
-  uint8_t* bp = parts;
-  size_t bp_len = _BASE62_ENCODED_SIZE;
-  while (bp_len) {
-    uint64_t rem = 0;
-    size_t bq_len = 0;
+  return 0;
+}
+
+int ksuid_b62_decode(unsigned char* dst, size_t dst_size, const char* src, size_t src_size) {
+  if (src_size != _BASE62_ENCODED_SIZE) {
+    return ERR_B62_INSUFFICIENT_INPUT_BUFFER;
+  }
 
-    for (size_t i = 0; i < bp_len; i++) {
-      uint64_t value = (uint64_t)bp[i] + rem * SRC_BASE;
-      uint64_t digit = value / DST_BASE;
-      rem = value % DST_BASE;
+  if (dst_size != _BASE62_BYTE_SIZE) {
+    return ERR_B62_INSUFFICIENT_OUTPUT_BUFFER;
+  }
 
-      if (bq_len != 0 || digit != 0) {
-        bq[bq_len++] = (uint8_t)digit;
+  // One extra limb to detect values that do not fit into 160 bits
+  uint32_t parts[B62_LIMBS + 1] = {0};
+  size_t i = 0;
+  for (size_t chunk_end = _BASE62_ENCODED_SIZE % B62_CHUNK_DIGITS; chunk_end <= _BASE62_ENCODED_SIZE;
+       chunk_end += B62_CHUNK_DIGITS) {
+    uint64_t chunk = 0;
+    uint64_t scale = 1;
+    for (; i < chunk_end; i++) {
+      uint8_t c = src[i];
+      uint8_t v = table_a2b_base62[c & 0x7f];
+      if (c >= 0x80 || v == 0xff) {
+        return ERR_B62_INVALID_INPUT;
       }
+      chunk = chunk * 62 + v;
+      scale *= 62;
     }
 
-    if (dst_size < 4) {
-      return ERR_B62_INSUFFICIENT_OUTPUT_BUFFER;
+    uint64_t carry = chunk;
+    for (int j = B62_LIMBS; j >= 0; j--) {
+      uint64_t value = (uint64_t)parts[j] * scale + carry;
+      parts[j] = (uint32_t)value;
+      carry = value >> 32;
     }
+  }
 
-    dst[dst_size - 4] = (uint8_t)(rem >> 24);
-    dst[dst_size - 3] = (uint8_t)(rem >> 16);
-    dst[dst_size - 2] = (uint8_t)(rem >> 8);
-    dst[dst_size - 1] = (uint8_t)(rem);
-    dst_size -= 4;
-    bp = bq;
-    bp_len = bq_len;
+  // The value does not fit into 160 bits, it is above MAX_ENCODED
+  if (parts[0]) {
+    return ERR_B62_OUT_OF_RANGE;
   }
 
-  // Add 'zeros' at the head of the destination buffer for all bytes that were not set
-  if (dst_size) {
-    memset(dst, 0, dst_size);
+  for (int j = 0; j < B62_LIMBS; j++) {
+    uint32_t v = parts[j + 1];
+    dst[4 * j + 0] = (uint8_t)(v >> 24);
+    dst[4 * j + 1] = (uint8_t)(v >> 16);
+    dst[4 * j + 2] = (uint8_t)(v >> 8);
+    dst[4 * j + 3] = (uint8_t)(v);
   }
 
   return 0;
 }
+
+#endif
@@ -0,0 +1,218 @@
+"""Command-line tool for bulk generation, inspection and conversion of KSUIDs.
+
+All commands stream their input and output in chunks, so piping any number of
+IDs runs at constant memory.
+"""
+
+import argparse
+import os
+import sys
+import timeit
+from typing import IO, Callable, Dict, Iterator, List, Optional, Type
+
+from cyksuid import __version__
+from cyksuid.fast_base62 import decode_many, encode_many
+from cyksuid.v2 import (
+    BYTE_LENGTH,
+    Ksuid,
+    Ksuid40,
+    Ksuid48,
+    KsuidArray,
+    generate_many,
+    iter_parse,
+    ksuid,
+    parse,
+    set_encoded_cache,
+)
+
+VARIANTS: Dict[str, Type[Ksuid]] = {
+    "ksuid": Ksuid,
+    "ksuid40": Ksuid40,
+    "ksuid48": Ksuid48,
+}
+FORMATS = ["base62", "hex", "raw"]
+HEX_DIGITS = b"0123456789abcdefABCDEF"
+# KSUIDs per chunk of I/O
+CHUNK_COUNT = 1 << 16
+
+
+def _write(out: IO[bytes], raw: bytes, fmt: str) -> None:
+    if not raw:
+        return
+    if fmt == "base62":
+        out.write(encode_many(raw, newline=True))
+    elif fmt == "hex":
+        records = memoryview(raw)
+        lines = [
+            records[start:end].hex()
+            for start, end in zip(
+                range(0, len(raw), BYTE_LENGTH),
+                range(BYTE_LENGTH, len(raw) + 1, BYTE_LENGTH),
+            )
+        ]
+        out.write("\n".join(lines).encode() + b"\n")
+    else:
+        out.write(raw)
+
+
+def _is_hex(line: bytes) -> bool:
+    return not line.translate(None, HEX_DIGITS)
+
+
+def _read(fileobj: IO[bytes], fmt: str, ksuid_cls: Type[Ksuid]) -> Iterator[KsuidArray]:
+    if fmt == "base62":
+        yield from iter_parse(fileobj, CHUNK_COUNT * 28, ksuid_cls)
+    elif fmt == "hex":
+        lineno = 0
+        while True:
+            lines = fileobj.readlines(CHUNK_COUNT * 41)
+            if not lines:
+                break
+            records = []
+            for line in lines:
+                lineno += 1
+                # Blank lines are skipped, as in base62 input
+                line = line.rstrip(b"\r\n")
+                if not line:
+                    continue
+                if len(line) != 2 * BYTE_LENGTH or not _is_hex(line):
+                    raise ValueError("Invalid hex KSUID on line %d" % lineno)
+                records.append(line)
+            yield KsuidArray.from_buffer(
+                bytes.fromhex(b"".join(records).decode()), ksuid_cls
+            )
+    else:
+        while True:
+            raw = fileobj.read(CHUNK_COUNT * BYTE_LENGTH)
+            if not raw:
+                break
+            if len(raw) % BYTE_LENGTH:
+                raise ValueError(
+                    "raw input is not a sequence of %d bytes KSUIDs" % BYTE_LENGTH
+                )
+            yield KsuidArray.from_buffer(raw, ksuid_cls)
+
+
+def _open_input(args: argparse.Namespace) -> IO[bytes]:
+    if args.input == "-":
+        return sys.stdin.buffer
+    return open(args.input, "rb")
+
+
+def cmd_generate(args: argparse.Namespace, out: IO[bytes]) -> None:
+    ksuid_cls = VARIANTS[args.variant]
+    remaining = args.count
+    while remaining > 0:
+        n = min(remaining, CHUNK_COUNT)
+        _write(out, generate_many(n, ksuid_cls), args.format)
+        remaining -= n
+
+
+def cmd_inspect(args: argparse.Namespace, out: IO[bytes]) -> None:
+    with _open_input(args) as fileobj:
+        for batch in _read(fileobj, args.input_format, VARIANTS[args.variant]):
+            lines = [
+                "%s\t%d\t%s\t%s\n"
+                % (k, k.timestamp_millis, k.datetime.isoformat(), k.payload.hex())
+                for k in batch
+            ]
+            out.write("".join(lines).encode())
+
+
+def cmd_convert(args: argparse.Namespace, out: IO[bytes]) -> None:
+    with _open_input(args) as fileobj:
+        for batch in _read(fileobj, args.input_format, Ksuid):
+            _write(out, batch.tobytes(), args.format)
+
+
+def _bench(func: Callable[[], object], n: int, repeat: int) -> float:
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number / n * 1e9
+
+
+def cmd_bench(args: argparse.Namespace, out: IO[bytes]) -> None:
+    ksuid_cls = VARIANTS[args.variant]
+    n = args.count
+    raw = generate_many(n, ksuid_cls)
+    encoded = encode_many(raw)
+    ids = list(KsuidArray.from_buffer(raw, ksuid_cls))
+    strs = [str(k) for k in ids]
+
+    def encode() -> None:
+        for k in ids:
+            str(k)
+
+    results = [
+        ("generate", _bench(lambda: ksuid(ksuid_cls=ksuid_cls), 1, args.repeat)),
+        ("generate_many", _bench(lambda: generate_many(n, ksuid_cls), n, args.repeat)),
+        ("parse", _bench(lambda: [parse(s, ksuid_cls) for s in strs], n, args.repeat)),
+        ("decode_many", _bench(lambda: decode_many(encoded), n, args.repeat)),
+        ("encode_many", _bench(lambda: encode_many(raw), n, args.repeat)),
+    ]
+    set_encoded_cache(False)
+    try:
+        results.append(("encode", _bench(encode, n, args.repeat)))
+    finally:
+        set_encoded_cache(True)
+
+    for name, ns in results:
+        out.write(("%-14s %10.1f ns/op\n" % (name, ns)).encode())
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="cyksuid", description=__doc__)
+    parser.add_argument("--version", action="version", version=__version__)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_variant(p: argparse.ArgumentParser) -> None:
+        p.add_argument(
+            "-v", "--variant", choices=VARIANTS, default="ksuid", help="KSUID variant"
+        )
+
+    def add_input(p: argparse.ArgumentParser) -> None:
+        p.add_argument(
+            "input", nargs="?", default="-", help="input file, defaults to stdin"
+        )
+        p.add_argument("-i", "--input-format", choices=FORMATS, default="base62")
+
+    p = subparsers.add_parser("generate", help="generate KSUIDs")
+    p.add_argument("-n", "--count", type=int, default=1, help="number of KSUIDs")
+    p.add_argument("-f", "--format", choices=FORMATS, default="base62")
+    add_variant(p)
+    p.set_defaults(func=cmd_generate)
+
+    p = subparsers.add_parser(
+        "inspect", help="print encoded form, timestamp in ms, datetime and payload"
+    )
+    add_input(p)
+    add_variant(p)
+    p.set_defaults(func=cmd_inspect)
+
+    p = subparsers.add_parser("convert", help="convert KSUIDs between encodings")
+    add_input(p)
+    p.add_argument("-f", "--format", choices=FORMATS, default="hex")
+    p.set_defaults(func=cmd_convert)
+
+    p = subparsers.add_parser("bench", help="measure ns/op on this machine")
+    p.add_argument("-n", "--count", type=int, default=10000, help="batch size")
+    p.add_argument("-r", "--repeat", type=int, default=5, help="best of N runs")
+    add_variant(p)
+    p.set_defaults(func=cmd_bench)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parser().parse_args(argv)
+    out = sys.stdout.buffer
+    try:
+        args.func(args, out)
+        out.flush()
+    except BrokenPipeError:
+        # Output closed early, e.g. piped into head: silence the flush at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    except (ValueError, OSError) as e:
+        print("cyksuid: error: %s" % e, file=sys.stderr)
+        return 1
+    return 0
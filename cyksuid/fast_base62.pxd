@@ -5,11 +5,14 @@ cdef enum ERROR_CODE:
     ERR_B62_INSUFFICIENT_OUTPUT_BUFFER = -1
     ERR_B62_INSUFFICIENT_INPUT_BUFFER = -2
     ERR_B62_INVALID_INPUT = -3
+    ERR_B62_OUT_OF_RANGE = -4
 
 
 cdef enum:
     BASE62_BYTE_LENGTH = 20
     BASE62_ENCODED_LENGTH = 27
+    # Smallest share of records per thread in parallel bulk operations
+    MIN_RECORDS_PER_THREAD = 4096
 
 
 cdef extern from "cbase62.h" nogil:
@@ -17,5 +20,53 @@ cdef extern from "cbase62.h" nogil:
     int ksuid_b62_decode(unsigned char *dst, size_t dst_len, const char *src, size_t src_len)
 
 
+cdef extern from "ksuidstats.h" nogil:
+    const bint CYKSUID_STATS
+    const int KSUID_STATS_DECODE_ERRORS
+
+    ctypedef struct KsuidStats:
+        bint enabled
+        uint64_t generated[3]
+        uint64_t parsed_str
+        uint64_t parsed_bytes
+        uint64_t decode_errors[5]
+        uint64_t entropy_bytes
+        uint64_t timestamp_regressions
+        int64_t last_millis[3]
+
+    void ksuid_stats_add(uint64_t* counter, uint64_t n)
+
+
+# Counters shared by all extension modules of the package
+cdef KsuidStats _stats
+
+
+cdef inline void _stats_add(uint64_t* counter, uint64_t n) noexcept nogil:
+    if CYKSUID_STATS and _stats.enabled:
+        ksuid_stats_add(counter, n)
+
+
+cdef inline void _stats_decode_error(int err_code) noexcept nogil:
+    # err_code is 0 for inputs of the wrong length, else a negative ERROR_CODE
+    if CYKSUID_STATS and _stats.enabled and -err_code < KSUID_STATS_DECODE_ERRORS:
+        ksuid_stats_add(&_stats.decode_errors[-err_code], 1)
+
+
+cdef int _raise_b62_error(int err_code) except -1
 cdef bytes _fast_b62encode(const uint8_t* src, size_t src_len)
 cdef bytes _fast_b62decode(const char* src, size_t src_len)
+cdef int _b62decode_into(uint8_t* dst, const char* src, size_t src_len) except -1
+cdef void _b62encode_many(char* dst, size_t dst_stride, const uint8_t* src,
+                          size_t n) noexcept nogil
+cdef Py_ssize_t _b62decode_many(uint8_t* dst, const char* src, size_t src_stride,
+                                size_t n, bint terminated) noexcept nogil
+cdef int _b62decode_error(const char* src, size_t src_len) noexcept nogil
+cdef int _resolve_threads(object threads, Py_ssize_t n) except -1
+cdef void _b62encode_many_parallel(char* dst, size_t dst_stride, const uint8_t* src,
+                                   size_t n, int threads) noexcept nogil
+cdef Py_ssize_t _b62decode_many_parallel(uint8_t* dst, const char* src, size_t src_stride,
+                                         size_t n, bint terminated,
+                                         int threads) noexcept nogil
+cdef Py_ssize_t _encoded_records(Py_ssize_t size, bint newline) except -1
+cdef int _b62decode_records(uint8_t* dst, const char* src, Py_ssize_t size,
+                            bint newline, int threads) except -1
@@ -1,2 +1,50 @@
+from typing import Any, Dict, Optional, TypeVar, overload
+
+from cyksuid import hints
+
+OutT = TypeVar("OutT", bound=hints.WritableBuffer)
+
+HAS_OPENMP: bool
+
+def set_stats_enabled(enabled: bool) -> None:
+    """Enable or disable the runtime counters reported by :func:`stats`."""
+
+def stats() -> Dict[str, Any]:
+    """Snapshot of the runtime counters as a dict."""
+
+def stats_reset() -> None:
+    """Reset all runtime counters to zero."""
+
+class DecodeError(ValueError):
+    """Raised when a record in a bulk decode is not a valid KSUID."""
+
+    index: int
+
 def fast_b62encode(src: bytes) -> bytes: ...
 def fast_b62decode(src: bytes) -> bytes: ...
+@overload
+def encode_many(
+    src: hints.Buffer,
+    out: None = None,
+    newline: bool = False,
+    threads: Optional[int] = None,
+) -> bytes:
+    """Base62 encode contiguous raw KSUIDs in bulk."""
+
+@overload
+def encode_many(
+    src: hints.Buffer, out: OutT, newline: bool = False, threads: Optional[int] = None
+) -> OutT: ...
+@overload
+def decode_many(
+    src: hints.Buffer,
+    out: None = None,
+    newline: bool = False,
+    threads: Optional[int] = None,
+) -> bytes:
+    """Decode contiguous base62 encoded KSUIDs in bulk."""
+
+@overload
+def decode_many(
+    src: hints.Buffer, out: OutT, newline: bool = False, threads: Optional[int] = None
+) -> OutT: ...
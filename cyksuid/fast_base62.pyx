@@ -1,4 +1,100 @@
-from cpython.bytes cimport PyBytes_FromStringAndSize
+from cpython.buffer cimport (PyBUF_SIMPLE, PyBUF_WRITABLE, PyBuffer_Release,
+                             PyObject_GetBuffer)
+from cpython.bytes cimport PyBytes_AS_STRING, PyBytes_FromStringAndSize
+from cpython.mem cimport PyMem_RawFree, PyMem_RawMalloc
+from cython.parallel cimport prange
+from libc.string cimport memset
+
+import os
+
+cdef extern from *:
+    """
+    #ifdef _OPENMP
+    #define __PYX_KSUID_OPENMP 1
+    #else
+    #define __PYX_KSUID_OPENMP 0
+    #endif
+    """
+    const bint _OPENMP "__PYX_KSUID_OPENMP"
+
+#: Whether the extensions were built with OpenMP, ``threads`` is ignored otherwise.
+HAS_OPENMP = _OPENMP
+
+
+_stats.enabled = True
+
+
+def set_stats_enabled(bint enabled):
+    """Enable or disable the runtime counters reported by :func:`stats`.
+
+    Counting is enabled by default, unless the extensions were built with
+    ``--no-stats``, which compiles the counters out.
+    """
+    _stats.enabled = enabled
+
+
+def stats():
+    """Snapshot of the runtime counters as a dict.
+
+    - ``enabled``: whether counters are compiled in and enabled.
+    - ``generated``: KSUIDs generated, by KSUID class name.
+    - ``parsed``: ``parse()`` and ``try_parse()`` calls, by input type,
+      ``"str"`` or ``"bytes"``.
+    - ``decode_errors``: failed decodes, by error.
+    - ``entropy_bytes``: random payload bytes requested.
+    - ``timestamp_regressions``: clock readings earlier than the previous one
+      for the same KSUID class.
+    """
+    return {
+        "enabled": bool(CYKSUID_STATS and _stats.enabled),
+        "generated": {
+            "Ksuid": _stats.generated[0],
+            "Ksuid40": _stats.generated[1],
+            "Ksuid48": _stats.generated[2],
+        },
+        "parsed": {
+            "str": _stats.parsed_str,
+            "bytes": _stats.parsed_bytes,
+        },
+        "decode_errors": {
+            "invalid_length": _stats.decode_errors[0],
+            "insufficient_output_buffer": _stats.decode_errors[-ERR_B62_INSUFFICIENT_OUTPUT_BUFFER],
+            "insufficient_input_buffer": _stats.decode_errors[-ERR_B62_INSUFFICIENT_INPUT_BUFFER],
+            "invalid_input": _stats.decode_errors[-ERR_B62_INVALID_INPUT],
+            "out_of_range": _stats.decode_errors[-ERR_B62_OUT_OF_RANGE],
+        },
+        "entropy_bytes": _stats.entropy_bytes,
+        "timestamp_regressions": _stats.timestamp_regressions,
+    }
+
+
+def stats_reset():
+    """Reset all runtime counters to zero."""
+    cdef bint enabled = _stats.enabled
+    memset(&_stats, 0, sizeof(_stats))
+    _stats.enabled = enabled
+
+
+class DecodeError(ValueError):
+    """Raised when a record in a bulk decode is not a valid KSUID."""
+
+    def __init__(self, message, index):
+        super().__init__(message)
+        #: Index of the first invalid record.
+        self.index = index
+
+
+cdef int _raise_b62_error(int err_code) except -1:
+    if err_code == ERR_B62_INSUFFICIENT_OUTPUT_BUFFER:
+        raise ValueError("Insufficient output buffer size")
+    elif err_code == ERR_B62_INSUFFICIENT_INPUT_BUFFER:
+        raise ValueError("Insufficient input buffer size")  # pragma: no cover
+    elif err_code == ERR_B62_INVALID_INPUT:
+        raise ValueError("Invalid input buffer")
+    elif err_code == ERR_B62_OUT_OF_RANGE:
+        raise ValueError("Encoded value out of range, above MAX_ENCODED")
+    else:
+        raise ValueError("Unknown error: %d" % err_code)  # pragma: no cover
 
 
 cdef bytes _fast_b62encode(const uint8_t* src, size_t src_len):
@@ -6,44 +102,249 @@ cdef bytes _fast_b62encode(const uint8_t* src, size_t src_len):
     cdef int err_code
 
     err_code = ksuid_b62_encode(dst_buf, BASE62_ENCODED_LENGTH, src, src_len)
-
-    # Checking error codes
     if err_code != 0:
-        if err_code == ERR_B62_INSUFFICIENT_OUTPUT_BUFFER:
-            raise ValueError("Insufficient output buffer size")  # pragma: no cover
-        elif err_code == ERR_B62_INSUFFICIENT_INPUT_BUFFER:
-            raise ValueError("Insufficient input buffer size")  # pragma: no cover
-        elif err_code == ERR_B62_INVALID_INPUT:
-            raise ValueError("Invalid input buffer")  # pragma: no cover
-        else:
-            raise ValueError("Unknown error: %d" % err_code)  # pragma: no cover
+        _raise_b62_error(err_code)
 
     return PyBytes_FromStringAndSize(dst_buf, BASE62_ENCODED_LENGTH)
 
 
-cdef bytes _fast_b62decode(const char* src, size_t src_len):
-    cdef unsigned char[BASE62_BYTE_LENGTH] dst_buf
+cdef int _b62decode_into(uint8_t* dst, const char* src, size_t src_len) except -1:
     cdef int err_code
 
-    err_code = ksuid_b62_decode(dst_buf, BASE62_BYTE_LENGTH, src, src_len)
-
-    # Checking error codes
+    err_code = ksuid_b62_decode(dst, BASE62_BYTE_LENGTH, src, src_len)
     if err_code != 0:
-        if err_code == ERR_B62_INSUFFICIENT_OUTPUT_BUFFER:
-            raise ValueError("Insufficient output buffer size")  # pragma: no cover
-        elif err_code == ERR_B62_INSUFFICIENT_INPUT_BUFFER:
-            raise ValueError("Insufficient input buffer size")  # pragma: no cover
-        elif err_code == ERR_B62_INVALID_INPUT:
-            raise ValueError("Invalid input buffer")  # pragma: no cover
-        else:
-            raise ValueError("Unknown error: %d" % err_code)  # pragma: no cover
+        _stats_decode_error(err_code)
+        _raise_b62_error(err_code)
+    return 0
+
+
+cdef bytes _fast_b62decode(const char* src, size_t src_len):
+    cdef unsigned char[BASE62_BYTE_LENGTH] dst_buf
 
+    _b62decode_into(dst_buf, src, src_len)
     return PyBytes_FromStringAndSize(<char *>dst_buf, BASE62_BYTE_LENGTH)
 
 
+cdef void _b62encode_many(char* dst, size_t dst_stride, const uint8_t* src,
+                          size_t n) noexcept nogil:
+    cdef size_t i
+    for i in range(n):
+        ksuid_b62_encode(dst + i * dst_stride, BASE62_ENCODED_LENGTH,
+                         src + i * BASE62_BYTE_LENGTH, BASE62_BYTE_LENGTH)
+        if dst_stride > BASE62_ENCODED_LENGTH:
+            dst[i * dst_stride + BASE62_ENCODED_LENGTH] = b'\n'
+
+
+cdef Py_ssize_t _b62decode_many(uint8_t* dst, const char* src, size_t src_stride,
+                                size_t n, bint terminated) noexcept nogil:
+    """Decode ``n`` records, return the index of the first invalid one or -1.
+    With a separator stride, ``terminated`` tells whether the last record is
+    followed by one, which must then be ``\\n`` too."""
+    cdef size_t i
+    for i in range(n):
+        if ksuid_b62_decode(dst + i * BASE62_BYTE_LENGTH, BASE62_BYTE_LENGTH,
+                            src + i * src_stride, BASE62_ENCODED_LENGTH) != 0:
+            return i
+        if (src_stride > BASE62_ENCODED_LENGTH and (terminated or i + 1 < n) and
+                src[i * src_stride + BASE62_ENCODED_LENGTH] != b'\n'):
+            return i
+    return -1
+
+
+cdef int _b62decode_error(const char* src, size_t src_len) noexcept nogil:
+    """Error code of a record rejected by _b62decode_many: its decode error,
+    or ERR_B62_INVALID_INPUT if only the separator after it is wrong."""
+    cdef uint8_t dst[BASE62_BYTE_LENGTH]
+    cdef int err_code = ksuid_b62_decode(dst, BASE62_BYTE_LENGTH, src, src_len)
+    return err_code if err_code != 0 else ERR_B62_INVALID_INPUT
+
+
+cdef object _get_output(object out, Py_buffer* view, Py_ssize_t size):
+    if out is None:
+        out = PyBytes_FromStringAndSize(NULL, size)
+        PyObject_GetBuffer(out, view, PyBUF_SIMPLE)
+        return out
+
+    PyObject_GetBuffer(out, view, PyBUF_WRITABLE)
+    if view.len < size:
+        PyBuffer_Release(view)
+        raise ValueError("Output buffer too small, need %d bytes" % size)
+    return out
+
+
+cdef int _resolve_threads(object threads, Py_ssize_t n) except -1:
+    cdef Py_ssize_t n_threads
+
+    if threads is None:
+        return 1
+    n_threads = threads
+    if n_threads < 0:
+        raise ValueError("threads must be non-negative")
+    if n_threads == 0:
+        n_threads = os.cpu_count() or 1
+    # Not worth a thread below this many records each
+    n_threads = min(n_threads, n // MIN_RECORDS_PER_THREAD)
+    if not _OPENMP or n_threads < 1:
+        return 1
+    return n_threads
+
+
+cdef void _b62encode_many_parallel(char* dst, size_t dst_stride, const uint8_t* src,
+                                   size_t n, int threads) noexcept nogil:
+    cdef Py_ssize_t chunk = (n + threads - 1) // threads
+    cdef Py_ssize_t t
+    cdef Py_ssize_t start
+
+    if threads <= 1:
+        _b62encode_many(dst, dst_stride, src, n)
+        return
+
+    for t in prange(threads, num_threads=threads, schedule="static"):
+        start = t * chunk
+        if start < <Py_ssize_t>n:
+            _b62encode_many(dst + start * dst_stride, dst_stride,
+                            src + start * BASE62_BYTE_LENGTH,
+                            min(chunk, <Py_ssize_t>n - start))
+
+
+cdef Py_ssize_t _b62decode_many_parallel(uint8_t* dst, const char* src, size_t src_stride,
+                                         size_t n, bint terminated,
+                                         int threads) noexcept nogil:
+    cdef Py_ssize_t chunk = (n + threads - 1) // threads
+    cdef Py_ssize_t t
+    cdef Py_ssize_t start
+    cdef Py_ssize_t count
+    cdef Py_ssize_t bad = -1
+    cdef Py_ssize_t* results
+
+    if threads <= 1:
+        return _b62decode_many(dst, src, src_stride, n, terminated)
+
+    results = <Py_ssize_t*>PyMem_RawMalloc(threads * sizeof(Py_ssize_t))
+    if results == NULL:
+        return _b62decode_many(dst, src, src_stride, n, terminated)
+
+    for t in prange(threads, num_threads=threads, schedule="static"):
+        start = t * chunk
+        results[t] = -1
+        if start < <Py_ssize_t>n:
+            count = min(chunk, <Py_ssize_t>n - start)
+            # Records before the last chunk are all followed by a separator
+            results[t] = _b62decode_many(dst + start * BASE62_BYTE_LENGTH,
+                                         src + start * src_stride, src_stride, count,
+                                         terminated or start + count < <Py_ssize_t>n)
+            if results[t] >= 0:
+                results[t] += start
+
+    for t in range(threads):
+        if results[t] >= 0:
+            bad = results[t]
+            break
+    PyMem_RawFree(results)
+    return bad
+
+
 def fast_b62encode(bytes src):
     return _fast_b62encode(src, len(src))
 
 
 def fast_b62decode(bytes src):
     return _fast_b62decode(src, len(src))
+
+
+def encode_many(src, out=None, bint newline=False, threads=None):
+    """Base62 encode contiguous raw KSUIDs in bulk.
+
+    :param src: buffer of ``20 * n`` raw bytes.
+    :param out: optional writable buffer to encode into.
+    :param bool newline: terminate every encoded record with ``\\n``.
+    :param int threads: split the work across this many threads, 0 for one
+        per CPU. Serial if the extension was built without OpenMP.
+    :return: ``out`` if given, otherwise a new bytes object.
+    """
+    cdef Py_buffer src_view
+    cdef Py_buffer out_view
+    cdef size_t n
+    cdef size_t stride = BASE62_ENCODED_LENGTH + (1 if newline else 0)
+    cdef int n_threads
+
+    PyObject_GetBuffer(src, &src_view, PyBUF_SIMPLE)
+    try:
+        if src_view.len % BASE62_BYTE_LENGTH:
+            raise ValueError("Input size must be a multiple of %d" % BASE62_BYTE_LENGTH)
+        n = src_view.len // BASE62_BYTE_LENGTH
+        n_threads = _resolve_threads(threads, n)
+        out = _get_output(out, &out_view, n * stride)
+        try:
+            with nogil:
+                _b62encode_many_parallel(<char*>out_view.buf, stride,
+                                         <const uint8_t*>src_view.buf, n, n_threads)
+        finally:
+            PyBuffer_Release(&out_view)
+    finally:
+        PyBuffer_Release(&src_view)
+
+    return out
+
+
+cdef Py_ssize_t _encoded_records(Py_ssize_t size, bint newline) except -1:
+    """Number of records in ``size`` encoded bytes, the separator after the
+    last record may be omitted."""
+    cdef Py_ssize_t stride = BASE62_ENCODED_LENGTH + (1 if newline else 0)
+    if newline and size % stride == BASE62_ENCODED_LENGTH:
+        size += 1
+    if size % stride:
+        raise ValueError("Input size must be a multiple of %d" % stride)
+    return size // stride
+
+
+cdef int _b62decode_records(uint8_t* dst, const char* src, Py_ssize_t size,
+                            bint newline, int threads) except -1:
+    """Decode the records of ``size`` encoded bytes into ``dst``, which must
+    hold ``_encoded_records(size, newline)`` KSUIDs.
+
+    :raises DecodeError: if a record is invalid.
+    """
+    cdef size_t stride = BASE62_ENCODED_LENGTH + (1 if newline else 0)
+    cdef size_t n = _encoded_records(size, newline)
+    cdef bint terminated = newline and size % stride == 0
+    cdef Py_ssize_t bad
+
+    with nogil:
+        bad = _b62decode_many_parallel(dst, src, stride, n, terminated, threads)
+    if bad >= 0:
+        _stats_decode_error(_b62decode_error(src + bad * stride, BASE62_ENCODED_LENGTH))
+        raise DecodeError("Invalid encoded KSUID at index %d" % bad, bad)
+    return 0
+
+
+def decode_many(src, out=None, bint newline=False, threads=None):
+    """Decode contiguous base62 encoded KSUIDs in bulk.
+
+    :param src: buffer of ``27 * n`` encoded bytes, or of ``n`` records
+        separated by ``\\n`` if ``newline`` is true.
+    :param out: optional writable buffer to decode into.
+    :param bool newline: records are separated by ``\\n``, a trailing one is
+        allowed.
+    :param int threads: split the work across this many threads, 0 for one
+        per CPU. Serial if the extension was built without OpenMP.
+    :return: ``out`` if given, otherwise a new bytes object.
+    :raises DecodeError: if a record is invalid, ``index`` is set to the first
+        invalid record.
+    """
+    cdef Py_buffer src_view
+    cdef Py_buffer out_view
+    cdef Py_ssize_t n
+
+    PyObject_GetBuffer(src, &src_view, PyBUF_SIMPLE)
+    try:
+        n = _encoded_records(src_view.len, newline)
+        out = _get_output(out, &out_view, n * BASE62_BYTE_LENGTH)
+        try:
+            _b62decode_records(<uint8_t*>out_view.buf, <const char*>src_view.buf,
+                               src_view.len, newline, _resolve_threads(threads, n))
+        finally:
+            PyBuffer_Release(&out_view)
+    finally:
+        PyBuffer_Release(&src_view)
+    return out
@@ -2,6 +2,9 @@ from typing import Callable, Union
 
 Bytes = bytes
 StrOrBytes = Union[str, Bytes]
+Buffer = Union[bytes, bytearray, memoryview]
+WritableBuffer = Union[bytearray, memoryview]
+StrOrBuffer = Union[str, Buffer]
 IntOrFloat = Union[int, float]
 
 TimeFunc = Callable[[], IntOrFloat]
@@ -12,6 +12,7 @@ from cyksuid._ksuid import (
     Empty,
     Ksuid,
 )
+from cyksuid._ksuid import _naive_datetime
 from cyksuid._ksuid import ksuid as _new_ksuid
 from cyksuid._ksuid import parse as _new_parse
 
@@ -27,7 +28,7 @@ class KSUID(Ksuid):
     @property
     def datetime(self) -> datetime:
         """Datetime for timestamp (timezone naive)."""
-        return datetime.utcfromtimestamp(self.timestamp)
+        return _naive_datetime(self.timestamp_millis)
 
 
 def from_bytes(raw: hints.Bytes) -> KSUID:
@@ -47,7 +48,8 @@ def ksuid(
     """Factory to construct KSUID objects.
 
     :param callable time_func: function for generating time, defaults to time.time.
-    :param callable rand_func: function for generating random bytes, defaults to os.urandom.
+    :param callable rand_func: function for generating random bytes, defaults to a
+        shared EntropyPool.
     """
     return _new_ksuid(time_func=time_func, rand_func=rand_func, ksuid_cls=KSUID)
 
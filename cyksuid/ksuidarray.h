@@ -0,0 +1,305 @@
+#pragma once
+
+#include <algorithm>
+#include <cstdint>
+#include <cstring>
+#include <vector>
+
+#include "ksuidlite.h"
+
+/**
+ * Bulk operations over contiguous arrays of raw 20 bytes KSUIDs.
+ */
+
+struct KsuidRecord {
+  uint8_t data[_BYTE_SIZE];
+
+  bool operator<(const KsuidRecord& other) const noexcept {
+    return std::memcmp(data, other.data, _BYTE_SIZE) < 0;
+  }
+
+  bool operator==(const KsuidRecord& other) const noexcept {
+    return std::memcmp(data, other.data, _BYTE_SIZE) == 0;
+  }
+};
+
+static_assert(sizeof(KsuidRecord) == _BYTE_SIZE, "KsuidRecord must not be padded");
+
+inline KsuidRecord* ksuid_records(uint8_t* data) noexcept {
+  return reinterpret_cast<KsuidRecord*>(data);
+}
+
+inline const KsuidRecord* ksuid_records(const uint8_t* data) noexcept {
+  return reinterpret_cast<const KsuidRecord*>(data);
+}
+
+/**
+ * Sort `n` KSUIDs in place.
+ */
+inline void ksuid_array_sort(uint8_t* data, size_t n) {
+  std::sort(ksuid_records(data), ksuid_records(data) + n);
+}
+
+/**
+ * Remove consecutive duplicates of `n` KSUIDs in place.
+ *
+ * @return number of KSUIDs left.
+ */
+inline size_t ksuid_array_unique(uint8_t* data, size_t n) {
+  return std::unique(ksuid_records(data), ksuid_records(data) + n) - ksuid_records(data);
+}
+
+/**
+ * Index where `value` would be inserted into `n` sorted KSUIDs to keep them sorted.
+ *
+ * @param right insert after equal values instead of before them.
+ */
+inline size_t ksuid_array_search(const uint8_t* data, size_t n, const uint8_t* value, bool right) {
+  const KsuidRecord* first = ksuid_records(data);
+  const KsuidRecord& v = *ksuid_records(value);
+  if (right) {
+    return std::upper_bound(first, first + n, v) - first;
+  }
+  return std::lower_bound(first, first + n, v) - first;
+}
+
+/**
+ * Index of the smallest (or greatest) of `n` > 0 KSUIDs.
+ */
+inline size_t ksuid_array_argmin(const uint8_t* data, size_t n, bool greatest) {
+  const KsuidRecord* first = ksuid_records(data);
+  if (greatest) {
+    return std::max_element(first, first + n) - first;
+  }
+  return std::min_element(first, first + n) - first;
+}
+
+/**
+ * Index of the first occurrence of `value` in `n` KSUIDs, or `n` if not found.
+ */
+inline size_t ksuid_array_find(const uint8_t* data, size_t n, const uint8_t* value) {
+  const KsuidRecord* first = ksuid_records(data);
+  return std::find(first, first + n, *ksuid_records(value)) - first;
+}
+
+template <class Impl>
+inline void ksuid_array_timestamps_millis_impl(const uint8_t* data, size_t n, int64_t* out) noexcept {
+  for (size_t i = 0; i < n; i++) {
+    out[i] = Impl::timestamp_millis(data + i * _BYTE_SIZE);
+  }
+}
+
+/**
+ * Timestamps in milliseconds of `n` KSUIDs with the given timestamp size.
+ */
+inline void ksuid_array_timestamps_millis(size_t ts_size, const uint8_t* data, size_t n,
+                                          int64_t* out) noexcept {
+  switch (ts_size) {
+  case 5:
+    return ksuid_array_timestamps_millis_impl<Ksuid40>(data, n, out);
+  case 6:
+    return ksuid_array_timestamps_millis_impl<Ksuid48>(data, n, out);
+  default:
+    return ksuid_array_timestamps_millis_impl<Ksuid>(data, n, out);
+  }
+}
+
+/**
+ * ksuid_hash64() of `n` KSUIDs.
+ */
+inline void ksuid_array_hash64(const uint8_t* data, size_t n, uint64_t seed, uint64_t* out) noexcept {
+  for (size_t i = 0; i < n; i++) {
+    out[i] = ksuid_hash64(data + i * _BYTE_SIZE, seed);
+  }
+}
+
+/**
+ * Partition of each of `n` KSUIDs among `n_partitions` > 0, by jump hash of ksuid_hash64().
+ */
+inline void ksuid_array_partition(const uint8_t* data, size_t n, uint64_t seed, int32_t n_partitions,
+                                  uint32_t* out) noexcept {
+  for (size_t i = 0; i < n; i++) {
+    uint64_t hash = ksuid_hash64(data + i * _BYTE_SIZE, seed);
+    out[i] = static_cast<uint32_t>(ksuid_jump_bucket(hash, n_partitions));
+  }
+}
+
+/**
+ * Copy each of `n` KSUIDs to the output of its partition, keeping their order.
+ *
+ * @param cursors write position of each partition, advanced past the KSUIDs written.
+ */
+inline void ksuid_array_scatter(const uint8_t* data, size_t n, const uint32_t* partitions,
+                                uint8_t** cursors) noexcept {
+  for (size_t i = 0; i < n; i++) {
+    uint8_t*& dst = cursors[partitions[i]];
+    std::memcpy(dst, data + i * _BYTE_SIZE, _BYTE_SIZE);
+    dst += _BYTE_SIZE;
+  }
+}
+
+template <class Impl>
+inline void ksuid_array_assign_impl(uint8_t* dst, const int64_t* ts, const uint8_t* payload, size_t n) {
+  for (size_t i = 0; i < n; i++) {
+    Impl::assign(dst + i * _BYTE_SIZE, ts[i], payload + i * Impl::PAYLOAD_SIZE, Impl::PAYLOAD_SIZE);
+  }
+}
+
+/**
+ * Construct `n` KSUIDs with the given timestamp size from timestamps in milliseconds and
+ * contiguous payloads of `20 - ts_size` bytes each.
+ */
+inline void ksuid_array_assign(size_t ts_size, uint8_t* dst, const int64_t* ts, const uint8_t* payload,
+                               size_t n) {
+  switch (ts_size) {
+  case 4:
+    return ksuid_array_assign_impl<Ksuid>(dst, ts, payload, n);
+  case 5:
+    return ksuid_array_assign_impl<Ksuid40>(dst, ts, payload, n);
+  case 6:
+    return ksuid_array_assign_impl<Ksuid48>(dst, ts, payload, n);
+  }
+  throw std::invalid_argument("invalid timestamp size");
+}
+
+/**
+ * Min-heap of KSUIDs drawn from several sorted sources, equal KSUIDs are
+ * ordered by source index so merges are stable.
+ */
+class KsuidMergeHeap {
+public:
+  struct Entry {
+    const uint8_t* data;
+    size_t source;
+    // First 8 bytes as a big endian integer, decides most comparisons
+    uint64_t prefix;
+  };
+
+  bool empty() const noexcept { return entries_.empty(); }
+
+  const Entry& top() const noexcept { return entries_.front(); }
+
+  void push(const uint8_t* data, size_t source) {
+    entries_.push_back(Entry{data, source, load_prefix(data)});
+    size_t i = entries_.size() - 1;
+    while (i > 0) {
+      size_t parent = (i - 1) / 2;
+      if (!before(entries_[i], entries_[parent])) {
+        break;
+      }
+      std::swap(entries_[i], entries_[parent]);
+      i = parent;
+    }
+  }
+
+  void pop() noexcept {
+    entries_.front() = entries_.back();
+    entries_.pop_back();
+    sift_down();
+  }
+
+  /**
+   * Replace the top entry with the next KSUID of the same source.
+   */
+  void replace_top(const uint8_t* data) noexcept {
+    entries_.front().data = data;
+    entries_.front().prefix = load_prefix(data);
+    sift_down();
+  }
+
+private:
+  static uint64_t load_prefix(const uint8_t* data) noexcept {
+    uint64_t prefix = 0;
+    for (int i = 0; i < 8; i++) {
+      prefix = (prefix << 8) | data[i];
+    }
+    return prefix;
+  }
+
+  static bool before(const Entry& a, const Entry& b) noexcept {
+    if (a.prefix != b.prefix) {
+      return a.prefix < b.prefix;
+    }
+    int cmp = std::memcmp(a.data, b.data, _BYTE_SIZE);
+    return cmp < 0 || (cmp == 0 && a.source < b.source);
+  }
+
+  void sift_down() noexcept {
+    size_t n = entries_.size();
+    size_t i = 0;
+    for (;;) {
+      size_t smallest = i;
+      size_t left = 2 * i + 1;
+      size_t right = left + 1;
+      if (left < n && before(entries_[left], entries_[smallest])) {
+        smallest = left;
+      }
+      if (right < n && before(entries_[right], entries_[smallest])) {
+        smallest = right;
+      }
+      if (smallest == i) {
+        return;
+      }
+      std::swap(entries_[i], entries_[smallest]);
+      i = smallest;
+    }
+  }
+
+  std::vector<Entry> entries_;
+};
+
+/**
+ * Resumable k-way merge of sorted arrays of raw KSUIDs.
+ */
+class KsuidArrayMerger {
+public:
+  /**
+   * Add `n` sorted KSUIDs, `data` must stay valid until the merge is done.
+   */
+  void add(const uint8_t* data, size_t n) {
+    if (n > 0) {
+      heap_.push(data, ends_.size());
+    }
+    ends_.push_back(data + n * _BYTE_SIZE);
+    remaining_ += n;
+  }
+
+  /**
+   * Number of KSUIDs not merged yet, an upper bound of what `next` still writes.
+   */
+  size_t remaining() const noexcept { return remaining_; }
+
+  /**
+   * Write up to `max` merged KSUIDs to `out`.
+   *
+   * @param dedupe skip KSUIDs equal to the previously written one.
+   * @return number of KSUIDs written, 0 once all sources are exhausted.
+   */
+  size_t next(uint8_t* out, size_t max, bool dedupe) noexcept {
+    size_t count = 0;
+    while (count < max && !heap_.empty()) {
+      const KsuidMergeHeap::Entry& top = heap_.top();
+      const uint8_t* data = top.data;
+      if (!dedupe || !started_ || std::memcmp(last_, data, _BYTE_SIZE) != 0) {
+        std::memcpy(out + count * _BYTE_SIZE, data, _BYTE_SIZE);
+        std::memcpy(last_, data, _BYTE_SIZE);
+        started_ = true;
+        count++;
+      }
+      remaining_--;
+      if (data + _BYTE_SIZE < ends_[top.source]) {
+        heap_.replace_top(data + _BYTE_SIZE);
+      } else {
+        heap_.pop();
+      }
+    }
+    return count;
+  }
+
+private:
+  KsuidMergeHeap heap_;
+  std::vector<const uint8_t*> ends_;
+  size_t remaining_ = 0;
+  uint8_t last_[_BYTE_SIZE];
+  bool started_ = false;
+};
@@ -1,89 +1,221 @@
 #pragma once
 
-#include <array>
+#include <algorithm>
+#include <atomic>
 #include <chrono>
+#include <cstdint>
 #include <cstdlib>
 #include <cstring>
 #include <stdexcept>
+#include <thread>
+#include <time.h>
+
+#if defined(__linux__)
+#include <cerrno>
+#include <sys/syscall.h>
+#include <unistd.h>
+#elif defined(__APPLE__) || defined(__FreeBSD__) || defined(__OpenBSD__) || defined(__NetBSD__)
+#include <stdlib.h>
+#endif
+
+#if defined(_WIN32)
+#ifndef WIN32_LEAN_AND_MEAN
+#define WIN32_LEAN_AND_MEAN
+#endif
+#ifndef NOMINMAX
+#define NOMINMAX
+#endif
+#include <windows.h>
+#else
+#include <cerrno>
+#include <signal.h>
+#include <sys/types.h>
+#include <unistd.h>
+#endif
 
 constexpr size_t _BYTE_SIZE = 20;
 constexpr int64_t KSUID_EPOCH = 1400000000; // in seconds
 
-struct MemoryView {
-  const uint8_t* data;
-  size_t size;
+/**
+ * Current wall clock time in milliseconds.
+ */
+inline int64_t ksuid_now_millis() noexcept {
+  return std::chrono::duration_cast<std::chrono::milliseconds>(
+             std::chrono::system_clock::now().time_since_epoch())
+      .count();
+}
+
+/**
+ * Wall clock time in milliseconds at the resolution of the scheduler tick
+ * (CLOCK_REALTIME_COARSE), which avoids the vDSO clock read. Falls back to
+ * ksuid_now_millis() where the coarse clock is unavailable.
+ */
+inline int64_t ksuid_coarse_millis() noexcept {
+#if defined(CLOCK_REALTIME_COARSE)
+  struct timespec ts;
+  if (clock_gettime(CLOCK_REALTIME_COARSE, &ts) == 0) {
+    return static_cast<int64_t>(ts.tv_sec) * 1000 + ts.tv_nsec / 1000000;
+  }
+#endif
+  return ksuid_now_millis();
+}
+
+enum KsuidClockKind {
+  KSUID_CLOCK_REALTIME = 0,
+  KSUID_CLOCK_COARSE = 1,
+  KSUID_CLOCK_CACHED = 2,
+  KSUID_CLOCK_MANUAL = 3,
+};
+
+/**
+ * Time source for KSUID generation.
+ */
+struct KsuidClock {
+  int kind;
+  // Last reading of a cached clock, or the next reading of a manual clock
+  int64_t millis;
+  // Manual: added to millis after every reading
+  int64_t step;
+  // Cached: readings served from millis before the clock is read again
+  int64_t max_uses;
+  int64_t uses_left;
 };
 
-#if _MSC_VER >= 1100 && !defined(_DEBUG)
-#define _KL_NOVTABLE __declspec(novtable)
+/**
+ * Read `clock` in milliseconds. Cached and manual clocks are updated, so
+ * concurrent readers must be serialized by the caller.
+ */
+inline int64_t ksuid_clock_millis(KsuidClock* clock) noexcept {
+  int64_t ms;
+  switch (clock->kind) {
+  case KSUID_CLOCK_COARSE:
+    return ksuid_coarse_millis();
+  case KSUID_CLOCK_CACHED:
+    if (clock->uses_left <= 0) {
+      clock->millis = ksuid_now_millis();
+      clock->uses_left = clock->max_uses;
+    }
+    clock->uses_left--;
+    return clock->millis;
+  case KSUID_CLOCK_MANUAL:
+    ms = clock->millis;
+    clock->millis += clock->step;
+    return ms;
+  default:
+    return ksuid_now_millis();
+  }
+}
+
+#if (defined(__linux__) && defined(SYS_getrandom)) || defined(__APPLE__) || defined(__FreeBSD__) ||    \
+    defined(__OpenBSD__) || defined(__NetBSD__)
+#define KSUID_HAS_OS_RANDOM 1
 #else
-#define _KL_NOVTABLE
+#define KSUID_HAS_OS_RANDOM 0
 #endif
 
 /**
- * Common KSUID interface.
+ * Fill `dst` with `n` random bytes from the OS CSPRNG, like os.urandom() but without the GIL.
+ *
+ * Safe to call from several threads at once, every call draws independent bytes.
+ *
+ * @return false on failure, or if KSUID_HAS_OS_RANDOM is 0.
  */
-struct _KL_NOVTABLE KsuidLite {
-  virtual ~KsuidLite() = default;
-
-  /**
-   * Construct KSUID from raw data.
-   *
-   * @param data KSUID data bytes.
-   * @param data_size must be equal to 20.
-   */
-  virtual void assign(const uint8_t* data, size_t data_size) = 0;
-  /**
-   * Construct KSUID from timestamp and random.
-   *
-   * @param ts timestamp in milliseconds;
-   * @param payload payload data;
-   * @param payload_size payload data size;
-   */
-  virtual void assign(int64_t ts, const uint8_t* payload, size_t payload_size) = 0;
-  /**
-   * Construct KSUID from auto-generated timestamp and payload.
-   *
-   * @param payload payload data;
-   * @param payload_size payload data size;
-   */
-  virtual void assign_from_payload(const uint8_t* payload, size_t payload_size) = 0;
+inline bool ksuid_os_random(uint8_t* dst, size_t n) noexcept {
+#if defined(__linux__) && defined(SYS_getrandom)
+  while (n > 0) {
+    long r = syscall(SYS_getrandom, dst, n, 0);
+    if (r < 0) {
+      if (errno == EINTR) {
+        continue;
+      }
+      return false;
+    }
+    dst += r;
+    n -= static_cast<size_t>(r);
+  }
+  return true;
+#elif KSUID_HAS_OS_RANDOM
+  arc4random_buf(dst, n);
+  return true;
+#else
+  (void)dst;
+  (void)n;
+  return false;
+#endif
+}
 
-  /**
-   * Timestamp in milliseconds for the KSUID.
-   */
-  virtual int64_t timestamp_millis() const = 0;
-  /**
-   * Random bytes for the KSUID.
-   */
-  virtual MemoryView payload() const = 0;
-  /**
-   * Raw binary representation of the KSUID.
-   */
-  virtual MemoryView raw() const = 0;
+constexpr size_t KSUID_THREAD_ENTROPY_SIZE = 4096;
 
-  virtual bool empty() const = 0;
-  virtual bool operator<(const KsuidLite& other) const = 0;
-  virtual bool operator<=(const KsuidLite& other) const = 0;
-  virtual bool operator==(const KsuidLite& other) const = 0;
-  virtual bool operator!=(const KsuidLite& other) const = 0;
-};
+/**
+ * Generation of the per-thread entropy caches, bumped in the child process after fork() so
+ * that caches inherited from the parent are dropped.
+ */
+inline std::atomic<uint64_t>& ksuid_entropy_generation() noexcept {
+  static std::atomic<uint64_t> generation{0};
+  return generation;
+}
 
-template <size_t TIMESTAMP_SIZE> class KsuidImpl : public KsuidLite {
-public:
-  KsuidImpl() = default;
+/**
+ * Fill `dst` with `n` random bytes from a buffer of OS entropy private to the calling thread,
+ * so threads draw payloads without sharing state. Every byte is handed out once.
+ *
+ * @return false if reading from the OS failed, or if KSUID_HAS_OS_RANDOM is 0.
+ */
+inline bool ksuid_thread_random(uint8_t* dst, size_t n) noexcept {
+  // Zero-initialized, an empty cache of generation 0
+  struct Cache {
+    uint8_t buf[KSUID_THREAD_ENTROPY_SIZE];
+    size_t available;
+    uint64_t generation;
+  };
+  static thread_local Cache cache;
 
-  void assign(const uint8_t* data, size_t data_size) override {
-    if (data_size != _BYTE_SIZE) {
-      throw std::invalid_argument("data_size must be 20");
+  if (n > KSUID_THREAD_ENTROPY_SIZE) {
+    return ksuid_os_random(dst, n);
+  }
+  uint64_t generation = ksuid_entropy_generation().load(std::memory_order_relaxed);
+  if (cache.generation != generation) {
+    cache.generation = generation;
+    cache.available = 0;
+  }
+  if (cache.available < n) {
+    if (!ksuid_os_random(cache.buf, KSUID_THREAD_ENTROPY_SIZE)) {
+      return false;
     }
-
-    std::copy(data, data + _BYTE_SIZE, _data.begin());
+    cache.available = KSUID_THREAD_ENTROPY_SIZE;
   }
+  std::memcpy(dst, cache.buf + KSUID_THREAD_ENTROPY_SIZE - cache.available, n);
+  cache.available -= n;
+  return true;
+}
+
+/**
+ * Drop the entropy cached by every thread, call in the child process after fork().
+ */
+inline void ksuid_entropy_after_fork() noexcept {
+  ksuid_entropy_generation().fetch_add(1, std::memory_order_relaxed);
+}
+
+/**
+ * KSUID layout with a TIMESTAMP_SIZE bytes timestamp.
+ *
+ * All functions operate on a caller owned buffer of 20 bytes, so KSUIDs
+ * can be stored inline without a separate allocation.
+ */
+template <size_t TIMESTAMP_SIZE> struct KsuidImpl {
+  static_assert(TIMESTAMP_SIZE >= 4 && TIMESTAMP_SIZE <= 6, "invalid timestamp size");
 
-  void assign(int64_t ts, const uint8_t* payload, size_t payload_size) override {
-    static_assert(TIMESTAMP_SIZE >= 4 && TIMESTAMP_SIZE <= 6, "invalid timestamp size");
+  static constexpr size_t PAYLOAD_SIZE = _BYTE_SIZE - TIMESTAMP_SIZE;
 
+  /**
+   * Construct KSUID from timestamp and random.
+   *
+   * @param dst KSUID data bytes to fill.
+   * @param ts timestamp in milliseconds;
+   * @param payload payload data;
+   * @param payload_size payload data size;
+   */
+  static void assign(uint8_t* dst, int64_t ts, const uint8_t* payload, size_t payload_size) {
     if (payload_size + TIMESTAMP_SIZE > 20) {
       throw std::invalid_argument("payload size must be <= 20");
     }
@@ -92,94 +224,416 @@ public:
     dv.quot -= KSUID_EPOCH;
 
     // Common code for converting seconds into bytes
-    _data[0] = (dv.quot >> 24) & 0xff;
-    _data[1] = (dv.quot >> 16) & 0xff;
-    _data[2] = (dv.quot >> 8) & 0xff;
-    _data[3] = (dv.quot >> 0) & 0xff;
+    dst[0] = (dv.quot >> 24) & 0xff;
+    dst[1] = (dv.quot >> 16) & 0xff;
+    dst[2] = (dv.quot >> 8) & 0xff;
+    dst[3] = (dv.quot >> 0) & 0xff;
 
     switch (TIMESTAMP_SIZE) {
     case 4: // 32-bits, the standard
       break;
-    case 5:                            // 40-bits, svix's
-      _data[4] = (dv.rem >> 2) & 0xff; // round, 4ms precision
+    case 5:                           // 40-bits, svix's
+      dst[4] = (dv.rem >> 2) & 0xff; // round, 4ms precision
       break;
     case 6: // 48-bits
-      _data[4] = (dv.rem >> 8) & 0xff;
-      _data[5] = (dv.rem >> 0) & 0xff;
+      dst[4] = (dv.rem >> 8) & 0xff;
+      dst[5] = (dv.rem >> 0) & 0xff;
       break;
     }
 
-    std::copy(payload, payload + payload_size, _data.begin() + TIMESTAMP_SIZE);
+    std::copy(payload, payload + payload_size, dst + TIMESTAMP_SIZE);
   }
 
-  void assign_from_payload(const uint8_t* payload, size_t payload_size) override {
-    // Timestamp
-    int64_t timestamp_ms = std::chrono::duration_cast<std::chrono::milliseconds>(
-                               std::chrono::system_clock::now().time_since_epoch())
-                               .count();
-    return assign(timestamp_ms, payload, payload_size);
+  /**
+   * Construct KSUID from auto-generated timestamp and payload.
+   *
+   * @param dst KSUID data bytes to fill.
+   * @param payload payload data;
+   * @param payload_size payload data size;
+   */
+  static void assign_from_payload(uint8_t* dst, const uint8_t* payload, size_t payload_size) {
+    return assign(dst, ksuid_now_millis(), payload, payload_size);
   }
 
-  int64_t timestamp_millis() const noexcept override {
-    static_assert(TIMESTAMP_SIZE >= 4 && TIMESTAMP_SIZE <= 6, "invalid timestamp size");
-
-    int64_t ts_s = (static_cast<int64_t>(_data[0]) << 24) | (static_cast<int64_t>(_data[1]) << 16) |
-                   (static_cast<int64_t>(_data[2]) << 8) | (static_cast<int64_t>(_data[3]) << 0);
+  /**
+   * Timestamp in milliseconds for the KSUID.
+   */
+  static int64_t timestamp_millis(const uint8_t* data) noexcept {
+    int64_t ts_s = (static_cast<int64_t>(data[0]) << 24) | (static_cast<int64_t>(data[1]) << 16) |
+                   (static_cast<int64_t>(data[2]) << 8) | (static_cast<int64_t>(data[3]) << 0);
     int64_t ts_ms = 0;
 
     switch (TIMESTAMP_SIZE) {
     case 4: // 32-bits, the standard
       break;
     case 5: // 40-bits, svix's
-      ts_ms = (static_cast<int64_t>(_data[4]) << 2) % 1000;
+      ts_ms = (static_cast<int64_t>(data[4]) << 2) % 1000;
       break;
     case 6: // 48-bits
-      ts_ms = (static_cast<int64_t>(_data[4]) << 8) | (static_cast<int64_t>(_data[5]) << 0);
+      ts_ms = (static_cast<int64_t>(data[4]) << 8) | (static_cast<int64_t>(data[5]) << 0);
       break;
     }
 
     return (ts_s + KSUID_EPOCH) * 1000 + ts_ms;
   }
+};
+
+typedef KsuidImpl<4> Ksuid;
+typedef KsuidImpl<5> Ksuid40;
+typedef KsuidImpl<6> Ksuid48;
+
+/*
+ * Dispatch on the timestamp size of a KSUID class. The size is a per-class
+ * constant, each branch is an inlined, statically resolved KsuidImpl call.
+ */
+
+/**
+ * Construct KSUID from raw data.
+ *
+ * @param dst KSUID data bytes to fill.
+ * @param data KSUID data bytes.
+ * @param data_size must be equal to 20.
+ */
+inline void ksuid_assign_raw(uint8_t* dst, const uint8_t* data, size_t data_size) {
+  if (data_size != _BYTE_SIZE) {
+    throw std::invalid_argument("data_size must be 20");
+  }
+
+  std::memcpy(dst, data, _BYTE_SIZE);
+}
+
+inline void ksuid_assign(size_t ts_size, uint8_t* dst, int64_t ts, const uint8_t* payload,
+                         size_t payload_size) {
+  switch (ts_size) {
+  case 4:
+    return Ksuid::assign(dst, ts, payload, payload_size);
+  case 5:
+    return Ksuid40::assign(dst, ts, payload, payload_size);
+  case 6:
+    return Ksuid48::assign(dst, ts, payload, payload_size);
+  }
+  throw std::invalid_argument("invalid timestamp size");
+}
+
+inline void ksuid_assign_from_payload(size_t ts_size, uint8_t* dst, const uint8_t* payload,
+                                      size_t payload_size) {
+  return ksuid_assign(ts_size, dst, ksuid_now_millis(), payload, payload_size);
+}
+
+template <class Impl>
+inline void ksuid_assign_many_impl(uint8_t* dst, int64_t ts, const uint8_t* payload, size_t n) {
+  for (size_t i = 0; i < n; i++) {
+    Impl::assign(dst + i * _BYTE_SIZE, ts, payload + i * Impl::PAYLOAD_SIZE, Impl::PAYLOAD_SIZE);
+  }
+}
+
+/**
+ * Construct `n` KSUIDs with the same timestamp from contiguous payloads of `20 - ts_size` bytes.
+ */
+inline void ksuid_assign_many(size_t ts_size, uint8_t* dst, int64_t ts, const uint8_t* payload,
+                              size_t n) noexcept {
+  switch (ts_size) {
+  case 5:
+    return ksuid_assign_many_impl<Ksuid40>(dst, ts, payload, n);
+  case 6:
+    return ksuid_assign_many_impl<Ksuid48>(dst, ts, payload, n);
+  default:
+    return ksuid_assign_many_impl<Ksuid>(dst, ts, payload, n);
+  }
+}
+
+inline int64_t ksuid_timestamp_millis(size_t ts_size, const uint8_t* data) noexcept {
+  switch (ts_size) {
+  case 5:
+    return Ksuid40::timestamp_millis(data);
+  case 6:
+    return Ksuid48::timestamp_millis(data);
+  default:
+    return Ksuid::timestamp_millis(data);
+  }
+}
+
+/**
+ * UTC calendar fields of a point in time.
+ */
+struct KsuidCivilTime {
+  int64_t year;
+  int month;
+  int day;
+  int hour;
+  int minute;
+  int second;
+  int microsecond;
+};
+
+/**
+ * Split Unix time in milliseconds into UTC calendar fields, without going
+ * through floating point.
+ */
+inline void ksuid_civil_from_millis(int64_t ms, KsuidCivilTime* out) noexcept {
+  constexpr int64_t MS_PER_DAY = 86400000;
+  int64_t days = ms / MS_PER_DAY;
+  int64_t rem = ms % MS_PER_DAY;
+  if (rem < 0) {
+    rem += MS_PER_DAY;
+    days--;
+  }
+  out->hour = static_cast<int>(rem / 3600000);
+  out->minute = static_cast<int>(rem / 60000 % 60);
+  out->second = static_cast<int>(rem / 1000 % 60);
+  out->microsecond = static_cast<int>(rem % 1000 * 1000);
+
+  // Days to civil date in the proleptic Gregorian calendar, with eras of
+  // 400 years starting on March 1st (Howard Hinnant's civil_from_days)
+  days += 719468;
+  const int64_t era = (days >= 0 ? days : days - 146096) / 146097;
+  const int64_t doe = days - era * 146097;
+  const int64_t yoe = (doe - doe / 1460 + doe / 36524 - doe / 146096) / 365;
+  const int64_t doy = doe - (365 * yoe + yoe / 4 - yoe / 100);
+  const int64_t mp = (5 * doy + 2) / 153;
+  out->day = static_cast<int>(doy - (153 * mp + 2) / 5 + 1);
+  out->month = static_cast<int>(mp < 10 ? mp + 3 : mp - 9);
+  out->year = yoe + era * 400 + (out->month <= 2);
+}
+
+inline bool ksuid_empty(const uint8_t* data) noexcept {
+  static constexpr uint8_t zero[_BYTE_SIZE] = {0};
+  return std::memcmp(data, zero, _BYTE_SIZE) == 0;
+}
+
+inline int ksuid_compare(const uint8_t* a, const uint8_t* b) noexcept {
+  return std::memcmp(a, b, _BYTE_SIZE);
+}
+
+inline uint64_t ksuid_rotl64(uint64_t x, int r) noexcept { return (x << r) | (x >> (64 - r)); }
+
+inline uint64_t ksuid_load_le(const uint8_t* p, int n) noexcept {
+  uint64_t v = 0;
+  for (int i = n; i-- > 0;) {
+    v = (v << 8) | p[i];
+  }
+  return v;
+}
+
+/**
+ * XXH64 of the 20 raw bytes of a KSUID.
+ *
+ * Unlike hash() of bytes it does not depend on PYTHONHASHSEED, the same KSUID and seed hash
+ * to the same value in every process, on every platform, and in any other XXH64 implementation.
+ */
+inline uint64_t ksuid_hash64(const uint8_t* data, uint64_t seed) noexcept {
+  constexpr uint64_t P1 = 0x9E3779B185EBCA87ULL;
+  constexpr uint64_t P2 = 0xC2B2AE3D27D4EB4FULL;
+  constexpr uint64_t P3 = 0x165667B19E3779F9ULL;
+  constexpr uint64_t P4 = 0x85EBCA77C2B2AE63ULL;
+  constexpr uint64_t P5 = 0x27D4EB2F165667C5ULL;
+
+  uint64_t h = seed + P5 + _BYTE_SIZE;
+  for (size_t i = 0; i < 16; i += 8) {
+    h ^= ksuid_rotl64(ksuid_load_le(data + i, 8) * P2, 31) * P1;
+    h = ksuid_rotl64(h, 27) * P1 + P4;
+  }
+  h ^= ksuid_load_le(data + 16, 4) * P1;
+  h = ksuid_rotl64(h, 23) * P2 + P3;
 
-  MemoryView payload() const noexcept override {
-    return MemoryView{
-        _data.data() + TIMESTAMP_SIZE,
-        _data.size() - TIMESTAMP_SIZE,
-    };
+  h ^= h >> 33;
+  h *= P2;
+  h ^= h >> 29;
+  h *= P3;
+  h ^= h >> 32;
+  return h;
+}
+
+/**
+ * Jump consistent hash (Lamping and Veach) of `key` into `buckets` > 0 buckets.
+ *
+ * Growing from n to n + 1 buckets moves only the keys that land in the new bucket.
+ */
+inline int32_t ksuid_jump_bucket(uint64_t key, int32_t buckets) noexcept {
+  int64_t b = -1;
+  int64_t j = 0;
+  while (j < buckets) {
+    b = j;
+    key = key * 2862933555777941757ULL + 1;
+    j = static_cast<int64_t>((b + 1) * (static_cast<double>(1LL << 31) /
+                                        static_cast<double>((key >> 33) + 1)));
   }
+  return static_cast<int32_t>(b);
+}
 
-  MemoryView raw() const noexcept override {
-    return MemoryView{
-        _data.data(),
-        _data.size(),
-    };
+/**
+ * Increment a KSUID as a 160-bit big-endian integer.
+ *
+ * @return false if the value wrapped around.
+ */
+inline bool ksuid_increment(uint8_t* data) noexcept {
+  for (size_t i = _BYTE_SIZE; i-- > 0;) {
+    if (++data[i] != 0) {
+      return true;
+    }
   }
+  return false;
+}
 
-  bool empty() const noexcept override {
-    static constexpr uint8_t zero[_BYTE_SIZE] = {0};
-    return std::memcmp(_data.data(), zero, _BYTE_SIZE) == 0;
+/**
+ * State of a monotonic KSUID sequence.
+ *
+ * Plain data, so it can live in memory shared between processes.
+ */
+struct KsuidSequenceState {
+  uint8_t last[_BYTE_SIZE];
+  uint8_t started;
+};
+
+/**
+ * Start the next KSUID of a sequence at timestamp `ts` in milliseconds.
+ *
+ * If the timestamp starts a new tick (it encodes greater than the last KSUID), only the timestamp
+ * of `dst` is written and true is returned: the caller fills the payload with random bytes.
+ * Otherwise (same tick, or the clock went backwards), `dst` is the last KSUID plus one.
+ * Either way, the caller must pass `dst` to ksuid_sequence_commit() afterwards.
+ */
+inline bool ksuid_sequence_advance(const KsuidSequenceState* state, size_t ts_size, int64_t ts,
+                                   uint8_t* dst) {
+  ksuid_assign(ts_size, dst, ts, nullptr, 0);
+  if (!state->started || std::memcmp(dst, state->last, ts_size) > 0) {
+    return true;
   }
 
-  bool operator<(const KsuidLite& other) const noexcept override {
-    return std::memcmp(_data.data(), other.raw().data, _BYTE_SIZE) < 0;
+  std::memcpy(dst, state->last, _BYTE_SIZE);
+  if (!ksuid_increment(dst)) {
+    throw std::overflow_error("KSUID sequence exhausted");
   }
+  return false;
+}
 
-  bool operator<=(const KsuidLite& other) const noexcept override {
-    return std::memcmp(_data.data(), other.raw().data, _BYTE_SIZE) <= 0;
+/**
+ * Record `dst` as the last KSUID of the sequence.
+ *
+ * If another KSUID not less than `dst` was committed in the meantime, `dst` is replaced by that
+ * one plus one, so committed KSUIDs are always strictly increasing. A payload overflow carries
+ * into the timestamp.
+ */
+inline void ksuid_sequence_commit(KsuidSequenceState* state, uint8_t* dst) {
+  if (state->started && std::memcmp(dst, state->last, _BYTE_SIZE) <= 0) {
+    std::memcpy(dst, state->last, _BYTE_SIZE);
+    if (!ksuid_increment(dst)) {
+      throw std::overflow_error("KSUID sequence exhausted");
+    }
   }
 
-  bool operator==(const KsuidLite& other) const noexcept override {
-    return std::memcmp(_data.data(), other.raw().data, _BYTE_SIZE) == 0;
+  std::memcpy(state->last, dst, _BYTE_SIZE);
+  state->started = 1;
+}
+
+/**
+ * Monotonic KSUID sequence shared between processes.
+ *
+ * Lives in shared memory (an mmap-ed file or a SharedMemory block), zero-filled memory is a valid
+ * initial state. The sequence state is guarded by a spinlock held only for a few memcmp/memcpy.
+ *
+ * The lock word holds the process ID of its holder, so a waiter can take over the lock of a
+ * process that died holding it. The state is double buffered: a new state is written to the
+ * inactive slot then published by flipping `current`, so a holder killed mid-update leaves the
+ * last published state intact.
+ */
+struct KsuidSharedSequence {
+  // Process ID of the lock holder, 0 if free
+  std::atomic<uint32_t> lock;
+  // Timestamp size of the KSUID class using the sequence, 0 until first use
+  uint32_t ts_size;
+  // Index of the slot of `states` holding the current state
+  std::atomic<uint32_t> current;
+  KsuidSequenceState states[2];
+};
+
+static_assert(ATOMIC_INT_LOCK_FREE == 2, "lock-free atomics are required in shared memory");
+static_assert(sizeof(std::atomic<uint32_t>) == sizeof(uint32_t), "unexpected std::atomic layout");
+
+inline uint32_t ksuid_process_id() noexcept {
+#if defined(_WIN32)
+  return static_cast<uint32_t>(GetCurrentProcessId());
+#else
+  return static_cast<uint32_t>(getpid());
+#endif
+}
+
+/**
+ * Whether process `pid` may still be running.
+ *
+ * A process counts as dead once it has exited (and been reaped by its parent on POSIX).
+ */
+inline bool ksuid_process_alive(uint32_t pid) noexcept {
+#if defined(_WIN32)
+  HANDLE handle = OpenProcess(SYNCHRONIZE, FALSE, pid);
+  if (handle == NULL) {
+    return GetLastError() != ERROR_INVALID_PARAMETER;
   }
+  bool alive = WaitForSingleObject(handle, 0) == WAIT_TIMEOUT;
+  CloseHandle(handle);
+  return alive;
+#else
+  return kill(static_cast<pid_t>(pid), 0) == 0 || errno != ESRCH;
+#endif
+}
 
-  bool operator!=(const KsuidLite& other) const noexcept override {
-    return std::memcmp(_data.data(), other.raw().data, _BYTE_SIZE) != 0;
+class KsuidSpinLockGuard {
+public:
+  explicit KsuidSpinLockGuard(std::atomic<uint32_t>& lock) noexcept : lock_(lock) {
+    const uint32_t self = ksuid_process_id();
+    for (;;) {
+      uint32_t holder = 0;
+      if (lock_.compare_exchange_weak(holder, self, std::memory_order_acquire,
+                                      std::memory_order_relaxed)) {
+        return;
+      }
+      for (unsigned spins = 0; (holder = lock_.load(std::memory_order_relaxed)) != 0; spins++) {
+        if (spins < 64) {
+          continue;
+        }
+        // The holder may have been preempted, or killed while holding the lock: take it over
+        // then, unless another waiter already did
+        std::this_thread::yield();
+        if (spins % 1024 == 0 && !ksuid_process_alive(holder) &&
+            lock_.compare_exchange_strong(holder, self, std::memory_order_acquire,
+                                          std::memory_order_relaxed)) {
+          return;
+        }
+      }
+    }
   }
 
+  ~KsuidSpinLockGuard() { lock_.store(0, std::memory_order_release); }
+
+  KsuidSpinLockGuard(const KsuidSpinLockGuard&) = delete;
+  KsuidSpinLockGuard& operator=(const KsuidSpinLockGuard&) = delete;
+
 private:
-  std::array<uint8_t, _BYTE_SIZE> _data;
+  std::atomic<uint32_t>& lock_;
 };
 
-typedef KsuidImpl<4> Ksuid;
-typedef KsuidImpl<5> Ksuid40;
-typedef KsuidImpl<6> Ksuid48;
+/**
+ * Draw the next KSUID of a shared sequence at timestamp `ts` in milliseconds.
+ *
+ * @param payload random payload of `20 - ts_size` bytes, used if `ts` starts a new tick.
+ */
+inline void ksuid_shared_sequence_next(KsuidSharedSequence* shared, size_t ts_size, int64_t ts,
+                                       const uint8_t* payload, uint8_t* dst) {
+  KsuidSpinLockGuard guard(shared->lock);
+
+  if (shared->ts_size == 0) {
+    shared->ts_size = static_cast<uint32_t>(ts_size);
+  } else if (shared->ts_size != ts_size) {
+    throw std::invalid_argument("shared sequence is used with a different KSUID class");
+  }
+
+  uint32_t current = shared->current.load(std::memory_order_relaxed) & 1;
+  KsuidSequenceState state = shared->states[current];
+  if (ksuid_sequence_advance(&state, ts_size, ts, dst)) {
+    std::memcpy(dst + ts_size, payload, _BYTE_SIZE - ts_size);
+  }
+  ksuid_sequence_commit(&state, dst);
+
+  shared->states[current ^ 1] = state;
+  shared->current.store(current ^ 1, std::memory_order_release);
+}
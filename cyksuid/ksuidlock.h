@@ -0,0 +1,78 @@
+#pragma once
+
+#include <Python.h>
+
+/**
+ * Synchronization for free-threaded CPython builds (Py_GIL_DISABLED).
+ *
+ * With the GIL, extension code that does not call back into Python is already atomic, so
+ * everything here compiles to plain loads and stores.
+ */
+#ifdef Py_GIL_DISABLED
+#define KSUID_FREE_THREADED 1
+#else
+#define KSUID_FREE_THREADED 0
+#endif
+
+#if KSUID_FREE_THREADED
+
+// PyMutex detaches the thread while it waits, so a waiter never blocks a stop-the-world pause
+typedef PyMutex KsuidMutex;
+
+static inline void ksuid_mutex_lock(KsuidMutex* m) { PyMutex_Lock(m); }
+
+static inline void ksuid_mutex_unlock(KsuidMutex* m) { PyMutex_Unlock(m); }
+
+#else
+
+typedef struct {
+  char unused;
+} KsuidMutex;
+
+static inline void ksuid_mutex_lock(KsuidMutex*) {}
+
+static inline void ksuid_mutex_unlock(KsuidMutex*) {}
+
+#endif
+
+/**
+ * Store `value` into the object slot `*slot` if it still holds `empty`, NULL or an object the
+ * slot owns, for values computed lazily and cached once, such as the base62 form of a KSUID.
+ *
+ * A slot that has been set is never replaced, so readers may use it without a lock.
+ *
+ * @return the object in the slot afterwards, borrowed: `value` or the one stored first by
+ *     another thread.
+ */
+static inline PyObject* ksuid_publish_once(PyObject** slot, PyObject* empty, PyObject* value) {
+#if KSUID_FREE_THREADED
+  PyObject* expected = empty;
+  Py_INCREF(value);
+  if (_Py_atomic_compare_exchange_ptr(slot, &expected, value)) {
+    Py_XDECREF(empty);
+    return value;
+  }
+  Py_DECREF(value);
+  return expected;
+#else
+  if (*slot == empty) {
+    Py_INCREF(value);
+    *slot = value;
+    Py_XDECREF(empty);
+  }
+  return *slot;
+#endif
+}
+
+/**
+ * Read an object slot set by ksuid_publish_once().
+ *
+ * @return the object in the slot, borrowed, or NULL if it is not set yet.
+ */
+static inline PyObject* ksuid_load_once(PyObject** slot) {
+#if KSUID_FREE_THREADED
+  return (PyObject*)_Py_atomic_load_ptr_acquire(slot);
+#else
+  return *slot;
+#endif
+}
@@ -0,0 +1,324 @@
+#pragma once
+
+#include <algorithm>
+#include <cstdint>
+#include <cstring>
+#include <map>
+#include <vector>
+
+#include "ksuidarray.h"
+
+/**
+ * Open addressing hash table of raw KSUIDs, optionally mapping each one to an int64 value.
+ *
+ * Keys are stored inline and probed linearly from their payload bits, which are random for
+ * generated KSUIDs. Erasing shifts the following entries back instead of leaving tombstones,
+ * so evicting old entries never slows down later lookups.
+ *
+ * The first eviction builds a time index: copies of the keys grouped in buckets of about a
+ * second, so later evictions only visit the buckets holding expired keys.
+ */
+class KsuidTable {
+public:
+  static constexpr size_t npos = static_cast<size_t>(-1);
+
+  KsuidTable() noexcept = default;
+
+  KsuidTable(size_t ts_size, bool with_values) noexcept
+      : ts_size_(ts_size), with_values_(with_values) {}
+
+  size_t size() const noexcept { return size_; }
+
+  size_t slots() const noexcept { return used_.size(); }
+
+  /**
+   * Bytes allocated for the slots.
+   */
+  size_t memory() const noexcept {
+    size_t total = keys_.capacity() * sizeof(KsuidRecord) + used_.capacity() +
+                   values_.capacity() * sizeof(int64_t);
+    for (const auto& item : buckets_) {
+      total += sizeof(item) + item.second.keys.capacity() * sizeof(KsuidRecord);
+    }
+    return total;
+  }
+
+  bool used(size_t i) const noexcept { return used_[i] != 0; }
+
+  const uint8_t* key(size_t i) const noexcept { return keys_[i].data; }
+
+  int64_t value(size_t i) const noexcept { return values_[i]; }
+
+  void set_value(size_t i, int64_t value) noexcept { values_[i] = value; }
+
+  /**
+   * Slot of `key`, or npos if absent.
+   */
+  size_t find(const uint8_t* key) const noexcept {
+    if (size_ == 0) {
+      return npos;
+    }
+    for (size_t i = home(key);; i = (i + 1) & mask_) {
+      if (!used_[i]) {
+        return npos;
+      }
+      if (std::memcmp(keys_[i].data, key, _BYTE_SIZE) == 0) {
+        return i;
+      }
+    }
+  }
+
+  /**
+   * Slot of `key`, inserted with a value of 0 if absent.
+   *
+   * @param inserted set to whether `key` was absent.
+   */
+  size_t insert(const uint8_t* key, bool* inserted) {
+    reserve(size_ + 1);
+    size_t i = home(key);
+    for (; used_[i]; i = (i + 1) & mask_) {
+      if (std::memcmp(keys_[i].data, key, _BYTE_SIZE) == 0) {
+        *inserted = false;
+        return i;
+      }
+    }
+    place(i, key, 0);
+    if (indexed_) {
+      index(key);
+    }
+    *inserted = true;
+    return i;
+  }
+
+  /**
+   * Insert `n` contiguous KSUIDs.
+   *
+   * @param bitmap if not NULL, bit `i % 8` of byte `i / 8` is set if KSUID `i` was absent.
+   * @return number of KSUIDs inserted.
+   */
+  size_t insert_many(const uint8_t* data, size_t n, uint8_t* bitmap) {
+    size_t count = 0;
+    bool inserted;
+    reserve(size_ + n);
+    for (size_t i = 0; i < n; i++) {
+      insert(data + i * _BYTE_SIZE, &inserted);
+      if (inserted) {
+        count++;
+        if (bitmap) {
+          bitmap[i / 8] |= static_cast<uint8_t>(1 << (i % 8));
+        }
+      }
+    }
+    return count;
+  }
+
+  /**
+   * Set bit `i % 8` of byte `i / 8` of `bitmap` for each of `n` contiguous KSUIDs present.
+   */
+  void find_many(const uint8_t* data, size_t n, uint8_t* bitmap) const noexcept {
+    for (size_t i = 0; i < n; i++) {
+      if (find(data + i * _BYTE_SIZE) != npos) {
+        bitmap[i / 8] |= static_cast<uint8_t>(1 << (i % 8));
+      }
+    }
+  }
+
+  /**
+   * Erase the entry in slot `i`.
+   */
+  void erase_at(size_t i) noexcept {
+    size_t hole = i;
+    for (size_t j = (i + 1) & mask_; used_[j]; j = (j + 1) & mask_) {
+      // Move the entry back if the hole lies between its home slot and its slot
+      if (((j - home(keys_[j].data)) & mask_) >= ((j - hole) & mask_)) {
+        keys_[hole] = keys_[j];
+        if (with_values_) {
+          values_[hole] = values_[j];
+        }
+        hole = j;
+      }
+    }
+    used_[hole] = 0;
+    size_--;
+  }
+
+  /**
+   * Erase the entries with a timestamp before `millis`.
+   *
+   * Only the time buckets starting before `millis` are visited, the first call indexes all
+   * entries.
+   *
+   * @return number of entries erased.
+   */
+  size_t evict_before(int64_t millis) {
+    if (!indexed_) {
+      rebuild_index();
+      indexed_ = true;
+    }
+    size_t before = size_;
+    auto it = buckets_.begin();
+    while (it != buckets_.end() && bucket_start(it->first) < millis) {
+      TimeBucket& bucket = it->second;
+      bool whole = bucket_start(it->first + 1) <= millis;
+      if (!whole && bucket.sorted < bucket.keys.size()) {
+        // KSUIDs sort by timestamp, so expired keys come first
+        std::sort(bucket.keys.begin() + bucket.head, bucket.keys.end());
+        bucket.sorted = bucket.keys.size();
+      }
+      for (; bucket.head < bucket.keys.size(); bucket.head++) {
+        const uint8_t* key = bucket.keys[bucket.head].data;
+        if (!whole && ksuid_timestamp_millis(ts_size_, key) >= millis) {
+          break;
+        }
+        // Keys erased otherwise are left in the index, skip them
+        size_t slot = find(key);
+        if (slot != npos) {
+          erase_at(slot);
+        }
+        indexed_keys_--;
+      }
+      if (bucket.head < bucket.keys.size()) {
+        break;
+      }
+      it = buckets_.erase(it);
+    }
+    return before - size_;
+  }
+
+  /**
+   * Make room for `n` entries without growing.
+   */
+  void reserve(size_t n) {
+    // Keep the load factor at most 3/4
+    if (n * 4 <= slots() * 3) {
+      return;
+    }
+    size_t new_slots = std::max<size_t>(slots(), kMinSlots);
+    while (n * 4 > new_slots * 3) {
+      new_slots *= 2;
+    }
+    rehash(new_slots);
+  }
+
+  /**
+   * Erase all entries and release the slots.
+   */
+  void clear() noexcept {
+    std::vector<KsuidRecord>().swap(keys_);
+    std::vector<uint8_t>().swap(used_);
+    std::vector<int64_t>().swap(values_);
+    std::map<int64_t, TimeBucket>().swap(buckets_);
+    indexed_keys_ = 0;
+    size_ = 0;
+    mask_ = 0;
+    shift_ = 64;
+  }
+
+private:
+  static constexpr size_t kMinSlots = 8;
+  // Time buckets span 2**10 milliseconds
+  static constexpr int kBucketShift = 10;
+
+  struct TimeBucket {
+    std::vector<KsuidRecord> keys;
+    // Keys before `head` were evicted, keys from `head` to `sorted` are sorted
+    size_t head = 0;
+    size_t sorted = 0;
+  };
+
+  static int64_t bucket_start(int64_t bucket) noexcept {
+    return bucket * (int64_t(1) << kBucketShift);
+  }
+
+  static uint64_t load64(const uint8_t* p) noexcept {
+    uint64_t v;
+    std::memcpy(&v, p, sizeof(v));
+    return v;
+  }
+
+  static uint32_t load32(const uint8_t* p) noexcept {
+    uint32_t v;
+    std::memcpy(&v, p, sizeof(v));
+    return v;
+  }
+
+  size_t home(const uint8_t* key) const noexcept {
+    // The last 16 bytes are payload for every KSUID class, the leading timestamp bytes are
+    // mixed in so crafted KSUIDs with a fixed payload still spread
+    uint64_t h = load64(key + 12) ^ ksuid_rotl64(load64(key + 4), 29) ^ load32(key);
+    return static_cast<size_t>((h * 0x9E3779B97F4A7C15ULL) >> shift_);
+  }
+
+  void place(size_t i, const uint8_t* key, int64_t value) noexcept {
+    std::memcpy(keys_[i].data, key, _BYTE_SIZE);
+    used_[i] = 1;
+    if (with_values_) {
+      values_[i] = value;
+    }
+    size_++;
+  }
+
+  void index(const uint8_t* key) {
+    // Drop the keys erased since the index was built once they outnumber the entries
+    if (indexed_keys_ >= 2 * size_ + 1024) {
+      rebuild_index();
+      return;
+    }
+    int64_t bucket = ksuid_timestamp_millis(ts_size_, key) >> kBucketShift;
+    buckets_[bucket].keys.push_back(*ksuid_records(key));
+    indexed_keys_++;
+  }
+
+  void rebuild_index() {
+    std::map<int64_t, TimeBucket>().swap(buckets_);
+    indexed_keys_ = 0;
+    for (size_t i = 0; i < slots(); i++) {
+      if (used_[i]) {
+        int64_t bucket = ksuid_timestamp_millis(ts_size_, keys_[i].data) >> kBucketShift;
+        buckets_[bucket].keys.push_back(keys_[i]);
+        indexed_keys_++;
+      }
+    }
+  }
+
+  void rehash(size_t new_slots) {
+    std::vector<KsuidRecord> keys(new_slots);
+    std::vector<uint8_t> used(new_slots);
+    std::vector<int64_t> values(with_values_ ? new_slots : 0);
+    keys.swap(keys_);
+    used.swap(used_);
+    values.swap(values_);
+
+    int shift = 64;
+    for (size_t s = new_slots; s > 1; s >>= 1) {
+      shift--;
+    }
+    shift_ = shift;
+    mask_ = new_slots - 1;
+    size_ = 0;
+    for (size_t i = 0; i < used.size(); i++) {
+      if (used[i]) {
+        size_t j = home(keys[i].data);
+        while (used_[j]) {
+          j = (j + 1) & mask_;
+        }
+        place(j, keys[i].data, with_values_ ? values[i] : 0);
+      }
+    }
+  }
+
+  std::vector<KsuidRecord> keys_;
+  std::vector<uint8_t> used_;
+  // One per slot for tables with values, otherwise empty
+  std::vector<int64_t> values_;
+  size_t size_ = 0;
+  size_t mask_ = 0;
+  int shift_ = 64;
+  // Time index, built by the first eviction then kept up to date by insertions
+  std::map<int64_t, TimeBucket> buckets_;
+  // Keys in the index from the head of their bucket, including erased ones
+  size_t indexed_keys_ = 0;
+  bool indexed_ = false;
+  size_t ts_size_ = 4;
+  bool with_values_ = false;
+};
@@ -0,0 +1,41 @@
+#pragma once
+
+#include <cstdint>
+
+/**
+ * Runtime counters of the library, build with -DCYKSUID_STATS=0 to compile them out.
+ */
+#ifndef CYKSUID_STATS
+#define CYKSUID_STATS 1
+#endif
+
+// Decode failures are counted by negated error code, slot 0 counts inputs of
+// the wrong length
+constexpr int KSUID_STATS_DECODE_ERRORS = 5;
+
+struct KsuidStats {
+  // Counting enabled at runtime
+  bool enabled;
+  // KSUIDs generated, by timestamp size minus 4
+  uint64_t generated[3];
+  uint64_t parsed_str;
+  uint64_t parsed_bytes;
+  uint64_t decode_errors[KSUID_STATS_DECODE_ERRORS];
+  // Payload entropy handed out by entropy pools or read for bulk generation
+  uint64_t entropy_bytes;
+  // Clock readings earlier than the previous one of the same KSUID class
+  uint64_t timestamp_regressions;
+  int64_t last_millis[3];
+};
+
+/**
+ * Add `n` to a counter, atomically in free-threaded builds (Py_GIL_DISABLED) where several
+ * threads may count at once. Other builds rely on the GIL.
+ */
+static inline void ksuid_stats_add(uint64_t* counter, uint64_t n) {
+#ifdef Py_GIL_DISABLED
+  _Py_atomic_add_uint64(counter, n);
+#else
+  *counter += n;
+#endif
+}
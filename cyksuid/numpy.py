@@ -0,0 +1,126 @@
+"""NumPy interop for KSUID columns.
+
+KSUIDs are stored as fixed-width bytes arrays: ``S20`` for raw KSUIDs and
+``S27`` for base62 encoded ones. All conversions run in C without the GIL.
+
+This module requires NumPy, which stays an optional dependency of cyksuid.
+"""
+
+import os
+from typing import Optional, Type, cast
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+from cyksuid import hints
+from cyksuid._array import _assign_into, _timestamps_millis_into
+from cyksuid._ksuid import BYTE_LENGTH, STRING_ENCODED_LENGTH, Ksuid
+from cyksuid.fast_base62 import decode_many, encode_many
+
+RAW_DTYPE = np.dtype("S%d" % BYTE_LENGTH)
+ENCODED_DTYPE = np.dtype("S%d" % STRING_ENCODED_LENGTH)
+
+
+def _buf(arr: np.ndarray) -> hints.WritableBuffer:
+    # ndarray only declares the buffer protocol to type checkers on Python 3.12+
+    return cast(hints.WritableBuffer, arr)
+
+
+def _as_records(arr: ArrayLike, dtype: np.dtype) -> np.ndarray:
+    arr = np.asarray(arr)
+    if arr.dtype != dtype:
+        raise TypeError("Expect an array of dtype %s, got %s" % (dtype, arr.dtype))
+    return np.ascontiguousarray(arr)
+
+
+def decode(arr: ArrayLike) -> np.ndarray:
+    """Decode an ``S27`` array of base62 encoded KSUIDs into an ``S20`` array.
+
+    :raises DecodeError: if an item is invalid, ``index`` is set to the first
+        invalid item of the flattened array.
+    """
+    src = _as_records(arr, ENCODED_DTYPE)
+    out = np.empty(src.shape, dtype=RAW_DTYPE)
+    decode_many(_buf(src), _buf(out))
+    return out
+
+
+def encode(arr: ArrayLike) -> np.ndarray:
+    """Base62 encode an ``S20`` array of raw KSUIDs into an ``S27`` array."""
+    src = _as_records(arr, RAW_DTYPE)
+    out = np.empty(src.shape, dtype=ENCODED_DTYPE)
+    encode_many(_buf(src), _buf(out))
+    return out
+
+
+def timestamps_millis(
+    arr: ArrayLike, ksuid_cls: Optional[Type[Ksuid]] = None
+) -> np.ndarray:
+    """Timestamps in milliseconds of an ``S20`` array, as an ``int64`` array.
+
+    :param ksuid_cls: KSUID layout of the items, defaults to Ksuid.
+    """
+    src = _as_records(arr, RAW_DTYPE)
+    out = np.empty(src.shape, dtype=np.int64)
+    _timestamps_millis_into(_buf(src), _buf(out), ksuid_cls)
+    return out
+
+
+def datetimes(arr: ArrayLike, ksuid_cls: Optional[Type[Ksuid]] = None) -> np.ndarray:
+    """Timestamps of an ``S20`` array, as a ``datetime64[ms]`` array.
+
+    :param ksuid_cls: KSUID layout of the items, defaults to Ksuid.
+    """
+    return timestamps_millis(arr, ksuid_cls).view("datetime64[ms]")
+
+
+def from_timestamps(
+    timestamps: ArrayLike,
+    payloads: Optional[ArrayLike] = None,
+    ksuid_cls: Optional[Type[Ksuid]] = None,
+) -> np.ndarray:
+    """Build an ``S20`` array of KSUIDs from timestamps and payloads.
+
+    :param timestamps: ``int64`` milliseconds or ``datetime64`` array.
+    :param payloads: ``S{payload size}`` array, or ``uint8`` array with the
+        payload bytes in the last dimension. Random if omitted.
+    :param ksuid_cls: KSUID layout to build, defaults to Ksuid.
+    """
+    ts = np.asarray(timestamps)
+    if np.issubdtype(ts.dtype, np.datetime64):
+        ts = ts.astype("datetime64[ms]").view(np.int64)
+    ts = np.ascontiguousarray(ts, dtype=np.int64)
+
+    payload_size = (ksuid_cls or Ksuid).PAYLOAD_LENGTH_IN_BYTES
+    if payloads is None:
+        payload = np.frombuffer(os.urandom(ts.size * payload_size), dtype=np.uint8)
+    else:
+        payload = np.ascontiguousarray(payloads)
+        if payload.dtype == np.uint8:
+            expected = ts.shape + (payload_size,)
+        else:
+            expected = ts.shape
+            if payload.dtype != np.dtype("S%d" % payload_size):
+                raise TypeError(
+                    "Expect payloads of dtype S%d or uint8, got %s"
+                    % (payload_size, payload.dtype)
+                )
+        if payload.shape != expected:
+            raise ValueError(
+                "Expect payloads of shape %s, got %s" % (expected, payload.shape)
+            )
+
+    out = np.empty(ts.shape, dtype=RAW_DTYPE)
+    _assign_into(_buf(out), _buf(ts), _buf(payload), ksuid_cls)
+    return out
+
+
+__all__ = [
+    "ENCODED_DTYPE",
+    "RAW_DTYPE",
+    "datetimes",
+    "decode",
+    "encode",
+    "from_timestamps",
+    "timestamps_millis",
+]
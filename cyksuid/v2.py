@@ -1,19 +1,46 @@
 from cyksuid import hints
+from cyksuid._array import (
+    KsuidArray,
+    KsuidDict,
+    KsuidSet,
+    dumps_many,
+    loads_many,
+    merge_sorted,
+    partition_many,
+)
 from cyksuid._ksuid import (
     BYTE_LENGTH,
     EMPTY_BYTES,
     STRING_ENCODED_LENGTH,
     MAX_ENCODED,
+    SHARED_SEQUENCE_SIZE,
+    CachedClock,
+    Clock,
+    CoarseClock,
+    EntropyPool,
     Empty,
     Ksuid,
     Ksuid40,
     Ksuid48,
+    KsuidSequence,
+    ManualClock,
+    ParseCacheInfo,
+    RealtimeClock,
+    SharedKsuidSequence,
+    generate_many,
+    is_valid,
     ksuid,
     parse,
+    parse_cache_info,
+    set_encoded_cache,
+    set_parse_cache,
+    try_parse,
+    validate_many,
 )
+from cyksuid._stream import KsuidReader, iter_parse, write_encoded
 
 
-def from_bytes(raw: hints.Bytes) -> Ksuid:
+def from_bytes(raw: hints.Buffer) -> Ksuid:
     """Create a new KSUID from raw bytes."""
     return Ksuid(raw)
 
@@ -25,12 +52,39 @@ __all__ = [
     "EMPTY_BYTES",
     "STRING_ENCODED_LENGTH",
     "MAX_ENCODED",
+    "SHARED_SEQUENCE_SIZE",
+    "dumps_many",
     "from_bytes",
+    "generate_many",
+    "is_valid",
+    "iter_parse",
     "ksuid",
+    "loads_many",
+    "merge_sorted",
     "parse",
+    "parse_cache_info",
+    "partition_many",
+    "set_encoded_cache",
+    "set_parse_cache",
+    "try_parse",
+    "validate_many",
+    "write_encoded",
+    "CachedClock",
+    "Clock",
+    "CoarseClock",
     "Empty",
+    "EntropyPool",
     "Ksuid",
     "Ksuid40",
     "KsuidMs",
     "Ksuid48",
+    "KsuidArray",
+    "KsuidDict",
+    "KsuidReader",
+    "KsuidSequence",
+    "KsuidSet",
+    "ManualClock",
+    "ParseCacheInfo",
+    "RealtimeClock",
+    "SharedKsuidSequence",
 ]
@@ -31,6 +31,16 @@ except ImportError:
     HAS_CYTHON = False
 
 
+def cython_version_info() -> Tuple[int, ...]:
+    from Cython import __version__
+
+    # Major and minor only, pre-releases such as 3.1.0a1 included
+    return tuple(
+        int("".join(c for c in part if c.isdigit()) or 0)
+        for part in __version__.split(".")[:2]
+    )
+
+
 def check_option(name: str) -> bool:
     cli_arg = "--" + name
     if cli_arg in sys.argv:
@@ -54,6 +64,20 @@ if USE_CYTHON and not HAS_CYTHON:
     USE_CYTHON = False
 
 
+# Bulk operations run multi-threaded with --openmp if the compiler supports it.
+# Off by default: libgomp is not fork-safe once its thread pool has started
+USE_OPENMP = check_option("openmp") or check_option("with-openmp")
+
+# Runtime counters reported by cyksuid.stats(), compiled out with --no-stats
+if check_option("no-stats") or check_option("without-stats"):
+    ext_macros += [("CYKSUID_STATS", "0")]
+
+# Portable 64-bit base62 conversion even where unsigned __int128 is available,
+# to test the code path of compilers without it
+if check_option("no-int128") or check_option("without-int128"):
+    ext_macros += [("KSUID_B62_NO_INT128", "1")]
+
+
 if USE_CYTHON:
     suffix = ".pyx"
 else:
@@ -70,7 +94,21 @@ ext_modules = [
     ),
     Extension(
         "cyksuid._ksuid",
-        sources=["cyksuid/_ksuid" + suffix],
+        sources=["cyksuid/_ksuid" + suffix, "cyksuid/cbase62.cc"],
+        define_macros=ext_macros,
+        include_dirs=ext_include_dirs,
+        language="c++",
+    ),
+    Extension(
+        "cyksuid._array",
+        sources=["cyksuid/_array" + suffix],
+        define_macros=ext_macros,
+        include_dirs=ext_include_dirs,
+        language="c++",
+    ),
+    Extension(
+        "cyksuid._stream",
+        sources=["cyksuid/_stream" + suffix, "cyksuid/cbase62.cc"],
         define_macros=ext_macros,
         include_dirs=ext_include_dirs,
         language="c++",
@@ -99,6 +137,11 @@ class BuildExt(build_ext.build_ext):
                 "binding": True,
             }
 
+        if HAS_CYTHON and cython_version_info() >= (3, 1):
+            # Importing the extensions keeps the GIL disabled on free-threaded
+            # CPython (3.13t+), older Cython versions cannot build for it
+            self.cython_compiler_directives["freethreading_compatible"] = True
+
         if IS_DEBUG:
             self.cython_kwargs.update(
                 {
@@ -154,8 +197,12 @@ class BuildExt(build_ext.build_ext):
             if not is_windows:
                 self.add_link_time_optimization()
 
+        openmp_args = self.get_openmp_args(is_msvc) if USE_OPENMP else []
+
         for e in self.extensions:
-            e.extra_compile_args += self.extra_compile_args
+            e.extra_compile_args += self.extra_compile_args + openmp_args
+            if not is_msvc:
+                e.extra_link_args += openmp_args
 
         if USE_CYTHON:
             self.extensions = cythonize(
@@ -184,6 +231,15 @@ class BuildExt(build_ext.build_ext):
             msg = "\n\n\nWarning: compiler does not support C++11, compilation of cyksuid might fail without it.\n\n\n"
             warnings.warn(msg)
 
+    def get_openmp_args(self, is_msvc: bool) -> List[str]:
+        if is_msvc:
+            return ["/openmp"]
+        arg_openmp = "-fopenmp"
+        if self.test_supports_compile_arg(arg_openmp):
+            return [arg_openmp]
+        print("OpenMP not supported, bulk operations will run serially")
+        return []
+
     def add_O3(self):
         O3 = "-O3"
         if self.test_supports_compile_arg(O3):
@@ -256,6 +312,7 @@ setup(
     author_email="timon86.wang@gmail.com",
     license="BSD",
     packages=["cyksuid"],
+    entry_points={"console_scripts": ["cyksuid = cyksuid.cli:main"]},
     package_data={
         "cyksuid": ["*.pyx", "*.pxd", "*.pyi", "py.typed", "*.h", "*.cc", "*.cpp"],
     },
@@ -283,5 +340,6 @@ setup(
         "Topic :: Utilities",
     ],
     install_requires=[],
+    extras_require={"numpy": ["numpy"]},
     zip_safe=False,
 )
@@ -0,0 +1,169 @@
+import array
+import subprocess
+import sys
+from typing import List, Optional, Type
+
+import pytest
+
+from cyksuid.fast_base62 import DecodeError
+from cyksuid.v2 import Ksuid, Ksuid40, Ksuid48, KsuidArray, generate_many
+
+
+def gen(n: int, ksuid_cls: Optional[Type[Ksuid]] = None) -> List[Ksuid]:
+    return list(KsuidArray.from_buffer(generate_many(n, ksuid_cls), ksuid_cls))
+
+
+def test_empty() -> None:
+    arr = KsuidArray()
+    assert len(arr) == 0
+    assert list(arr) == []
+    assert arr.tobytes() == b""
+    assert bytes(memoryview(arr)) == b""
+    assert arr.to_encoded() == b""
+    assert arr.ksuid_cls is Ksuid
+    assert repr(arr) == "KsuidArray(len=0, ksuid_cls=Ksuid)"
+    with pytest.raises(ValueError):
+        arr.min()
+
+
+@pytest.mark.parametrize("ksuid_cls", [Ksuid, Ksuid40, Ksuid48])
+def test_roundtrip(ksuid_cls) -> None:
+    ids = gen(100, ksuid_cls)
+    arr = KsuidArray(ids, ksuid_cls)
+    assert len(arr) == 100
+    assert list(arr) == ids
+    assert all(type(k) is ksuid_cls for k in arr)
+    assert arr[0] == ids[0]
+    assert arr[-1] == ids[-1]
+    assert arr.tobytes() == b"".join(k.bytes for k in ids)
+    assert bytes(memoryview(arr)) == arr.tobytes()
+    assert arr.timestamps_millis() == array.array(
+        "q", [k.timestamp_millis for k in ids]
+    )
+    assert arr.datetimes() == [k.datetime for k in ids]
+
+    encoded = arr.to_encoded(newline=True)
+    assert encoded == b"".join(k.encoded + b"\n" for k in ids)
+    assert list(KsuidArray.from_encoded(encoded, ksuid_cls, newline=True)) == ids
+
+
+def test_append_raw() -> None:
+    k = Ksuid()
+    arr = KsuidArray()
+    arr.append(k)
+    arr.append(k.bytes)
+    arr.append(bytearray(k.bytes))
+    arr.extend(arr)
+    assert list(arr) == [k] * 6
+    with pytest.raises(ValueError):
+        arr.append(b"short")
+    with pytest.raises(TypeError):
+        arr.append(1)  # type: ignore[arg-type]
+
+
+def test_index_error() -> None:
+    arr = KsuidArray(gen(2))
+    with pytest.raises(IndexError):
+        arr[2]
+    with pytest.raises(IndexError):
+        arr[-3]
+
+
+def test_slices() -> None:
+    ids = gen(10)
+    arr = KsuidArray(ids)
+    assert list(arr[2:5]) == ids[2:5]
+    assert list(arr[::-2]) == ids[::-2]
+    assert list(arr[20:]) == []
+
+    view = arr[1:3]
+    with pytest.raises(BufferError):
+        arr.append(ids[0])
+    # Views share memory with the array
+    arr.sort()
+    assert list(view) == sorted(ids)[1:3]
+    del view
+    arr.append(ids[0])
+    assert len(arr) == 11
+
+
+def test_from_buffer() -> None:
+    ids = gen(5)
+    raw = bytearray(b"".join(k.bytes for k in ids))
+    arr = KsuidArray.from_buffer(raw)
+    assert list(arr) == ids
+    raw[:20] = bytes(20)
+    assert arr[0] == Ksuid(bytes(20))
+
+    readonly = KsuidArray.from_buffer(bytes(raw))
+    with pytest.raises(TypeError):
+        readonly.sort()
+    # Growing copies the items into owned storage
+    readonly.append(ids[0])
+    readonly.sort()
+    assert readonly[0] == Ksuid(bytes(20))
+
+    with pytest.raises(ValueError):
+        KsuidArray.from_buffer(b"x" * 21)
+
+
+def test_from_encoded_invalid() -> None:
+    with pytest.raises(DecodeError) as exc_info:
+        KsuidArray.from_encoded(b"0" * 27 + b"!" * 27)
+    assert exc_info.value.index == 1
+    with pytest.raises(DecodeError) as exc_info:
+        KsuidArray.from_encoded(b"0" * 27 + b"\n" + b"0" * 27 + b"x", newline=True)
+    assert exc_info.value.index == 1
+
+
+def test_sort_search() -> None:
+    ids = gen(1000)
+    arr = KsuidArray(ids + ids[:10])
+    assert arr.min() == min(ids)
+    assert arr.max() == max(ids)
+    assert ids[500] in arr
+    assert Ksuid() not in arr
+    assert "x" not in arr
+
+    unique = arr.unique()
+    assert list(unique) == sorted(ids)
+    assert len(arr) == 1010
+
+    arr.sort()
+    assert list(arr) == sorted(ids + ids[:10])
+    first = sorted(ids)[0]
+    assert arr.searchsorted(first) == 0
+    assert arr.searchsorted(first, side="right") == (2 if first in ids[:10] else 1)
+    assert arr.searchsorted(Ksuid(b"\xff" * 20)) == len(arr)
+    assert arr.searchsorted(bytes(20)) == 0
+    with pytest.raises(ValueError):
+        arr.searchsorted(first, side="middle")
+
+
+def test_contains_raw() -> None:
+    ids = gen(10)
+    arr = KsuidArray(ids)
+    assert ids[3].bytes in arr
+    assert memoryview(ids[3].bytes) in arr
+    assert bytearray(ids[3].bytes) in arr
+    assert Ksuid().bytes not in arr
+    assert ids[3].bytes[:19] not in arr
+    assert ids[3].bytes + b"x" not in arr
+    assert 1 not in arr
+
+
+def test_collect_reference_cycle() -> None:
+    # The viewed buffer must stay alive until the view is released
+    code = """
+import gc
+from cyksuid.v2 import KsuidArray
+
+obj = KsuidArray.from_buffer(bytearray(20))
+cycle = [obj]
+cycle.append(cycle)
+del cycle, obj
+gc.collect()
+"""
+    result = subprocess.run([sys.executable, "-c", code], stderr=subprocess.PIPE)
+    assert result.returncode == 0
+    assert result.stderr == b""
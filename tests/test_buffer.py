@@ -0,0 +1,60 @@
+import mmap
+
+import pytest
+
+from cyksuid.v2 import BYTE_LENGTH, Ksuid, Ksuid40, Ksuid48, ksuid, parse
+
+
+def test_memoryview_is_readonly_and_zero_copy() -> None:
+    k: Ksuid = ksuid()
+    view = memoryview(k)
+    assert view.readonly
+    assert view.nbytes == BYTE_LENGTH
+    assert view.obj is k
+    assert view.tobytes() == k.bytes
+    with pytest.raises(TypeError):
+        view[0] = 0
+
+
+@pytest.mark.parametrize("ksuid_cls", [Ksuid, Ksuid40, Ksuid48])
+def test_construct_from_buffers(ksuid_cls) -> None:
+    k = ksuid_cls()
+    blob = bytearray(b"\xaa" * 7 + k.bytes + b"\xbb" * 5)
+    view = memoryview(blob)[7:][:BYTE_LENGTH]
+
+    assert ksuid_cls(view) == k
+    assert ksuid_cls.from_bytes(bytearray(k.bytes)) == k
+    assert ksuid_cls(memoryview(k)) == k
+
+    payload_size = k.PAYLOAD_LENGTH_IN_BYTES
+    payload = memoryview(k)[-payload_size:]
+    assert ksuid_cls.from_payload(payload).payload == k.payload
+    assert ksuid_cls(k.timestamp, bytearray(k.payload)) == k
+
+
+def test_construct_from_mmap() -> None:
+    k: Ksuid = ksuid()
+    with mmap.mmap(-1, BYTE_LENGTH * 2) as m:
+        m[BYTE_LENGTH:] = k.bytes
+        view = memoryview(m)
+        try:
+            assert Ksuid(view[BYTE_LENGTH:]) == k
+        finally:
+            view.release()
+
+
+def test_parse_from_buffers() -> None:
+    k: Ksuid = ksuid()
+    encoded = k.encoded
+    assert parse(bytearray(encoded)) == k
+    assert parse(memoryview(b"  " + encoded)[2:]) == k
+    assert parse(memoryview(encoded), ksuid_cls=Ksuid48) == Ksuid48(k.bytes)
+
+
+def test_invalid_buffers() -> None:
+    with pytest.raises(TypeError):
+        Ksuid("0" * BYTE_LENGTH)  # type: ignore[call-overload]
+    with pytest.raises(ValueError):
+        Ksuid(memoryview(b"\x00" * (BYTE_LENGTH - 1)))
+    with pytest.raises(TypeError, match="invalid encoded KSUID string"):
+        parse(bytearray(b"0" * 26))
@@ -1,7 +1,7 @@
 import os
 import time
 
-from cyksuid.v2 import BYTE_LENGTH, Ksuid48
+from cyksuid.v2 import BYTE_LENGTH, Ksuid, Ksuid40, Ksuid48
 
 
 def test_from_bytes() -> None:
@@ -31,3 +31,14 @@ def test_from_timestamp_and_payload() -> None:
     k = Ksuid48.from_timestamp_and_payload(timestamp, payload)
     assert k.payload == payload
     assert k.timestamp == timestamp
+
+
+def test_released_objects_keep_class_layout() -> None:
+    raw = bytes([i for i in range(BYTE_LENGTH)])
+    for cls in (Ksuid, Ksuid40, Ksuid48) * 3:
+        # Objects released by one class are reused by the others
+        ids = [cls(raw) for _ in range(200)]
+        del ids
+        k = cls(raw)
+        payload_size = cls.PAYLOAD_LENGTH_IN_BYTES
+        assert k.payload == raw[-payload_size:]
@@ -0,0 +1,110 @@
+import io
+import subprocess
+import sys
+
+import pytest
+
+from cyksuid.cli import main
+from cyksuid.v2 import Ksuid, Ksuid48, parse
+
+
+def run(capsysbinary, monkeypatch, argv, stdin=b""):
+    monkeypatch.setattr(sys, "stdin", io.TextIOWrapper(io.BytesIO(stdin)))
+    assert main(argv) == 0
+    return capsysbinary.readouterr().out
+
+
+@pytest.mark.parametrize("variant", ["ksuid", "ksuid40", "ksuid48"])
+def test_generate(capsysbinary, monkeypatch, variant) -> None:
+    out = run(capsysbinary, monkeypatch, ["generate", "-n", "100", "-v", variant])
+    lines = out.splitlines()
+    assert len(lines) == 100
+    assert all(parse(line) for line in lines)
+
+    out = run(capsysbinary, monkeypatch, ["generate", "-n", "3", "-f", "hex"])
+    assert [len(line) for line in out.splitlines()] == [40] * 3
+
+    out = run(capsysbinary, monkeypatch, ["generate", "-n", "3", "-f", "raw"])
+    assert len(out) == 60
+
+
+@pytest.mark.parametrize("fmt", ["base62", "hex", "raw"])
+def test_convert_roundtrip(capsysbinary, monkeypatch, fmt) -> None:
+    encoded = run(capsysbinary, monkeypatch, ["generate", "-n", "1000"])
+    converted = run(capsysbinary, monkeypatch, ["convert", "-f", fmt], encoded)
+    back = run(
+        capsysbinary, monkeypatch, ["convert", "-i", fmt, "-f", "base62"], converted
+    )
+    assert back == encoded
+
+
+def test_inspect(capsysbinary, monkeypatch, tmp_path) -> None:
+    k = Ksuid48.from_timestamp_and_payload(1700000000.123, bytes(range(14)))
+    path = tmp_path / "ids.txt"
+    path.write_bytes(k.encoded + b"\n")
+    out = run(capsysbinary, monkeypatch, ["inspect", str(path), "-v", "ksuid48"])
+    assert out.decode() == "%s\t1700000000123\t%s\t%s\n" % (
+        k,
+        k.datetime.isoformat(),
+        bytes(range(14)).hex(),
+    )
+
+    out = run(capsysbinary, monkeypatch, ["inspect", "-i", "raw"], bytes(Ksuid()))
+    assert len(out.splitlines()) == 1
+
+
+def test_invalid_input(capsysbinary, monkeypatch) -> None:
+    monkeypatch.setattr(sys, "stdin", io.TextIOWrapper(io.BytesIO(b"invalid\n")))
+    assert main(["convert"]) == 1
+    assert b"line 1" in capsysbinary.readouterr().err
+
+
+@pytest.mark.parametrize(
+    "data, lineno",
+    [
+        # 39 then 41 characters: the total length is still a whole number of KSUIDs
+        (b"0" * 39 + b"\n" + b"0" * 41 + b"\n", 1),
+        (b"0" * 40 + b"\n \n" + b"0" * 40 + b"\n", 2),
+        # Skipped blank lines still count
+        (b"0" * 40 + b"\n\n" + b"0" * 39 + b"\n", 3),
+        (b"0" * 40 + b"\n" + b"0" * 38 + b" 0\n", 2),
+        (b"0" * 39 + b"g\n", 1),
+    ],
+)
+def test_invalid_hex_input(capsysbinary, monkeypatch, data, lineno) -> None:
+    monkeypatch.setattr(sys, "stdin", io.TextIOWrapper(io.BytesIO(data)))
+    assert main(["convert", "-i", "hex"]) == 1
+    assert b"line %d" % lineno in capsysbinary.readouterr().err
+
+
+def test_hex_crlf(capsysbinary, monkeypatch) -> None:
+    k = Ksuid()
+    out = run(
+        capsysbinary,
+        monkeypatch,
+        ["convert", "-i", "hex", "-f", "base62"],
+        bytes(k).hex().encode() + b"\r\n",
+    )
+    assert out == k.encoded + b"\n"
+
+
+def test_hex_blank_lines(capsysbinary, monkeypatch) -> None:
+    ids = [Ksuid(), Ksuid()]
+    data = b"\n".join(bytes(k).hex().encode() for k in ids)
+    out = run(
+        capsysbinary,
+        monkeypatch,
+        ["convert", "-i", "hex", "-f", "base62"],
+        b"\n" + data + b"\n\n",
+    )
+    assert out == b"".join(k.encoded + b"\n" for k in ids)
+
+
+def test_bench(capsysbinary, monkeypatch) -> None:
+    out = run(capsysbinary, monkeypatch, ["bench", "-n", "10", "-r", "1"])
+    assert b"generate" in out and b"ns/op" in out
+
+
+def test_module() -> None:
+    out = subprocess.check_output([sys.executable, "-m", "cyksuid", "generate"])
+    assert len(parse(out.strip()).bytes) == 20
@@ -0,0 +1,117 @@
+import time
+
+import pytest
+
+from cyksuid.v2 import (
+    CachedClock,
+    Clock,
+    CoarseClock,
+    Ksuid,
+    Ksuid40,
+    Ksuid48,
+    KsuidArray,
+    KsuidSequence,
+    ManualClock,
+    RealtimeClock,
+    SharedKsuidSequence,
+    SHARED_SEQUENCE_SIZE,
+    generate_many,
+    ksuid,
+)
+
+T0 = 1700000000000
+
+
+@pytest.mark.parametrize(
+    "clock", [Clock(), RealtimeClock(), CoarseClock(), CachedClock()]
+)
+def test_wall_clocks(clock: Clock) -> None:
+    before = int(time.time() * 1000)
+    now = clock.now_millis()
+    after = int(time.time() * 1000)
+    # The coarse clock lags by up to one scheduler tick
+    assert before - 50 <= now <= after
+    k = ksuid(clock=clock, ksuid_cls=Ksuid48)
+    assert before - 50 <= k.timestamp_millis <= int(time.time() * 1000)
+
+
+def test_manual_clock() -> None:
+    clock = ManualClock(T0, step=2)
+    assert [clock.now_millis() for _ in range(3)] == [T0, T0 + 2, T0 + 4]
+    assert clock.millis == T0 + 6
+    clock.advance(10)
+    assert clock.now_millis() == T0 + 16
+    clock.millis = T0
+    assert ksuid(clock=clock, ksuid_cls=Ksuid48).timestamp_millis == T0
+    assert ksuid(clock=clock, ksuid_cls=Ksuid40).timestamp_millis == T0 // 10 * 10
+
+
+def test_cached_clock() -> None:
+    clock = CachedClock(3)
+    readings = [clock.now_millis() for _ in range(3)]
+    assert readings == [readings[0]] * 3
+    time.sleep(0.01)
+    assert clock.now_millis() > readings[0]
+    with pytest.raises(ValueError):
+        CachedClock(0)
+
+
+def test_cached_clock_refresh() -> None:
+    clock = CachedClock(1000)
+    first = clock.now_millis()
+    time.sleep(0.01)
+    assert clock.now_millis() == first
+    clock.refresh()
+    assert clock.now_millis() > first
+
+
+def test_ksuid_clock_with_rand_func() -> None:
+    k: Ksuid = ksuid(rand_func=lambda n: b"\x01" * n, clock=ManualClock(T0))
+    assert type(k) is Ksuid
+    assert k.timestamp == T0 // 1000
+    assert k.payload == b"\x01" * 16
+
+
+def test_ksuid_clock_and_time_func_exclusive() -> None:
+    with pytest.raises(ValueError):
+        ksuid(time_func=time.time, clock=RealtimeClock())
+    with pytest.raises(ValueError):
+        KsuidSequence(time_func=time.time, clock=RealtimeClock())
+    with pytest.raises(TypeError):
+        ksuid(clock=time.time)  # type: ignore
+
+
+def test_sequence_clock() -> None:
+    clock = ManualClock(T0)
+    seq = KsuidSequence(Ksuid48, clock=clock)
+    a, b = seq(), seq()
+    assert a.timestamp_millis == b.timestamp_millis == T0
+    assert b > a
+    clock.advance(5)
+    assert seq().timestamp_millis == T0 + 5
+
+
+def test_shared_sequence_clock() -> None:
+    seq = SharedKsuidSequence(
+        bytearray(SHARED_SEQUENCE_SIZE), Ksuid48, clock=ManualClock(T0, step=1)
+    )
+    with seq:
+        assert [seq().timestamp_millis for _ in range(2)] == [T0, T0 + 1]
+
+
+@pytest.mark.parametrize("threads", [None, 2])
+def test_generate_many_manual_clock(threads: int) -> None:
+    clock = ManualClock(T0, step=7)
+    arr = KsuidArray.from_buffer(
+        generate_many(1000, Ksuid48, threads=threads, clock=clock), Ksuid48
+    )
+    assert set(arr.timestamps_millis()) == {T0}
+    # Read once per call
+    assert clock.millis == T0 + 7
+
+
+def test_generate_many_wall_clocks() -> None:
+    before = int(time.time()) - 1
+    for clock in (CoarseClock(), CachedClock(1)):
+        arr = KsuidArray.from_buffer(generate_many(10, clock=clock))
+        assert all(before <= k.timestamp <= time.time() for k in arr)
@@ -0,0 +1,85 @@
+import os
+import threading
+from typing import List
+
+import pytest
+
+from cyksuid.v2 import EntropyPool, Ksuid, Ksuid48, ksuid
+
+
+def test_pool_returns_requested_sizes() -> None:
+    pool = EntropyPool(64)
+    assert pool(0) == b""
+    assert len(pool(16)) == 16
+    # Larger than the pool itself
+    assert len(pool(100)) == 100
+    chunks = [pool(16) for _ in range(20)]
+    assert len(set(chunks)) == len(chunks)
+
+    with pytest.raises(ValueError):
+        pool(-1)
+    with pytest.raises(ValueError):
+        EntropyPool(0)
+
+
+def test_pool_as_rand_func() -> None:
+    pool = EntropyPool()
+    ids: List[Ksuid] = [ksuid(rand_func=pool) for _ in range(100)]
+    assert len(set(ids)) == 100
+    ids48 = [ksuid(rand_func=pool, ksuid_cls=Ksuid48) for _ in range(100)]
+    assert len(set(ids48)) == 100
+
+
+def test_pool_reset() -> None:
+    pool = EntropyPool()
+    first = pool(16)
+    pool.reset()
+    assert pool(16) != first
+
+
+def test_pool_threads() -> None:
+    pool = EntropyPool(256)
+    results: List[List[bytes]] = [[] for _ in range(8)]
+
+    def worker(out: List[bytes]) -> None:
+        for _ in range(1000):
+            out.append(pool(16))
+
+    threads = [threading.Thread(target=worker, args=(r,)) for r in results]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    chunks = [c for r in results for c in r]
+    assert len(set(chunks)) == len(chunks)
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork()")
+def test_pool_reseeds_after_fork() -> None:
+    pool = EntropyPool()
+    # Fill the buffers before forking
+    pool(16)
+    Ksuid()
+
+    r, w = os.pipe()
+    pid = os.fork()
+    if pid == 0:  # pragma: no cover
+        try:
+            os.write(w, pool(16) + Ksuid().payload)
+        finally:
+            os._exit(0)
+
+    os.close(w)
+    with os.fdopen(r, "rb") as f:
+        child = f.read()
+    os.waitpid(pid, 0)
+
+    assert len(child) == 32
+    assert child[:16] != pool(16)
+    assert child[16:] != Ksuid().payload
+
+
+def test_default_payloads_are_unique() -> None:
+    payloads = {Ksuid().payload for _ in range(10000)}
+    assert len(payloads) == 10000
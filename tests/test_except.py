@@ -22,3 +22,10 @@ def test_parse_with_unsupported_type() -> None:
         parse(0xeeff)  # type: ignore[arg-type]
     with pytest.raises(TypeError, match="Expect str or bytes"):
         parse(1.23)  # type: ignore[arg-type]
+
+
+def test_parse_with_invalid_characters() -> None:
+    with pytest.raises(ValueError, match="Invalid input buffer"):
+        parse("0" * 26 + "!")
+    with pytest.raises(ValueError, match="Invalid input buffer"):
+        parse(b"0" * 26 + b"\xff")
@@ -1,4 +1,17 @@
-from cyksuid.fast_base62 import fast_b62decode, fast_b62encode
+import os
+import random
+import string
+
+import pytest
+
+from cyksuid._ksuid import MAX_ENCODED
+from cyksuid.fast_base62 import (
+    DecodeError,
+    decode_many,
+    encode_many,
+    fast_b62decode,
+    fast_b62encode,
+)
 
 
 def test_convert_and_back() -> None:
@@ -21,3 +34,179 @@ def test_lexicographic_ordering() -> None:
 
     sorted_strings = list(sorted(unsorted_strings))
     assert unsorted_strings == sorted_strings
+
+
+def test_encode_decode_many() -> None:
+    raw = os.urandom(20 * 10)
+
+    encoded = encode_many(raw)
+    expected = [fast_b62encode(raw[i:][:20]) for i in range(0, len(raw), 20)]
+    assert encoded == b"".join(expected)
+    assert decode_many(encoded) == raw
+    assert decode_many(memoryview(bytearray(encoded))) == raw
+
+
+def test_encode_decode_many_newline() -> None:
+    raw = os.urandom(20 * 3)
+
+    encoded = encode_many(raw, newline=True)
+    assert encoded.count(b"\n") == 3
+    assert encoded.split() == [fast_b62encode(raw[i:][:20]) for i in (0, 20, 40)]
+    assert decode_many(encoded, newline=True) == raw
+    assert decode_many(encoded[:-1], newline=True) == raw
+
+
+def test_encode_decode_many_out() -> None:
+    raw = os.urandom(20 * 4)
+
+    out = bytearray(27 * 4)
+    assert encode_many(raw, out=out) is out
+    assert bytes(out) == encode_many(raw)
+
+    decoded = bytearray(20 * 4)
+    assert decode_many(out, out=decoded) is decoded
+    assert bytes(decoded) == raw
+
+    with pytest.raises(ValueError, match="too small"):
+        encode_many(raw, out=bytearray(10))
+    with pytest.raises(BufferError):
+        encode_many(raw, out=b"\x00" * 27 * 4)  # type: ignore[call-overload]
+
+
+def test_decode_many_invalid() -> None:
+    encoded = bytearray(encode_many(os.urandom(20 * 5)))
+    encoded[27 * 3 + 5] = ord("!")
+
+    with pytest.raises(DecodeError) as exc_info:
+        decode_many(encoded)
+    assert exc_info.value.index == 3
+
+    with pytest.raises(DecodeError) as exc_info:
+        decode_many(b"0" * 27 + b"\n" + b"0" * 27 + b"\t" + b"0" * 27, newline=True)
+    assert exc_info.value.index == 1
+
+    with pytest.raises(ValueError, match="multiple of"):
+        decode_many(b"0" * 28)
+    with pytest.raises(ValueError, match="multiple of"):
+        encode_many(b"0" * 21)
+
+
+@pytest.mark.parametrize("n", [1, 2, 50001])
+@pytest.mark.parametrize("threads", [1, 4])
+def test_decode_many_trailing_separator(n, threads) -> None:
+    encoded = encode_many(os.urandom(20 * n), newline=True)
+    with pytest.raises(DecodeError) as exc_info:
+        decode_many(encoded[:-1] + b"x", newline=True, threads=threads)
+    assert exc_info.value.index == n - 1
+
+
+@pytest.mark.parametrize("threads", [None, 0, 1, 3, 8])
+def test_encode_decode_many_threads(threads) -> None:
+    # Enough records to be split across threads
+    raw = os.urandom(20 * 50001)
+    for newline in (False, True):
+        encoded = encode_many(raw, newline=newline, threads=threads)
+        assert encoded == encode_many(raw, newline=newline)
+        assert decode_many(encoded, newline=newline, threads=threads) == raw
+
+
+@pytest.mark.parametrize("index", [0, 12499, 12500, 50000])
+def test_decode_many_threads_invalid(index) -> None:
+    encoded = bytearray(encode_many(os.urandom(20 * 50001), newline=True))
+    encoded[28 * index + 27] = ord("x")
+    encoded[28 * (index + 1) - 28] = ord("!")
+    with pytest.raises(DecodeError) as exc_info:
+        decode_many(encoded, newline=True, threads=4)
+    assert exc_info.value.index == index
+
+    with pytest.raises(ValueError):
+        decode_many(encoded, threads=-1)
+
+
+def test_boundaries() -> None:
+    assert fast_b62encode(b"\x00" * 20) == b"0" * 27
+    assert fast_b62encode(b"\xff" * 20) == MAX_ENCODED
+    assert fast_b62decode(MAX_ENCODED) == b"\xff" * 20
+    assert fast_b62decode(b"0" * 27) == b"\x00" * 20
+
+    # Values above MAX_ENCODED do not fit into 20 bytes
+    with pytest.raises(ValueError, match="out of range"):
+        fast_b62decode(MAX_ENCODED[:-1] + b"W")
+    with pytest.raises(ValueError):
+        fast_b62decode(b"z" * 27)
+
+
+ALPHABET = (string.digits + string.ascii_uppercase + string.ascii_lowercase).encode()
+
+
+def reference_encode(value: int) -> bytes:
+    digits = []
+    for _ in range(27):
+        value, digit = divmod(value, 62)
+        digits.append(ALPHABET[digit])
+    assert value == 0
+    return bytes(reversed(digits))
+
+
+def test_against_reference() -> None:
+    # Checks whichever conversion is compiled in, see `make test-no-int128`
+    rng = random.Random(62)
+    for _ in range(2000):
+        value = rng.getrandbits(160) >> rng.randrange(160)
+        raw = value.to_bytes(20, "big")
+        encoded = reference_encode(value)
+        assert fast_b62encode(raw) == encoded
+        assert fast_b62decode(encoded) == raw
+        assert decode_many(encode_many(raw)) == raw
+
+    for _ in range(200):
+        encoded = reference_encode(rng.randrange(1 << 160, 62**27))
+        with pytest.raises(ValueError, match="out of range"):
+            fast_b62decode(encoded)
+        with pytest.raises(DecodeError):
+            decode_many(encoded)
+
+
+def test_known_values() -> None:
+    raw = bytes(range(20))
+    assert fast_b62encode(raw) == b"0029sS3yqsuDyR1vGFhTuuRAq1b"
+    assert fast_b62decode(b"0029sS3yqsuDyR1vGFhTuuRAq1b") == raw
+
+    for i in range(20):
+        raw = b"\x00" * i + b"\x01" + b"\x00" * (19 - i)
+        assert fast_b62decode(fast_b62encode(raw)) == raw
+
+
+def test_bench_encode(benchmark) -> None:
+    raw = os.urandom(20)
+    benchmark(fast_b62encode, raw)
+
+
+def test_bench_decode(benchmark) -> None:
+    encoded = fast_b62encode(os.urandom(20))
+    benchmark(fast_b62decode, encoded)
+
+
+def test_bench_encode_many(benchmark) -> None:
+    raw = os.urandom(20 * 10000)
+    benchmark(encode_many, raw)
+
+
+def test_bench_decode_many(benchmark) -> None:
+    encoded = encode_many(os.urandom(20 * 10000))
+    benchmark(decode_many, encoded)
+
+
+THREADS = sorted({1, 2, 4, 8, os.cpu_count() or 1})
+
+
+@pytest.mark.parametrize("threads", THREADS)
+def test_bench_encode_many_threads(benchmark, threads) -> None:
+    raw = os.urandom(20 * 1000000)
+    benchmark(encode_many, raw, threads=threads)
+
+
+@pytest.mark.parametrize("threads", THREADS)
+def test_bench_decode_many_threads(benchmark, threads) -> None:
+    encoded = encode_many(os.urandom(20 * 1000000))
+    benchmark(decode_many, encoded, threads=threads)
@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+from cyksuid.fast_base62 import decode_many
+from cyksuid.v2 import (
+    BYTE_LENGTH,
+    STRING_ENCODED_LENGTH,
+    Ksuid,
+    Ksuid40,
+    Ksuid48,
+    KsuidArray,
+    generate_many,
+    parse,
+)
+
+
+@pytest.mark.parametrize("ksuid_cls", [Ksuid, Ksuid40, Ksuid48])
+def test_generate_many_raw(ksuid_cls) -> None:
+    now = time.time()
+    n = 100
+    buf = generate_many(n, ksuid_cls=ksuid_cls)
+    assert len(buf) == n * BYTE_LENGTH
+
+    ids = []
+    for start in range(0, len(buf), BYTE_LENGTH):
+        end = start + BYTE_LENGTH
+        ids.append(ksuid_cls(buf[start:end]))
+    assert len(set(ids)) == n
+    for k in ids:
+        assert abs(k.timestamp - now) < 2
+
+
+@pytest.mark.parametrize("ksuid_cls", [Ksuid, Ksuid40, Ksuid48])
+def test_generate_many_encoded(ksuid_cls) -> None:
+    n = 100
+    buf = generate_many(n, ksuid_cls=ksuid_cls, encoded=True)
+    assert len(buf) == n * STRING_ENCODED_LENGTH
+
+    step = STRING_ENCODED_LENGTH
+    for start in range(0, len(buf), step):
+        end = start + step
+        encoded = buf[start:end]
+        assert parse(encoded, ksuid_cls=ksuid_cls).encoded == encoded
+
+
+@pytest.mark.parametrize("ksuid_cls", [Ksuid, Ksuid40, Ksuid48])
+@pytest.mark.parametrize("encoded", [False, True])
+def test_generate_many_threads(ksuid_cls, encoded) -> None:
+    now = time.time()
+    n = 50001
+    buf = generate_many(n, ksuid_cls, encoded=encoded, threads=4)
+    size = STRING_ENCODED_LENGTH if encoded else BYTE_LENGTH
+    assert len(buf) == n * size
+
+    ids = KsuidArray.from_buffer(decode_many(buf) if encoded else buf, ksuid_cls)
+    # Threads draw independent entropy
+    assert len(ids.unique()) == n
+    timestamps = ids.timestamps_millis()
+    assert abs(min(timestamps) / 1000 - now) < 2
+    assert abs(max(timestamps) / 1000 - now) < 2
+
+
+def test_generate_many_empty() -> None:
+    assert generate_many(0) == b""
+    assert generate_many(0, encoded=True) == b""
+
+
+def test_generate_many_invalid_args() -> None:
+    with pytest.raises(ValueError):
+        generate_many(-1)
+    with pytest.raises(ValueError):
+        generate_many(1, threads=-1)
+    with pytest.raises(TypeError, match="Expect a KSUID class"):
+        generate_many(1, ksuid_cls=bytes)  # type: ignore[arg-type]
@@ -1,11 +1,19 @@
 import json
 import os
 from datetime import datetime, timedelta, timezone
-from typing import Set
+from typing import Set, Type
 
 import pytest
 
-from cyksuid.v2 import Ksuid, KsuidMs, from_bytes, ksuid, parse
+from cyksuid.v2 import (
+    Ksuid,
+    Ksuid48,
+    KsuidMs,
+    from_bytes,
+    ksuid,
+    parse,
+    set_encoded_cache,
+)
 
 TESTS_DIR = os.path.dirname(os.path.realpath(__file__))
 
@@ -157,6 +165,23 @@ def test_ms_mode_datetime() -> None:
         time += timedelta(milliseconds=5)
 
 
+@pytest.mark.parametrize("ksuid_cls", [Ksuid, KsuidMs, Ksuid48])
+def test_datetime_exact_millis(ksuid_cls: Type[Ksuid]) -> None:
+    epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
+    # Around day and leap day boundaries, and with sub-second precision
+    for ms in [
+        1400000000000,
+        1700000000001,
+        1709251199999,
+        1709251200000,
+        4102444800123,
+    ]:
+        k = ksuid_cls(ms / 1000, bytes(ksuid_cls.PAYLOAD_LENGTH_IN_BYTES))
+        dt = k.datetime
+        assert dt.tzinfo is timezone.utc
+        assert dt == epoch + timedelta(milliseconds=k.timestamp_millis)
+
+
 def test_golib_interop() -> None:
     tf_path = os.path.join(TESTS_DIR, "test_ksuids.txt")
 
@@ -195,3 +220,30 @@ def test_golib_interop_ms_mode() -> None:
             timediff = ksuid_ms.datetime - ksuid.datetime
             assert abs(timediff.total_seconds() * (10**3)) <= 1000
             assert test_data["ksuid"] == str(ksuid_ms)
+
+
+def test_hash_matches_bytes() -> None:
+    k: Ksuid = ksuid()
+    assert hash(k) == hash(k.bytes)
+    assert hash(k) == hash(k)
+    assert hash(KsuidMs(k.bytes)) == hash(k)
+
+
+def test_str_is_cached() -> None:
+    k: Ksuid = ksuid()
+    s = str(k)
+    assert str(k) is s
+    assert k.encoded == s.encode("ascii")
+    assert parse(s) == k
+
+
+def test_str_cache_disabled() -> None:
+    set_encoded_cache(False)
+    try:
+        k: Ksuid = ksuid()
+        s = str(k)
+        assert str(k) == s
+        assert str(k) is not s
+        assert k.encoded == s.encode("ascii")
+    finally:
+        set_encoded_cache(True)
@@ -0,0 +1,109 @@
+import heapq
+from typing import List
+
+import pytest
+
+from cyksuid.v2 import (
+    Ksuid,
+    Ksuid48,
+    KsuidArray,
+    generate_many,
+    merge_sorted,
+)
+
+
+def sorted_array(n: int, ksuid_cls: type = Ksuid) -> KsuidArray:
+    arr = KsuidArray.from_buffer(bytearray(generate_many(n, ksuid_cls)), ksuid_cls)
+    arr.sort()
+    return arr
+
+
+def collect(batches: "object") -> KsuidArray:
+    out = KsuidArray()
+    for batch in batches:  # type: ignore
+        assert isinstance(batch, KsuidArray)
+        out.extend(batch)
+    return out
+
+
+def test_merge_objects() -> None:
+    inputs = [list(sorted_array(n)) for n in (0, 1, 50, 200)]
+    merged = list(merge_sorted(*inputs))
+    assert merged == list(heapq.merge(*inputs))
+    assert all(isinstance(k, Ksuid) for k in merged)
+
+
+def test_merge_raw_bytes() -> None:
+    inputs = [[k.bytes for k in sorted_array(n)] for n in (10, 30)]
+    merged = list(merge_sorted(*inputs))
+    assert merged == sorted(inputs[0] + inputs[1])
+    assert all(type(b) is bytes for b in merged)
+
+
+def test_merge_is_stable() -> None:
+    a = [b"a" * 20, b"b" * 20]
+    b = [bytes(b"a" * 20), b"c" * 20]
+    merged = list(merge_sorted(a, b))
+    assert merged == [b"a" * 20, b"a" * 20, b"b" * 20, b"c" * 20]
+    assert merged[0] is a[0]
+    assert merged[1] is b[0]
+
+
+def test_merge_dedupe() -> None:
+    ids = list(sorted_array(100))
+    merged = list(merge_sorted(ids, ids[::2], ids[50:], dedupe=True))
+    assert merged == ids
+
+
+def test_merge_invalid_items() -> None:
+    with pytest.raises(TypeError):
+        list(merge_sorted([b"short"]))
+    with pytest.raises(TypeError):
+        list(merge_sorted([Ksuid()], ["Afwp2wWXH1RpvLDMXQkmZtUlWzr"]))  # type: ignore
+
+
+def test_merge_nothing() -> None:
+    assert list(merge_sorted()) == []
+    assert list(merge_sorted([], [])) == []
+
+
+def test_merge_buffers() -> None:
+    inputs = [sorted_array(n) for n in (0, 1, 500, 2000)]
+    expected: List[Ksuid] = list(heapq.merge(*inputs))
+
+    batches = list(merge_sorted(*inputs, batch_size=1000))
+    assert [len(b) for b in batches] == [1000, 1000, 501]
+    assert list(collect(batches)) == expected
+    # Inputs are locked while the merge views them
+    del batches
+    inputs[0].append(Ksuid())
+
+
+def test_merge_mixed_buffers() -> None:
+    a = sorted_array(100)
+    b = sorted_array(100)
+    merged = collect(merge_sorted(a, b.tobytes(), memoryview(a)))
+    assert list(merged) == sorted(list(a) * 2 + list(b))
+
+
+def test_merge_buffers_dedupe() -> None:
+    a = sorted_array(100)
+    merged = collect(merge_sorted(a, a[:50], a[25:], dedupe=True, batch_size=7))
+    assert merged.tobytes() == a.tobytes()
+
+
+def test_merge_buffers_ksuid_cls() -> None:
+    a = sorted_array(10, Ksuid48)
+    (batch,) = merge_sorted(a.tobytes(), a)
+    assert batch.ksuid_cls is Ksuid48
+    (batch,) = merge_sorted(a.tobytes(), ksuid_cls=Ksuid48)
+    assert batch.ksuid_cls is Ksuid48
+    (batch,) = merge_sorted(a.tobytes())
+    assert batch.ksuid_cls is Ksuid
+
+
+def test_merge_invalid_buffers() -> None:
+    with pytest.raises(ValueError):
+        merge_sorted(b"x" * 21)
+    with pytest.raises(ValueError):
+        merge_sorted(b"", batch_size=0)
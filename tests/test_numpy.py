@@ -0,0 +1,86 @@
+import subprocess
+import sys
+
+import pytest
+
+from cyksuid.fast_base62 import DecodeError
+from cyksuid.v2 import Ksuid, Ksuid40, Ksuid48, generate_many
+
+np = pytest.importorskip("numpy")
+cnp = pytest.importorskip("cyksuid.numpy")
+
+
+def item(arr, i: int) -> bytes:
+    # Indexing strips trailing NUL bytes of fixed-width items
+    return arr.reshape(-1)[i:][:1].tobytes()
+
+
+def test_v2_does_not_import_numpy() -> None:
+    code = "import sys, cyksuid.v2; assert 'numpy' not in sys.modules"
+    subprocess.check_call([sys.executable, "-c", code])
+
+
+def test_encode_decode() -> None:
+    raw = np.frombuffer(generate_many(100), dtype="S20").reshape(10, 10)
+    encoded = cnp.encode(raw)
+    assert encoded.dtype == np.dtype("S27")
+    assert encoded.shape == (10, 10)
+    assert item(encoded, 34) == Ksuid(item(raw, 34)).encoded
+    assert (cnp.decode(encoded) == raw).all()
+    # Non contiguous input
+    assert (cnp.decode(encoded[:, ::2]) == raw[:, ::2]).all()
+
+
+def test_decode_invalid() -> None:
+    encoded = np.array([Ksuid().encoded, b"!" * 27])
+    with pytest.raises(DecodeError) as exc_info:
+        cnp.decode(encoded)
+    assert exc_info.value.index == 1
+
+    with pytest.raises(TypeError):
+        cnp.decode(np.zeros(3, dtype=np.int64))
+
+
+@pytest.mark.parametrize("ksuid_cls", [Ksuid, Ksuid40, Ksuid48])
+def test_timestamps(ksuid_cls) -> None:
+    raw = np.frombuffer(generate_many(50, ksuid_cls), dtype="S20")
+    expected = [ksuid_cls(item(raw, i)).timestamp_millis for i in range(50)]
+    ts = cnp.timestamps_millis(raw, ksuid_cls)
+    assert ts.dtype == np.int64
+    assert ts.tolist() == expected
+    dt = cnp.datetimes(raw, ksuid_cls)
+    assert dt.dtype == np.dtype("datetime64[ms]")
+    assert dt.astype(np.int64).tolist() == expected
+
+
+@pytest.mark.parametrize("ksuid_cls", [Ksuid, Ksuid40, Ksuid48])
+def test_from_timestamps(ksuid_cls) -> None:
+    ts = np.array([1700000000000, 1700000000500, 1800000000996], dtype=np.int64)
+    size = ksuid_cls.PAYLOAD_LENGTH_IN_BYTES
+    payloads = np.arange(3 * size, dtype=np.uint8).reshape(3, size)
+
+    raw = cnp.from_timestamps(ts, payloads, ksuid_cls)
+    assert raw.dtype == np.dtype("S20")
+    for i in range(3):
+        k = ksuid_cls(item(raw, i))
+        assert k.payload == payloads[i].tobytes()
+        assert (
+            k.timestamp_millis
+            == ksuid_cls.from_timestamp(ts[i] / 1000).timestamp_millis
+        )
+
+    as_bytes = payloads.view("S%d" % size).reshape(3)
+    assert (
+        cnp.from_timestamps(ts.astype("datetime64[ms]"), as_bytes, ksuid_cls) == raw
+    ).all()
+
+    random = cnp.from_timestamps(ts, ksuid_cls=ksuid_cls)
+    assert (
+        cnp.timestamps_millis(random, ksuid_cls)
+        == cnp.timestamps_millis(raw, ksuid_cls)
+    ).all()
+
+    with pytest.raises(ValueError):
+        cnp.from_timestamps(ts, payloads[:2], ksuid_cls)
+    with pytest.raises(TypeError):
+        cnp.from_timestamps(ts, np.zeros(3, dtype="S3"), ksuid_cls)
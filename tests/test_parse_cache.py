@@ -0,0 +1,125 @@
+import threading
+from typing import Iterator, List
+
+import pytest
+
+from cyksuid.v2 import (
+    Ksuid,
+    Ksuid48,
+    ParseCacheInfo,
+    parse,
+    parse_cache_info,
+    set_parse_cache,
+)
+
+SAMPLE = "0ujtsYcgvSTl8PAuAdqWYSMnLOv"
+
+
+@pytest.fixture(autouse=True)
+def reset_cache() -> Iterator[None]:
+    yield
+    set_parse_cache(0)
+    set_parse_cache(0, Ksuid48)
+
+
+def encoded_ids(n: int) -> List[str]:
+    return [str(Ksuid()) for _ in range(n)]
+
+
+def test_disabled_by_default() -> None:
+    assert parse(SAMPLE) is not parse(SAMPLE)
+    assert parse_cache_info() == ParseCacheInfo(0, 0, 0, 0, 0)
+
+
+def test_hit_returns_same_instance() -> None:
+    set_parse_cache(10)
+    k: Ksuid = parse(SAMPLE)
+    assert parse(SAMPLE) is k
+    assert parse(SAMPLE.encode()) == k
+    assert parse_cache_info() == ParseCacheInfo(1, 2, 0, 2, 10)
+
+
+def test_bypass_per_call() -> None:
+    set_parse_cache(10)
+    k: Ksuid = parse(SAMPLE)
+    assert parse(SAMPLE, cache=False) is not k
+    assert parse(SAMPLE) is k
+    assert parse_cache_info().hits == 1
+
+
+def test_other_buffers_are_not_cached() -> None:
+    set_parse_cache(10)
+    parse(bytearray(SAMPLE.encode()))
+    parse(memoryview(SAMPLE.encode()))
+    assert parse_cache_info() == ParseCacheInfo(0, 0, 0, 0, 10)
+
+
+def test_per_class_capacity() -> None:
+    set_parse_cache(10, Ksuid48)
+    k = parse(SAMPLE, Ksuid48)
+    assert type(k) is Ksuid48
+    assert parse(SAMPLE, Ksuid48) is k
+    assert parse(SAMPLE) is not parse(SAMPLE)
+    assert parse_cache_info(Ksuid48).hits == 1
+    assert parse_cache_info().capacity == 0
+
+
+def test_clock_eviction() -> None:
+    set_parse_cache(4)
+    ids = encoded_ids(5)
+    hot: Ksuid = parse(ids[0])
+    for s in ids[1:4]:
+        parse(s)
+    # A hit gives the entry a second chance
+    assert parse(ids[0]) is hot
+    parse(ids[4])
+    info = parse_cache_info()
+    assert info.size == 4
+    assert info.evictions == 1
+    assert parse(ids[0]) is hot
+
+
+def test_reset_and_disable() -> None:
+    set_parse_cache(10)
+    k: Ksuid = parse(SAMPLE)
+    set_parse_cache(10)
+    assert parse_cache_info().size == 0
+    assert parse(SAMPLE) is not k
+    set_parse_cache(0)
+    assert parse_cache_info().capacity == 0
+    with pytest.raises(ValueError):
+        set_parse_cache(-1)
+    with pytest.raises(TypeError):
+        set_parse_cache(10, int)  # type: ignore
+
+
+def test_invalid_strings_are_not_cached() -> None:
+    set_parse_cache(10)
+    with pytest.raises(TypeError):
+        parse("short")
+    assert parse_cache_info().size == 0
+
+
+def test_threads() -> None:
+    set_parse_cache(64)
+    ids = encoded_ids(100)
+    errors: List[BaseException] = []
+
+    def worker() -> None:
+        try:
+            for _ in range(50):
+                for s in ids:
+                    assert str(parse(s)) == s
+        except BaseException as e:  # pragma: no cover
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    info = parse_cache_info()
+    assert info.size == 64
+    assert info.hits + info.misses == 4 * 50 * 100
@@ -0,0 +1,123 @@
+import array
+from typing import List
+
+import pytest
+
+from cyksuid.v2 import Ksuid, Ksuid48, KsuidArray, generate_many, partition_many
+
+M64 = (1 << 64) - 1
+P1 = 0x9E3779B185EBCA87
+P2 = 0xC2B2AE3D27D4EB4F
+P3 = 0x165667B19E3779F9
+P4 = 0x85EBCA77C2B2AE63
+P5 = 0x27D4EB2F165667C5
+
+
+def rotl(x: int, r: int) -> int:
+    return ((x << r) | (x >> (64 - r))) & M64
+
+
+def xxh64(data: bytes, seed: int = 0) -> int:
+    """Reference XXH64 for inputs shorter than 32 bytes."""
+    assert len(data) < 32
+    h = (seed + P5 + len(data)) & M64
+    i = 0
+    while i + 8 <= len(data):
+        k = rotl(int.from_bytes(data[i:][:8], "little") * P2 & M64, 31) * P1
+        h ^= k & M64
+        h = (rotl(h, 27) * P1 + P4) & M64
+        i += 8
+    if i + 4 <= len(data):
+        h ^= int.from_bytes(data[i:][:4], "little") * P1 & M64
+        h = (rotl(h, 23) * P2 + P3) & M64
+        i += 4
+    for b in data[i:]:
+        h ^= b * P5 & M64
+        h = rotl(h, 11) * P1 & M64
+    h ^= h >> 33
+    h = h * P2 & M64
+    h ^= h >> 29
+    h = h * P3 & M64
+    return h ^ (h >> 32)
+
+
+def jump(key: int, buckets: int) -> int:
+    b, j = -1, 0
+    while j < buckets:
+        b = j
+        key = (key * 2862933555777941757 + 1) & M64
+        j = int((b + 1) * (float(1 << 31) / float((key >> 33) + 1)))
+    return b
+
+
+def test_reference_vectors() -> None:
+    assert xxh64(b"") == 0xEF46DB3751D8E999
+    assert xxh64(b"a") == 0xD24EC4F1A98C6E5B
+
+
+@pytest.mark.parametrize("seed", [0, 1, 0xDEADBEEF, M64])
+def test_hash64(seed: int) -> None:
+    for k in [Ksuid(bytes(20)), Ksuid(b"\xff" * 20), Ksuid(), Ksuid48()]:
+        assert k.hash64(seed) == xxh64(k.bytes, seed)
+        assert k.hash64() == k.hash64(0)
+
+
+def test_hash64_fixed() -> None:
+    # Stable across processes, releases and platforms
+    k = Ksuid.from_bytes(bytes(range(20)))
+    assert k.hash64() == xxh64(bytes(range(20)))
+    assert k.hash64() != k.hash64(1)
+    with pytest.raises(OverflowError):
+        k.hash64(-1)
+
+
+def test_array_hash64() -> None:
+    arr = KsuidArray.from_buffer(generate_many(100))
+    hashes = arr.hash64(42)
+    assert hashes.typecode == "Q"
+    assert list(hashes) == [k.hash64(42) for k in arr]
+    assert len(KsuidArray().hash64()) == 0
+
+
+@pytest.mark.parametrize("threads", [None, 2])
+def test_partition_many(threads: int) -> None:
+    arr = KsuidArray.from_buffer(generate_many(10000))
+    parts = partition_many(arr, 7, seed=3, threads=threads)
+    assert isinstance(parts, array.array)
+    assert parts.typecode == "I"
+    assert list(parts) == [jump(k.hash64(3), 7) for k in arr]
+    assert set(parts) == set(range(7))
+    assert partition_many(arr.tobytes(), 7, seed=3) == parts
+
+
+def test_partition_many_grow() -> None:
+    data = generate_many(10000)
+    before = partition_many(data, 10)
+    after = partition_many(data, 11)
+    moved = [(a, b) for a, b in zip(before, after) if a != b]
+    assert all(b == 10 for _, b in moved)
+    assert 0 < len(moved) < 2000
+
+
+def test_partition_many_split() -> None:
+    arr = KsuidArray.from_buffer(generate_many(1000, Ksuid48), Ksuid48)
+    indices = partition_many(arr, 5)
+    assert isinstance(indices, array.array)
+    split = partition_many(arr, 5, split=True)
+    assert isinstance(split, list)
+    assert len(split) == 5
+    expected: List[List[bytes]] = [[] for _ in range(5)]
+    for k, p in zip(arr, indices):
+        expected[p].append(k.bytes)
+    assert split == [b"".join(e) for e in expected]
+
+
+def test_partition_many_edge_cases() -> None:
+    assert list(partition_many(b"", 3)) == []
+    assert partition_many(b"", 3, split=True) == [b"", b"", b""]
+    assert set(partition_many(generate_many(10), 1)) == {0}
+    for n in (0, -1, 1 << 31):
+        with pytest.raises(ValueError):
+            partition_many(b"", n)
+    with pytest.raises(ValueError):
+        partition_many(bytes(21), 2)
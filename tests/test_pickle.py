@@ -0,0 +1,146 @@
+import copy
+import pickle
+from typing import List, Type
+
+import pytest
+
+from cyksuid import ksuid as v1
+from cyksuid.v2 import (
+    Ksuid,
+    Ksuid40,
+    Ksuid48,
+    KsuidArray,
+    dumps_many,
+    generate_many,
+    loads_many,
+)
+
+PROTOCOLS = range(pickle.HIGHEST_PROTOCOL + 1)
+
+
+class SubKsuid(Ksuid):
+    pass
+
+
+@pytest.mark.parametrize("protocol", PROTOCOLS)
+@pytest.mark.parametrize("ksuid_cls", [Ksuid, Ksuid40, Ksuid48, SubKsuid])
+def test_pickle_ksuid(ksuid_cls: Type[Ksuid], protocol: int) -> None:
+    k = ksuid_cls()
+    k2 = pickle.loads(pickle.dumps(k, protocol))
+    assert type(k2) is ksuid_cls
+    assert k2 == k
+    assert k2.timestamp_millis == k.timestamp_millis
+
+
+@pytest.mark.parametrize("protocol", range(3, pickle.HIGHEST_PROTOCOL + 1))
+def test_pickle_size(protocol: int) -> None:
+    # The rebuild function, the class and 20 raw bytes, no state dict
+    assert len(pickle.dumps(Ksuid(), protocol)) <= 85
+
+
+def test_pickle_v1() -> None:
+    k = v1.ksuid()
+    assert pickle.loads(pickle.dumps(k)) == k
+
+
+def test_copy_returns_same_object() -> None:
+    k = Ksuid()
+    assert copy.copy(k) is k
+    assert copy.deepcopy(k) is k
+
+
+def test_unpickle_invalid() -> None:
+    func, (cls, raw) = Ksuid().__reduce__()
+    with pytest.raises(ValueError):
+        func(cls, raw[:-1])
+    with pytest.raises(TypeError):
+        func(int, raw)
+
+
+@pytest.mark.parametrize("protocol", PROTOCOLS)
+@pytest.mark.parametrize("ksuid_cls", [Ksuid, Ksuid48])
+def test_pickle_array(ksuid_cls: Type[Ksuid], protocol: int) -> None:
+    arr = KsuidArray.from_buffer(generate_many(1000, ksuid_cls), ksuid_cls)
+    arr2 = pickle.loads(pickle.dumps(arr, protocol))
+    assert arr2.ksuid_cls is ksuid_cls
+    assert arr2.tobytes() == arr.tobytes()
+    arr2.append(arr[0])
+    assert len(arr2) == 1001
+    arr2.sort()
+    assert arr2.tobytes() == b"".join(sorted([k.bytes for k in arr] + [arr[0].bytes]))
+
+
+def test_pickle_array_default_protocol_is_mutable() -> None:
+    arr2 = pickle.loads(pickle.dumps(KsuidArray.from_buffer(generate_many(10))))
+    arr2.sort()
+    arr2.extend(list(arr2))
+    arr2.append(bytes(20))
+    assert len(arr2) == 21
+
+
+def test_pickle_array_out_of_band() -> None:
+    raw = bytearray(generate_many(1000))
+    arr = KsuidArray.from_buffer(raw)
+    buffers: List[pickle.PickleBuffer] = []
+    data = pickle.dumps(arr, 5, buffer_callback=buffers.append)
+    assert len(data) < 200
+    assert len(buffers) == 1
+
+    arr2 = pickle.loads(data, buffers=buffers)
+    assert list(arr2) == list(arr)
+    # Zero-copy: the new array views the original memory
+    raw[:20] = bytes(20)
+    assert arr2[0] == arr[0]
+    del buffers
+    assert arr2[0].bytes == bytes(20)
+
+
+@pytest.mark.parametrize("ksuid_cls", [Ksuid, Ksuid40, Ksuid48])
+def test_dumps_many(ksuid_cls: Type[Ksuid]) -> None:
+    arr = KsuidArray.from_buffer(generate_many(100, ksuid_cls), ksuid_cls)
+    data = dumps_many(arr)
+    assert len(data) == 16 + 20 * 100
+    assert data[16:] == arr.tobytes()
+
+    arr2 = loads_many(data)
+    assert arr2.ksuid_cls is ksuid_cls
+    assert list(arr2) == list(arr)
+    # Iterables of objects produce the same bytes
+    assert dumps_many(list(arr)) == data
+    assert loads_many(data, ksuid_cls).ksuid_cls is ksuid_cls
+
+
+def test_dumps_many_empty() -> None:
+    data = dumps_many([])
+    assert len(data) == 16
+    arr = loads_many(data)
+    assert len(arr) == 0
+    assert arr.ksuid_cls is Ksuid
+
+
+def test_loads_many_views_buffer() -> None:
+    data = bytearray(dumps_many(KsuidArray.from_buffer(generate_many(10))))
+    arr = loads_many(data)
+    data[16:36] = bytes(20)
+    assert arr[0].bytes == bytes(20)
+    del arr
+    # Released when the array goes away
+    data.extend(b"")
+
+
+def test_loads_many_invalid() -> None:
+    data = dumps_many(KsuidArray.from_buffer(generate_many(10)))
+    with pytest.raises(ValueError):
+        loads_many(b"")
+    with pytest.raises(ValueError):
+        loads_many(b"X" + data[1:])
+    with pytest.raises(ValueError):
+        loads_many(data[:5] + b"\x02" + data[6:])
+    with pytest.raises(ValueError):
+        loads_many(data[:6] + b"\x07" + data[7:])
+    with pytest.raises(ValueError):
+        loads_many(data[:-1])
+    with pytest.raises(ValueError):
+        loads_many(data + bytes(20))
+    with pytest.raises(ValueError):
+        loads_many(data, Ksuid48)
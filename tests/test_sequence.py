@@ -0,0 +1,80 @@
+import itertools
+from typing import List
+
+import pytest
+
+from cyksuid.v2 import Ksuid, Ksuid40, Ksuid48, KsuidSequence
+
+
+def as_int(k: Ksuid) -> int:
+    return int.from_bytes(k.bytes, "big")
+
+
+@pytest.mark.parametrize("ksuid_cls", [Ksuid, Ksuid40, Ksuid48])
+def test_strictly_increasing(ksuid_cls) -> None:
+    seq = KsuidSequence(ksuid_cls)
+    ids = [seq() for _ in range(10000)]
+    assert all(type(k) is ksuid_cls for k in ids)
+    assert all(a < b for a, b in zip(ids, ids[1:]))
+
+
+@pytest.mark.parametrize("ksuid_cls", [Ksuid, Ksuid40, Ksuid48])
+def test_same_tick_increments_payload(ksuid_cls) -> None:
+    calls: List[int] = []
+
+    def rand_func(n: int) -> bytes:
+        calls.append(n)
+        return bytes(n)
+
+    seq = KsuidSequence(ksuid_cls, time_func=lambda: 1700000000.5, rand_func=rand_func)
+    ids = list(itertools.islice(seq, 100))
+
+    assert calls == [ksuid_cls.PAYLOAD_LENGTH_IN_BYTES]
+    assert [as_int(k) - as_int(ids[0]) for k in ids] == list(range(100))
+    assert {k.timestamp for k in ids} == {ids[0].timestamp}
+
+
+def test_new_tick_draws_new_payload() -> None:
+    now = [1700000000.0]
+    seq = KsuidSequence(Ksuid48, time_func=lambda: now[0])
+    first = seq()
+    second = seq()
+    now[0] += 0.001
+    third = seq()
+
+    assert as_int(second) == as_int(first) + 1
+    assert third.timestamp_millis == first.timestamp_millis + 1
+    assert third > second
+
+
+def test_clock_regression() -> None:
+    now = [1700000000.0]
+    seq = KsuidSequence(time_func=lambda: now[0])
+    first = seq()
+    now[0] -= 3600
+    second = seq()
+
+    assert second > first
+    assert second.timestamp == first.timestamp
+    assert as_int(second) == as_int(first) + 1
+
+
+def test_payload_overflow_carries_into_timestamp() -> None:
+    seq = KsuidSequence(
+        Ksuid, time_func=lambda: 1700000000.0, rand_func=lambda n: b"\xff" * n
+    )
+    first = seq()
+    second = seq()
+
+    assert second > first
+    assert second.payload == bytes(Ksuid.PAYLOAD_LENGTH_IN_BYTES)
+    assert second.timestamp == first.timestamp + 1
+
+
+def test_invalid_arguments() -> None:
+    with pytest.raises(TypeError, match="Expect a KSUID class"):
+        KsuidSequence(int)  # type: ignore[type-var]
+
+    seq = KsuidSequence(rand_func=lambda n: b"\x00")
+    with pytest.raises(ValueError, match="rand_func returned"):
+        seq()
@@ -0,0 +1,263 @@
+import pickle
+import random
+import sys
+from typing import Dict, List, Set, Type
+
+import pytest
+
+from cyksuid.v2 import (
+    Ksuid,
+    Ksuid40,
+    Ksuid48,
+    KsuidArray,
+    KsuidDict,
+    KsuidSet,
+    generate_many,
+)
+
+T0 = 1700000000000
+
+
+def bits(bitmap: bytes, n: int) -> List[bool]:
+    return [bool(bitmap[i // 8] >> (i % 8) & 1) for i in range(n)]
+
+
+def test_basic() -> None:
+    ids = [Ksuid() for _ in range(100)]
+    s = KsuidSet(ids[:50])
+    assert len(s) == 50
+    assert all(k in s for k in ids[:50])
+    assert not any(k in s for k in ids[50:])
+    assert ids[0].bytes in s
+    assert "not a ksuid" not in s
+    assert b"x" not in s
+    assert ids[0].bytes + b"x" not in s
+    assert bytearray(ids[1].bytes) in s
+    s.add(ids[0])
+    s.add(ids[50].bytes)
+    assert len(s) == 51
+    s.discard(ids[0])
+    s.discard(ids[0])
+    assert len(s) == 50
+    assert ids[0] not in s
+    assert set(s) == set(ids[1:51])
+    assert repr(s) == "KsuidSet(len=50, ksuid_cls=Ksuid)"
+
+
+def test_ksuid_cls() -> None:
+    s = KsuidSet([Ksuid48()], Ksuid48)
+    assert s.ksuid_cls is Ksuid48
+    assert type(next(iter(s))) is Ksuid48
+    assert KsuidSet().ksuid_cls is Ksuid
+    with pytest.raises(TypeError):
+        KsuidSet(ksuid_cls=int)  # type: ignore
+
+
+def test_invalid_values() -> None:
+    s = KsuidSet()
+    with pytest.raises(ValueError):
+        s.add(b"short")
+    with pytest.raises(TypeError):
+        s.add("0ujtsYcgvSTl8PAuAdqWYSMnLOv")  # type: ignore
+    with pytest.raises(ValueError):
+        s.add_many(bytes(21))
+
+
+def test_add_many() -> None:
+    arr = KsuidArray.from_buffer(generate_many(1000))
+    s = KsuidSet(arr[:500])
+    assert len(s) == 500
+    batch = arr[400:600].tobytes() + arr[550:560].tobytes()
+    fresh = s.add_many(batch)
+    assert isinstance(fresh, bytes)
+    assert len(fresh) == (210 + 7) // 8
+    assert bits(fresh, 210) == [False] * 100 + [True] * 100 + [False] * 10
+    assert len(s) == 600
+    assert bits(s.contains_many(arr), 1000) == [True] * 600 + [False] * 400
+    assert s.add_many(b"") == b""
+
+
+def test_against_set() -> None:
+    rng = random.Random(42)
+    pool = [Ksuid() for _ in range(2000)]
+    s = KsuidSet()
+    expected: Set[Ksuid] = set()
+    for _ in range(20000):
+        k = rng.choice(pool)
+        if rng.random() < 0.6:
+            s.add(k)
+            expected.add(k)
+        else:
+            s.discard(k)
+            expected.discard(k)
+        assert len(s) == len(expected)
+    assert set(s) == expected
+    assert all((k in s) == (k in expected) for k in pool)
+
+
+def test_colliding_payloads() -> None:
+    # Same payload, only the timestamps differ
+    ids = [Ksuid48(T0 / 1000 + i, bytes(14)) for i in range(5000)]
+    s = KsuidSet(ids, Ksuid48)
+    assert len(s) == 5000
+    for k in ids[::2]:
+        s.discard(k)
+    assert sorted(s) == ids[1::2]
+
+
+@pytest.mark.parametrize("ksuid_cls", [Ksuid, Ksuid40, Ksuid48])
+def test_expire(ksuid_cls: Type[Ksuid]) -> None:
+    rng = random.Random(7)
+    ids = [ksuid_cls.from_timestamp(T0 / 1000 + i) for i in range(1000)]
+    rng.shuffle(ids)
+    s = KsuidSet(ids, ksuid_cls)
+    now = T0 + 1000 * 1000
+    assert s.expire(1000 * 1000, now_millis=now) == 0
+    assert s.expire(500 * 1000, now_millis=now) == 500
+    assert len(s) == 500
+    assert sorted(s) == sorted(k for k in ids if k.timestamp_millis >= T0 + 500 * 1000)
+    assert s.expire(500 * 1000, now_millis=now) == 0
+    # Everything generated now is younger than an hour
+    s = KsuidSet(generate_many(100))
+    assert s.expire(3600 * 1000) == 0
+    assert s.expire(-3600 * 1000) == 100
+
+
+def test_expire_then_add() -> None:
+    s = KsuidSet(ksuid_cls=Ksuid48)
+    for second in range(50):
+        s.add_many(generate_many(100, Ksuid48))
+        s.add(Ksuid48.from_timestamp(T0 / 1000 + second))
+        s.expire(10 * 1000, now_millis=T0 + second * 1000)
+    assert sorted(
+        k.timestamp_millis for k in s if k.timestamp_millis < T0 + 3600 * 1000
+    ) == [T0 + i * 1000 for i in range(39, 50)]
+
+
+def test_expire_against_set() -> None:
+    rng = random.Random(3)
+    s = KsuidSet(ksuid_cls=Ksuid48)
+    expected: Set[Ksuid48] = set()
+    for second in range(200):
+        for _ in range(50):
+            k = Ksuid48(
+                T0 / 1000 + second + rng.randrange(20),
+                bytes(rng.getrandbits(8) for _ in range(14)),
+            )
+            s.add(k)
+            expected.add(k)
+        cutoff = T0 + (second - 10) * 1000
+        removed = s.expire(10 * 1000, now_millis=T0 + second * 1000)
+        assert removed == sum(k.timestamp_millis < cutoff for k in expected)
+        expected = {k for k in expected if k.timestamp_millis >= cutoff}
+        assert len(s) == len(expected)
+    assert set(s) == expected
+
+
+def test_expire_sliding_window() -> None:
+    # Frequent calls cutting through the time buckets, with late arrivals and
+    # KSUIDs discarded then added again between calls
+    rng = random.Random(11)
+    s = KsuidSet(ksuid_cls=Ksuid48)
+    expected: Set[Ksuid48] = set()
+    for step in range(600):
+        now = T0 + step * 37
+        for _ in range(20):
+            k = Ksuid48(
+                (now - rng.randrange(3000)) / 1000,
+                bytes(rng.getrandbits(8) for _ in range(14)),
+            )
+            s.add(k)
+            expected.add(k)
+        for k in rng.sample(sorted(expected), min(5, len(expected))):
+            s.discard(k)
+            expected.discard(k)
+            if rng.random() < 0.5:
+                s.add(k)
+                expected.add(k)
+        cutoff = now - 2000
+        removed = s.expire(2000, now_millis=now)
+        assert removed == sum(k.timestamp_millis < cutoff for k in expected)
+        expected = {k for k in expected if k.timestamp_millis >= cutoff}
+        assert len(s) == len(expected)
+        assert s.expire(2000, now_millis=now) == 0
+    assert set(s) == expected
+    assert s.expire(0, now_millis=T0 + 3600 * 1000) == len(expected)
+    assert len(s) == 0
+
+
+def test_expire_after_discards() -> None:
+    ids = [Ksuid48.from_timestamp(T0 / 1000 + i / 100) for i in range(3000)]
+    s = KsuidSet(ids, Ksuid48)
+    assert s.expire(3600 * 1000, now_millis=T0) == 0
+    # Discarded KSUIDs left in the time index outnumber the entries
+    for _ in range(3):
+        for k in ids[:2000]:
+            s.discard(k)
+        s.add_many(KsuidArray(ids[:2000], Ksuid48))
+    for k in ids[1000:2000]:
+        s.discard(k)
+    assert s.expire(0, now_millis=T0 + 25 * 1000) == 1500
+    assert sorted(s) == ids[2500:]
+
+
+def test_memory() -> None:
+    s = KsuidSet(generate_many(10000))
+    assert sys.getsizeof(s) < 60 * len(s)
+    s.clear()
+    assert len(s) == 0
+    assert sys.getsizeof(s) < 1000
+
+
+def test_pickle() -> None:
+    s = KsuidSet(generate_many(100, Ksuid48), Ksuid48)
+    loaded = pickle.loads(pickle.dumps(s))
+    assert type(loaded) is KsuidSet
+    assert loaded.ksuid_cls is Ksuid48
+    assert set(loaded) == set(s)
+
+
+def test_to_array() -> None:
+    arr = KsuidArray.from_buffer(generate_many(100))
+    out = KsuidSet(arr).to_array()
+    assert isinstance(out, KsuidArray)
+    out.sort()
+    assert out.tobytes() == arr.unique().tobytes()
+
+
+def test_dict() -> None:
+    ids = [Ksuid() for _ in range(1000)]
+    d = KsuidDict({k: i for i, k in enumerate(ids[:500])})
+    assert len(d) == 500
+    assert d[ids[7]] == 7
+    assert d[ids[7].bytes] == 7
+    assert d.get(ids[600]) is None
+    assert d.get(ids[600], -1) == -1
+    with pytest.raises(KeyError):
+        d[ids[600]]
+    d[ids[7]] = -(1 << 63)
+    assert d[ids[7]] == -(1 << 63)
+    del d[ids[7]]
+    assert ids[7] not in d
+    with pytest.raises(KeyError):
+        del d[ids[7]]
+    with pytest.raises(OverflowError):
+        d[ids[0]] = 1 << 63
+
+    expected: Dict[Ksuid, int] = {k: i for i, k in enumerate(ids[:500]) if i != 7}
+    assert dict(d.items()) == expected
+    assert dict(zip(d.keys(), d.values())) == expected
+    assert d.values().typecode == "q"
+    assert set(d) == set(expected)
+
+
+def test_dict_expire_and_pickle() -> None:
+    ids = [Ksuid40.from_timestamp(T0 / 1000 + i) for i in range(100)]
+    d = KsuidDict(((k, i) for i, k in enumerate(ids)), Ksuid40)
+    assert d.expire(50 * 1000, now_millis=T0 + 100 * 1000) == 50
+    assert sorted(d.values()) == list(range(50, 100))
+    loaded = pickle.loads(pickle.dumps(d))
+    assert loaded.ksuid_cls is Ksuid40
+    assert sorted(loaded.items()) == sorted(d.items())
+    d.clear()
+    assert len(d) == 0
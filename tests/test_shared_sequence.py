@@ -0,0 +1,160 @@
+import multiprocessing
+import struct
+import subprocess
+import sys
+import time
+
+import pytest
+
+from cyksuid.v2 import (
+    SHARED_SEQUENCE_SIZE,
+    Ksuid,
+    Ksuid40,
+    Ksuid48,
+    KsuidArray,
+    SharedKsuidSequence,
+)
+
+PROCESSES = 4
+COUNT = 20000
+
+
+def as_int(raw: bytes) -> int:
+    return int.from_bytes(raw, "big")
+
+
+@pytest.mark.parametrize("ksuid_cls", [Ksuid, Ksuid40, Ksuid48])
+def test_shared_between_instances(ksuid_cls) -> None:
+    buf = bytearray(SHARED_SEQUENCE_SIZE)
+    with SharedKsuidSequence(buf, ksuid_cls) as a, SharedKsuidSequence(
+        buf, ksuid_cls
+    ) as b:
+        ids = [seq() for _ in range(1000) for seq in (a, b)]
+    assert all(type(k) is ksuid_cls for k in ids)
+    assert all(x < y for x, y in zip(ids, ids[1:]))
+
+
+def test_same_tick_increments_payload() -> None:
+    buf = bytearray(SHARED_SEQUENCE_SIZE)
+    seq = SharedKsuidSequence(
+        buf, Ksuid48, time_func=lambda: 1700000000.5, rand_func=bytes
+    )
+    ids = [seq() for _ in range(3)]
+    assert [as_int(k.payload) for k in ids] == [0, 1, 2]
+    assert all(k.timestamp_millis == 1700000000500 for k in ids)
+
+    # Another instance continues the sequence, even with an older clock
+    other = SharedKsuidSequence(buf, Ksuid48, time_func=lambda: 1600000000.0)
+    assert as_int(other().payload) == 3
+
+
+def test_invalid_arguments(tmp_path) -> None:
+    with pytest.raises(ValueError, match="at least"):
+        SharedKsuidSequence(bytearray(SHARED_SEQUENCE_SIZE - 1))
+    with pytest.raises(BufferError):
+        SharedKsuidSequence(bytes(SHARED_SEQUENCE_SIZE))  # type: ignore[call-overload]
+
+    buf = bytearray(SHARED_SEQUENCE_SIZE)
+    SharedKsuidSequence(buf, Ksuid)()
+    with pytest.raises(ValueError, match="different KSUID class"):
+        SharedKsuidSequence(buf, Ksuid48)()
+
+    seq = SharedKsuidSequence.open(tmp_path / "seq", Ksuid)
+    seq.close()
+    with pytest.raises(ValueError, match="closed"):
+        seq()
+
+
+def test_open_file(tmp_path) -> None:
+    path = tmp_path / "seq"
+    with SharedKsuidSequence.open(path, Ksuid48) as a:
+        first = a()
+    assert path.stat().st_size == SHARED_SEQUENCE_SIZE
+    with SharedKsuidSequence.open(path, Ksuid48) as b:
+        assert b() > first
+
+
+def test_lock_of_dead_process_is_taken_over() -> None:
+    buf = bytearray(SHARED_SEQUENCE_SIZE)
+    seq = SharedKsuidSequence(buf, Ksuid48)
+    first = seq()
+    # A process that exited (and was reaped) while holding the lock
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    buf[:4] = struct.pack("=I", proc.pid)
+    assert seq() > first
+    assert buf[:4] == bytes(4)
+
+
+def _draw(name: str, count: int, queue) -> None:
+    from multiprocessing import shared_memory
+
+    shm = shared_memory.SharedMemory(name)
+    assert shm.buf is not None
+    seq = SharedKsuidSequence(shm.buf, Ksuid48)
+    ids = KsuidArray(ksuid_cls=Ksuid48)
+    for _ in range(count):
+        ids.append(seq())
+    seq.close()
+    shm.close()
+    queue.put(ids.tobytes())
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="requires fork")
+def test_multiprocess_stress() -> None:
+    shared_memory = pytest.importorskip("multiprocessing.shared_memory")
+    ctx = multiprocessing.get_context("fork")
+    shm = shared_memory.SharedMemory(create=True, size=SHARED_SEQUENCE_SIZE)
+    try:
+        assert shm.buf is not None
+        shm.buf[:SHARED_SEQUENCE_SIZE] = bytes(SHARED_SEQUENCE_SIZE)
+        queue = ctx.Queue()
+        start = time.perf_counter()
+        procs = [
+            ctx.Process(target=_draw, args=(shm.name, COUNT, queue))
+            for _ in range(PROCESSES)
+        ]
+        for p in procs:
+            p.start()
+        results = [KsuidArray.from_buffer(queue.get(), Ksuid48) for _ in procs]
+        for p in procs:
+            p.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        shm.close()
+        shm.unlink()
+
+    print("%d processes: %.0f IDs/s" % (PROCESSES, PROCESSES * COUNT / elapsed))
+    assert all(p.exitcode == 0 for p in procs)
+    for ids in results:
+        assert len(ids) == COUNT
+        assert all(a < b for a, b in zip(ids, ids[1:]))
+
+    # Globally, IDs of one tick are consecutive: the sequence never forked
+    merged = KsuidArray(ksuid_cls=Ksuid48)
+    for ids in results:
+        merged.extend(ids)
+    assert len(merged.unique()) == PROCESSES * COUNT
+    merged.sort()
+    for a, b in zip(merged, merged[1:]):
+        assert (
+            as_int(b.bytes) == as_int(a.bytes) + 1
+            or b.timestamp_millis > a.timestamp_millis
+        )
+
+
+def test_collect_reference_cycle() -> None:
+    # The viewed buffer must stay alive until the view is released
+    code = """
+import gc
+from cyksuid.v2 import SHARED_SEQUENCE_SIZE, SharedKsuidSequence
+
+obj = SharedKsuidSequence(bytearray(SHARED_SEQUENCE_SIZE))
+cycle = [obj]
+cycle.append(cycle)
+del cycle, obj
+gc.collect()
+"""
+    result = subprocess.run([sys.executable, "-c", code], stderr=subprocess.PIPE)
+    assert result.returncode == 0
+    assert result.stderr == b""
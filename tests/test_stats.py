@@ -0,0 +1,126 @@
+import io
+from typing import Iterator
+
+import pytest
+
+import cyksuid
+from cyksuid.fast_base62 import DecodeError, decode_many
+from cyksuid.v2 import (
+    Ksuid,
+    Ksuid40,
+    Ksuid48,
+    KsuidSequence,
+    generate_many,
+    iter_parse,
+    ksuid,
+    parse,
+    try_parse,
+)
+
+pytestmark = pytest.mark.skipif(
+    not cyksuid.stats()["enabled"], reason="built without runtime counters"
+)
+
+SAMPLE = "0ujtsYcgvSTl8PAuAdqWYSMnLOv"
+
+
+@pytest.fixture(autouse=True)
+def reset_stats() -> Iterator[None]:
+    cyksuid.stats_reset()
+    yield
+    cyksuid.set_stats_enabled(True)
+    cyksuid.stats_reset()
+
+
+def test_generated_per_class() -> None:
+    Ksuid()
+    Ksuid40()
+    Ksuid48(payload=bytes(14))
+    ksuid(time_func=lambda: 1700000000.0)
+    generate_many(10, Ksuid48)
+    seq = KsuidSequence(Ksuid40)
+    seq()
+    seq()
+
+    stats = cyksuid.stats()
+    assert stats["generated"] == {"Ksuid": 2, "Ksuid40": 3, "Ksuid48": 11}
+    # Parsing and rebuilding from bytes does not generate IDs
+    parse(SAMPLE)
+    Ksuid(bytes(20))
+    assert cyksuid.stats()["generated"] == stats["generated"]
+
+
+def test_entropy_bytes() -> None:
+    Ksuid()
+    generate_many(10, Ksuid48)
+    assert cyksuid.stats()["entropy_bytes"] == 16 + 10 * 14
+
+
+def test_parsed_by_input_type() -> None:
+    parse(SAMPLE)
+    parse(SAMPLE.encode())
+    parse(memoryview(SAMPLE.encode()))
+    assert cyksuid.stats()["parsed"] == {"str": 1, "bytes": 2}
+
+
+def test_decode_errors() -> None:
+    with pytest.raises(TypeError):
+        parse("short")
+    with pytest.raises(ValueError):
+        parse("~" * 27)
+    with pytest.raises(DecodeError):
+        decode_many(b"~" * 27)
+    with pytest.raises(ValueError):
+        parse("z" * 27)
+    assert try_parse("short") is None
+
+    errors = cyksuid.stats()["decode_errors"]
+    assert errors["invalid_length"] == 2
+    assert errors["invalid_input"] == 2
+    assert errors["out_of_range"] == 1
+
+
+def test_bulk_decode_errors() -> None:
+    with pytest.raises(DecodeError):
+        decode_many(SAMPLE.encode() + b"z" * 27)
+    with pytest.raises(DecodeError):
+        decode_many(b"%s\n%s;%s" % ((SAMPLE.encode(),) * 3), newline=True)
+    assert list(iter_parse(io.BytesIO(b"z" * 27 + b"\nshort\n"), errors="skip")) == []
+
+    errors = cyksuid.stats()["decode_errors"]
+    assert errors["out_of_range"] == 2
+    assert errors["invalid_input"] == 1
+    assert errors["invalid_length"] == 1
+
+
+def test_timestamp_regressions() -> None:
+    now = [1700000000.0]
+    seq = KsuidSequence(Ksuid48, time_func=lambda: now[0])
+    seq()
+    now[0] -= 1
+    seq()
+    seq()
+    assert cyksuid.stats()["timestamp_regressions"] == 1
+
+
+def test_disabled() -> None:
+    cyksuid.set_stats_enabled(False)
+    Ksuid()
+    parse(SAMPLE)
+    stats = cyksuid.stats()
+    assert not stats["enabled"]
+    assert stats["generated"]["Ksuid"] == 0
+    assert stats["parsed"]["str"] == 0
+
+    cyksuid.set_stats_enabled(True)
+    Ksuid()
+    assert cyksuid.stats()["generated"]["Ksuid"] == 1
+
+
+def test_reset() -> None:
+    Ksuid()
+    cyksuid.stats_reset()
+    stats = cyksuid.stats()
+    assert stats["enabled"]
+    assert stats["generated"]["Ksuid"] == 0
+    assert stats["entropy_bytes"] == 0
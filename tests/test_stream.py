@@ -0,0 +1,159 @@
+import io
+import os
+from typing import List, Optional
+
+import pytest
+
+from cyksuid.fast_base62 import DecodeError
+from cyksuid.v2 import (
+    Ksuid,
+    Ksuid48,
+    KsuidArray,
+    generate_many,
+    iter_parse,
+    parse,
+    write_encoded,
+)
+
+TEST_IDS = KsuidArray.from_buffer(generate_many(1000))
+# Lines are 28 bytes, chunks split records
+CHUNK_SIZES = [28, 100, 1 << 20]
+
+
+def read_all(source, **kwargs) -> List[Ksuid]:
+    return [k for batch in iter_parse(source, **kwargs) for k in batch]
+
+
+def test_write_encoded() -> None:
+    out = io.BytesIO()
+    assert write_encoded(out, TEST_IDS, chunk_size=1000) == 1000
+    assert out.getvalue() == TEST_IDS.to_encoded(newline=True)
+
+    out = io.BytesIO()
+    assert write_encoded(out, iter(TEST_IDS), chunk_size=1000) == 1000
+    assert out.getvalue() == TEST_IDS.to_encoded(newline=True)
+
+    text = io.StringIO()
+    assert write_encoded(text, list(TEST_IDS)[:3]) == 3
+    assert text.getvalue() == "".join(str(k) + "\n" for k in list(TEST_IDS)[:3])
+
+    out = io.BytesIO()
+    assert write_encoded(out, []) == 0
+    assert out.getvalue() == b""
+    with pytest.raises(ValueError):
+        write_encoded(out, b"x" * 21)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_roundtrip(tmp_path, chunk_size) -> None:
+    path = tmp_path / "ids.txt"
+    with open(path, "wb") as f:
+        write_encoded(f, TEST_IDS)
+
+    assert read_all(path, chunk_size=chunk_size) == list(TEST_IDS)
+    assert read_all(os.fspath(path), chunk_size=chunk_size) == list(TEST_IDS)
+    with open(path, "rb") as f:
+        assert read_all(f, chunk_size=chunk_size) == list(TEST_IDS)
+
+
+def test_batches() -> None:
+    data = TEST_IDS.to_encoded(newline=True)
+    batches = list(iter_parse(io.BytesIO(data), chunk_size=28 * 100, ksuid_cls=Ksuid48))
+    assert [len(b) for b in batches] == [100] * 10
+    assert all(b.ksuid_cls is Ksuid48 for b in batches)
+    assert b"".join(b.tobytes() for b in batches) == TEST_IDS.tobytes()
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_line_endings(tmp_path, chunk_size) -> None:
+    ids = list(TEST_IDS)[:3]
+    data = "\r\n\n".join(str(k) for k in ids).encode()
+    assert read_all(io.BytesIO(data), chunk_size=chunk_size) == ids
+    assert read_all(io.StringIO(data.decode()), chunk_size=chunk_size) == ids
+
+    path = tmp_path / "ids.txt"
+    path.write_bytes(data)
+    assert read_all(path, chunk_size=chunk_size) == ids
+
+    path.write_bytes(b"")
+    assert read_all(path) == []
+
+
+MALFORMED = [
+    b"%s\n" % Ksuid().encoded,
+    b"tooshort\n",
+    b"%s\n" % Ksuid().encoded,
+    b"!" * 27 + b"\n",
+    b"x" * 100 + b"\n",
+    b"%s" % Ksuid().encoded,
+]
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_errors(tmp_path, chunk_size) -> None:
+    data = b"".join(MALFORMED)
+    expected: List[Ksuid] = [parse(MALFORMED[i].strip()) for i in (0, 2, 5)]
+    offsets = [sum(len(line) for line in MALFORMED[:i]) for i in (1, 3, 4)]
+    path = tmp_path / "ids.txt"
+    path.write_bytes(data)
+
+    for source in (lambda: path, lambda: io.BytesIO(data)):
+        with pytest.raises(DecodeError) as exc_info:
+            read_all(source(), chunk_size=chunk_size)
+        assert exc_info.value.index == 1
+        assert "offset %d" % offsets[0] in str(exc_info.value)
+
+        assert read_all(source(), chunk_size=chunk_size, errors="skip") == expected
+
+        reader = iter_parse(source(), chunk_size=chunk_size, errors="collect")
+        assert [k for batch in reader for k in batch] == expected
+        assert reader.invalid_offsets == offsets
+
+
+class EndlessLine(io.BytesIO):
+    """A line of ``count`` chunks of garbage, then ``tail``."""
+
+    def __init__(self, count: int, tail: bytes) -> None:
+        super().__init__()
+        self.count = count
+        self.tail = tail
+        self.reads = 0
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        assert size is not None
+        self.reads += 1
+        if self.reads <= self.count:
+            return b"x" * size
+        tail, self.tail = self.tail, b""
+        return tail
+
+
+def test_overlong_line() -> None:
+    # Raised without buffering the whole line
+    source = EndlessLine(1 << 30, b"")
+    with pytest.raises(DecodeError) as exc_info:
+        read_all(source, chunk_size=100)
+    assert exc_info.value.index == 0
+    assert source.reads == 1
+
+    k = Ksuid()
+    tail = b"x\n%s\n" % k.encoded
+    assert read_all(EndlessLine(50, tail), chunk_size=100, errors="skip") == [k]
+    reader = iter_parse(EndlessLine(50, tail), chunk_size=100, errors="collect")
+    assert [k for batch in reader for k in batch] == [k]
+    assert reader.invalid_offsets == [0]
+
+
+def test_invalid_arguments() -> None:
+    with pytest.raises(ValueError):
+        iter_parse(io.BytesIO(), errors="ignore")
+    with pytest.raises(ValueError):
+        iter_parse(io.BytesIO(), chunk_size=10)
+
+
+def test_close(tmp_path) -> None:
+    path = tmp_path / "ids.txt"
+    path.write_bytes(TEST_IDS.to_encoded(newline=True))
+    with iter_parse(path, chunk_size=280) as reader:
+        assert len(next(reader)) == 10
+    assert list(reader) == []
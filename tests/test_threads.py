@@ -0,0 +1,190 @@
+import sys
+import sysconfig
+import threading
+from typing import Callable, List, TypeVar
+
+import pytest
+
+from cyksuid.v2 import (
+    SHARED_SEQUENCE_SIZE,
+    CachedClock,
+    EntropyPool,
+    Ksuid,
+    Ksuid48,
+    KsuidArray,
+    KsuidSequence,
+    KsuidSet,
+    ManualClock,
+    SharedKsuidSequence,
+    generate_many,
+    ksuid,
+    parse,
+    parse_cache_info,
+    set_parse_cache,
+)
+
+T = TypeVar("T")
+
+THREADS = 8
+ROUNDS = 2000
+
+
+def run_threads(worker: Callable[[int], T], n: int = THREADS) -> List[T]:
+    """Run ``worker(i)`` on ``n`` threads started together, return the results."""
+    barrier = threading.Barrier(n)
+    results: List[T] = [None] * n  # type: ignore
+    errors: List[BaseException] = []
+
+    def target(i: int) -> None:
+        try:
+            barrier.wait()
+            results[i] = worker(i)
+        except BaseException as e:  # pragma: no cover
+            errors.append(e)
+
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    return results
+
+
+@pytest.mark.skipif(
+    not sysconfig.get_config_var("Py_GIL_DISABLED"),
+    reason="requires free-threaded CPython",
+)
+def test_gil_stays_disabled() -> None:
+    import cyksuid._array
+    import cyksuid._ksuid
+    import cyksuid._stream
+    import cyksuid.fast_base62
+    import cyksuid.v2  # noqa: F401
+
+    assert not sys._is_gil_enabled()  # type: ignore[attr-defined]
+
+
+def test_generate_unique() -> None:
+    def worker(i: int) -> List[bytes]:
+        out = [Ksuid().bytes for _ in range(ROUNDS)]
+        out += [ksuid(ksuid_cls=Ksuid48).bytes for _ in range(ROUNDS)]
+        out += [k.bytes for k in KsuidArray.from_buffer(generate_many(ROUNDS))]
+        return out
+
+    ids = [b for r in run_threads(worker) for b in r]
+    assert len(set(ids)) == len(ids) == THREADS * ROUNDS * 3
+
+
+def test_shared_sequence_object() -> None:
+    seq = KsuidSequence(Ksuid48)
+
+    def worker(i: int) -> List[Ksuid48]:
+        return [seq() for _ in range(ROUNDS)]
+
+    results = run_threads(worker)
+    for ids in results:
+        assert all(a < b for a, b in zip(ids, ids[1:]))
+    ids = [k for r in results for k in r]
+    assert len(set(ids)) == len(ids)
+
+
+def test_shared_memory_sequence() -> None:
+    seq = SharedKsuidSequence(bytearray(SHARED_SEQUENCE_SIZE), Ksuid48)
+
+    def worker(i: int) -> List[Ksuid48]:
+        return [seq() for _ in range(ROUNDS)]
+
+    with seq:
+        results = run_threads(worker)
+    ids = sorted(k for r in results for k in r)
+    assert all(a < b for a, b in zip(ids, ids[1:]))
+
+
+def test_shared_entropy_pool() -> None:
+    pool = EntropyPool(256)
+    chunks = [
+        c for r in run_threads(lambda i: [pool(16) for _ in range(ROUNDS)]) for c in r
+    ]
+    assert len(set(chunks)) == len(chunks)
+
+
+def test_shared_clocks() -> None:
+    clock = ManualClock(1700000000000, step=1)
+    cached = CachedClock(10)
+
+    def worker(i: int) -> List[int]:
+        for _ in range(ROUNDS):
+            cached.now_millis()
+        return [
+            ksuid(ksuid_cls=Ksuid48, clock=clock).timestamp_millis
+            for _ in range(ROUNDS)
+        ]
+
+    readings = sorted(t for r in run_threads(worker) for t in r)
+    assert readings == list(range(1700000000000, 1700000000000 + THREADS * ROUNDS))
+
+
+def test_parse_cache() -> None:
+    encoded = [str(Ksuid()) for _ in range(100)]
+    set_parse_cache(64)
+    try:
+
+        def worker(i: int) -> List[Ksuid]:
+            return [parse(s) for _ in range(ROUNDS // 100) for s in encoded]
+
+        for ids in run_threads(worker):
+            assert [str(k) for k in ids] == encoded * (ROUNDS // 100)
+        info = parse_cache_info()
+        assert info.hits + info.misses == THREADS * ROUNDS
+        assert info.size == 64
+    finally:
+        set_parse_cache(0)
+
+
+def test_str_cached_once() -> None:
+    ids = [Ksuid() for _ in range(ROUNDS)]
+    results = run_threads(lambda i: [str(k) for k in ids])
+    for strs in results:
+        assert all(a is b for a, b in zip(strs, results[0]))
+        assert all(s is str(k) for s, k in zip(strs, ids))
+
+
+def test_shared_set() -> None:
+    arr = KsuidArray.from_buffer(generate_many(ROUNDS * 10))
+    s = KsuidSet()
+
+    def worker(i: int) -> int:
+        # Each ID is fresh for exactly one of the threads adding it
+        fresh = sum(bin(b).count("1") for b in s.add_many(arr))
+        assert all(k in s for k in arr[:ROUNDS])
+        return fresh
+
+    assert sum(run_threads(worker)) == len(s) == len(arr)
+
+
+def test_shared_array() -> None:
+    arr = KsuidArray(ksuid_cls=Ksuid48)
+    ids = KsuidArray.from_buffer(generate_many(ROUNDS, Ksuid48), Ksuid48)
+
+    def append(i: int) -> int:
+        for k in ids:
+            arr.append(k)
+            assert arr[-1].timestamp_millis > 0
+            assert len(arr.tobytes()) % 20 == 0
+        return len(list(arr))
+
+    assert min(run_threads(append)) >= ROUNDS
+    assert len(arr) == THREADS * ROUNDS
+
+    def read(i: int) -> int:
+        # Bulk operations run without the GIL on the pinned storage
+        for _ in range(10):
+            arr.sort()
+            assert len(arr.timestamps_millis()) == len(arr.hash64()) == len(arr)
+            assert arr.min() == ids.min()
+            assert arr[i] in arr[:ROUNDS]
+        return arr.searchsorted(ids.max())
+
+    assert run_threads(read) == [(THREADS * ROUNDS) - THREADS] * THREADS
+    assert list(arr) == sorted(list(ids) * THREADS)
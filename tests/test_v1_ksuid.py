@@ -16,6 +16,12 @@ def test_construct_from_timestamp() -> None:
     assert x.datetime == datetime.datetime.utcfromtimestamp(int(cur_time))
 
 
+def test_datetime_is_naive_utc() -> None:
+    x = ksuid.parse("0ujtsYcgvSTl8PAuAdqWYSMnLOv")
+    assert x.datetime == datetime.datetime(2017, 10, 10, 4, 0, 47)
+    assert x.datetime.tzinfo is None
+
+
 def test_construct_from_payload() -> None:
     payload = bytes([i for i in range(ksuid.KSUID.PAYLOAD_LENGTH_IN_BYTES)])
 
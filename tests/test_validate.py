@@ -0,0 +1,92 @@
+from typing import Any, List, Optional
+
+import pytest
+
+from cyksuid.v2 import (
+    MAX_ENCODED,
+    Ksuid,
+    Ksuid48,
+    is_valid,
+    parse,
+    try_parse,
+    validate_many,
+)
+
+SAMPLE = "0ujtsYcgvSTl8PAuAdqWYSMnLOv"
+
+INVALID: List[Any] = [
+    "",
+    SAMPLE[:-1],
+    SAMPLE + "0",
+    "0" * 26 + "!",
+    "é" * 27,
+    "0" * 26 + "\udc80",
+    b"0" * 26 + b"\xff",
+    MAX_ENCODED[:-1] + b"W",
+    "z" * 27,
+    None,
+    0xEEFF,
+    [SAMPLE],
+]
+
+
+class StrSubclass(str):
+    pass
+
+
+@pytest.mark.parametrize(
+    "s",
+    [
+        SAMPLE,
+        SAMPLE.encode(),
+        bytearray(SAMPLE.encode()),
+        memoryview(SAMPLE.encode()),
+        StrSubclass(SAMPLE),
+        MAX_ENCODED,
+        "0" * 27,
+    ],
+)
+def test_valid(s: Any) -> None:
+    assert is_valid(s)
+    k: Optional[Ksuid] = try_parse(s)
+    assert k == parse(s)
+
+
+@pytest.mark.parametrize("s", INVALID)
+def test_invalid(s: Any) -> None:
+    assert not is_valid(s)
+    assert try_parse(s) is None
+    sentinel = object()
+    assert try_parse(s, sentinel) is sentinel
+    with pytest.raises((TypeError, ValueError)):
+        parse(s)
+
+
+def test_out_of_range() -> None:
+    with pytest.raises(ValueError, match="out of range"):
+        parse("z" * 27)
+
+
+def test_try_parse_ksuid_cls() -> None:
+    k = try_parse(SAMPLE, ksuid_cls=Ksuid48)
+    assert type(k) is Ksuid48
+    assert try_parse("", 0, Ksuid48) == 0
+
+
+def test_validate_many_bitmap() -> None:
+    valid = [str(Ksuid()) for _ in range(10)]
+    ids: List[Any] = []
+    for i in range(20):
+        ids.append(valid[i // 2] if i % 3 else INVALID[i % len(INVALID)])
+    bitmap = validate_many(ids)
+    assert isinstance(bitmap, bytes)
+    assert len(bitmap) == 3
+    for i, s in enumerate(ids):
+        assert bool(bitmap[i // 8] >> (i % 8) & 1) == (i % 3 != 0)
+    assert validate_many(iter(ids), indices=True) == list(range(0, 20, 3))
+
+
+def test_validate_many_empty() -> None:
+    assert validate_many([]) == b""
+    assert validate_many([], indices=True) == []
+    assert validate_many([SAMPLE] * 8) == b"\xff"
@@ -0,0 +1,76 @@
+"""Compare two pytest-benchmark JSON files and fail on regressions.
+
+Usage: python tools/bench_compare.py BASELINE CURRENT [--threshold PERCENT]
+
+Compares the timing statistic (mean by default) and every numeric
+``extra_info`` metric (such as ``peak_bytes_per_object``) of benchmarks
+present in both files. Exits with status 1 if any of them grew by more than
+the threshold.
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, Iterator, List, Tuple
+
+
+def load(path: str) -> Dict[str, dict]:
+    with open(path) as f:
+        return {b["fullname"]: b for b in json.load(f)["benchmarks"]}
+
+
+def metrics(bench: dict, stat: str) -> Iterator[Tuple[str, float]]:
+    yield stat, bench["stats"][stat]
+    for key, value in sorted(bench.get("extra_info", {}).items()):
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield key, value
+
+
+def compare(
+    baseline: Dict[str, dict], current: Dict[str, dict], stat: str, threshold: float
+) -> List[str]:
+    regressions = []
+    for name in sorted(baseline.keys() & current.keys()):
+        old = dict(metrics(baseline[name], stat))
+        for key, new_value in metrics(current[name], stat):
+            old_value = old.get(key)
+            if not old_value:
+                continue
+            change = (new_value - old_value) / old_value * 100
+            line = "%-70s %-22s %12.6g -> %12.6g (%+.1f%%)" % (
+                name,
+                key,
+                old_value,
+                new_value,
+                change,
+            )
+            print(line)
+            if change > threshold:
+                regressions.append(line)
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument(
+        "--threshold", type=float, default=10.0, help="allowed growth in percent"
+    )
+    parser.add_argument(
+        "--stat", default="mean", help="timing statistic to compare, e.g. min"
+    )
+    args = parser.parse_args()
+
+    regressions = compare(
+        load(args.baseline), load(args.current), args.stat, args.threshold
+    )
+    if regressions:
+        print("\n%d regression(s) above %g%%:" % (len(regressions), args.threshold))
+        print("\n".join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())